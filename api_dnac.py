@@ -5,8 +5,8 @@ import json
 from datetime import timedelta
 from celery.result import AsyncResult
 from flask import Blueprint, request, session, jsonify
-from app import login_required, roles_required, read_user_from_session, csrf, cache, make_key
-from lib.aiodnac import Dnac
+from app import login_required, roles_required, read_user_from_session, csrf, cache, make_key, swr_cached, cache_redis
+from lib.aiodnac import Dnac, CONCURRENCY
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,14 +14,14 @@ DNAC_FABRICS = json.loads(os.environ.get("DNAC_FABRICS"))
 
 dnac = {}
 for f in DNAC_FABRICS:
-    dnac[f["name"]] = Dnac(f["host"],f["username"],f["password"])
+    dnac[f["name"]] = Dnac(f["host"],f["username"],f["password"], cache=cache_redis, concurrency=f.get("concurrency", CONCURRENCY))
 
 bp = Blueprint('api_dnac', __name__, url_prefix='/api/dnac')
 
 # get devices
 @bp.route("/<string:fabric>/device", methods=['GET'])
 @roles_required(["lan_admin","lan_operator"])
-@cache.cached(timeout=300, key_prefix=make_key)
+@swr_cached(soft_timeout=300, hard_timeout=3600)
 @csrf.exempt
 async def get_devices(fabric):
     if not fabric in dnac.keys():
@@ -35,12 +35,12 @@ async def get_devices(fabric):
 # get device
 @bp.route("/<string:fabric>/device/<string:id>", methods=['GET'])
 @roles_required(["lan_admin","lan_operator"])
-@cache.cached(timeout=300, key_prefix=make_key)
+@swr_cached(soft_timeout=300, hard_timeout=3600)
 @csrf.exempt
 async def get_device(fabric,id):
     if not fabric in dnac.keys():
         return jsonify({"error": f"Invalid fabric {fabric}"}), 400
-    data = await dnac[fabric].get_device(id)
+    data = await dnac[fabric].load_device(id)
     if data:
         return data.to_dict()
     else:
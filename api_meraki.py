@@ -5,7 +5,7 @@ import json
 from datetime import timedelta
 from celery.result import AsyncResult
 from flask import Blueprint, request, session, jsonify
-from app import login_required, roles_required, read_user_from_session, csrf, cache, make_key
+from app import login_required, roles_required, read_user_from_session, csrf, cache, make_key, swr_cached, cache_redis
 from lib.aiomeraki import Meraki
 from dotenv import load_dotenv
 
@@ -14,14 +14,14 @@ load_dotenv()
 MERAKI_FABRICS = json.loads(os.environ.get("MERAKI_FABRICS"))
 meraki = {}
 for f in MERAKI_FABRICS:
-    meraki[f["name"]] = Meraki(api_key = f["api_key"], org_id = f["org_id"])
+    meraki[f["name"]] = Meraki(api_key = f["api_key"], org_id = f["org_id"], cache = cache_redis)
 
 bp = Blueprint('api_meraki', __name__, url_prefix='/api/meraki')
 
 # get templates
 @bp.route("/<string:fabric>/templates", methods = ['GET'])
 @roles_required(["wlan_admin","wlan_operator"])
-@cache.cached(timeout=300, key_prefix=make_key)
+@swr_cached(soft_timeout=300, hard_timeout=3600)
 @csrf.exempt
 async def get_templates(fabric):
     if not fabric in meraki.keys():
@@ -35,7 +35,7 @@ async def get_templates(fabric):
 # get networks
 @bp.route("/<string:fabric>/networks", methods = ['GET'])
 @roles_required(["wlan_admin","wlan_operator"])
-@cache.cached(timeout=300, key_prefix=make_key)
+@swr_cached(soft_timeout=300, hard_timeout=3600)
 @csrf.exempt
 async def get_networks(fabric):
     if not fabric in meraki.keys():
@@ -49,7 +49,7 @@ async def get_networks(fabric):
 # get devices
 @bp.route("/<string:fabric>/devices", methods = ['GET'])
 @roles_required(["wlan_admin","wlan_operator"])
-@cache.cached(timeout=60, key_prefix=make_key)
+@swr_cached(soft_timeout=60, hard_timeout=600)
 @csrf.exempt
 async def get_devices(fabric):
     if not fabric in meraki.keys():
@@ -5,8 +5,11 @@ import json
 from datetime import timedelta
 from celery.result import AsyncResult
 from flask import Blueprint, request, session, jsonify
-from app import login_required, roles_required, read_user_from_session, csrf, cache, make_key
+from app import login_required, roles_required, read_user_from_session, csrf, cache, make_key, swr_cached, cache_redis
 from lib.aiosdwan import Vmanage
+from tasks import SNAPSHOT_KEY
+from lib.cachetags import SDWAN_INVENTORY, SDWAN_DEVICE, SDWAN_TEMPLATE, format_tags, invalidate
+from lib import metrics
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,14 +18,18 @@ SDWAN_FABRICS = json.loads(os.environ.get("SDWAN_FABRICS"))
 
 sdwan = {}
 for f in SDWAN_FABRICS:
-    sdwan[f["name"]] = Vmanage(f["host"],f["username"],f["password"])
+    sdwan[f["name"]] = Vmanage(f["host"],f["username"],f["password"], port=f.get("port", 443), cache=cache_redis)
+
+# Expose fabric concurrency limiters on /metrics
+for _stat in ["limit", "inflight", "waiting"]:
+    metrics.registry.gauge(f"yami_limiter_{_stat}", lambda stat=_stat: [ ({"fabric": name}, client.limiter.stats()[stat]) for name,client in sdwan.items() ])
 
 bp = Blueprint('api_sdwan', __name__, url_prefix='/api/sdwan')
 
 # get devices
 @bp.route("/<string:fabric>/device", methods=['GET'])
 @roles_required(["sdwan_admin","sdwan_operator"])
-@cache.cached(timeout=300, key_prefix=make_key)
+@swr_cached(soft_timeout=300, hard_timeout=3600, tags=[SDWAN_INVENTORY])
 @csrf.exempt
 async def get_devices(fabric):
     if not fabric in sdwan.keys():
@@ -33,9 +40,19 @@ async def get_devices(fabric):
     else:
         return jsonify({"error": f"No data"}), 400
 
+# get fabric concurrency limiter stats
+@bp.route("/<string:fabric>/limiter", methods=['GET'])
+@roles_required(["sdwan_admin","sdwan_operator"])
+@csrf.exempt
+def get_limiter(fabric):
+    if not fabric in sdwan.keys():
+        return jsonify({"error": f"Invalid fabric {fabric}"}), 400
+    return jsonify(sdwan[fabric].limiter.stats())
+
 # get device template values
 @bp.route("/<string:fabric>/device/<string:device_id>/template_values/<string:template_id>", methods=['GET'])
 @roles_required(["sdwan_admin","sdwan_operator"])
+@swr_cached(soft_timeout=3600, hard_timeout=86400, tags=[SDWAN_DEVICE, SDWAN_TEMPLATE])
 @csrf.exempt
 async def get_device_template_values(fabric,device_id,template_id):
     device_id = device_id.replace("_","/")
@@ -47,6 +64,21 @@ async def get_device_template_values(fabric,device_id,template_id):
     else:
         return jsonify({"error": f"No data"}), 400
 
+# get template values for many devices
+@bp.route("/<string:fabric>/device_template/<string:template_id>/template_values", methods=['POST'])
+@roles_required(["sdwan_admin","sdwan_operator"])
+@csrf.exempt
+async def get_template_values(fabric,template_id):
+    if not fabric in sdwan.keys():
+        return jsonify({"error": f"Invalid fabric {fabric}"}), 400
+    payload = request.get_json(silent=True) or {}
+    device_ids = [ e.replace("_","/") for e in payload.get("deviceIds", []) ]
+    data = await sdwan[fabric].get_template_values(template_id, device_ids)
+    if data:
+        return data
+    else:
+        return jsonify({"error": f"No data"}), 400
+
 # set device template values
 @bp.route("/<string:fabric>/device/<string:device_id>/template_values/<string:template_id>", methods=['POST'])
 @roles_required(["sdwan_admin"])
@@ -58,6 +90,7 @@ async def set_device_template_values(fabric,device_id,template_id):
     payload = request.get_json()
     data = await sdwan[fabric].set_device_template_values(device_id, template_id, payload)
     if data:
+        invalidate(cache_redis, format_tags([SDWAN_INVENTORY, SDWAN_DEVICE, SDWAN_TEMPLATE], fabric=fabric, device_id=device_id, template_id=template_id))
         return data
     else:
         return jsonify({"error": f"No data"}), 400
@@ -65,7 +98,7 @@ async def set_device_template_values(fabric,device_id,template_id):
 # get device template definition
 @bp.route("/<string:fabric>/device_template/<string:template_id>/definition", methods=['GET'])
 @roles_required(["sdwan_admin","sdwan_operator"])
-@cache.cached(timeout=300, key_prefix=make_key)
+@swr_cached(soft_timeout=3600, hard_timeout=86400, tags=[SDWAN_TEMPLATE])
 @csrf.exempt
 async def get_device_template_definition(fabric,template_id):
     if not fabric in sdwan.keys():
@@ -79,7 +112,7 @@ async def get_device_template_definition(fabric,template_id):
 # get device route table
 @bp.route("/<string:fabric>/device/<string:device_id>/route_table", methods=['GET'])
 @roles_required(["sdwan_admin","sdwan_operator"])
-@cache.cached(timeout=60, key_prefix=make_key)
+@swr_cached(soft_timeout=60, hard_timeout=600, tags=[SDWAN_DEVICE])
 @csrf.exempt
 async def get_device_route_table(fabric,device_id):
     device_id = device_id.replace("_","/")
@@ -92,9 +125,9 @@ async def get_device_route_table(fabric,device_id):
         return jsonify({"error": f"No data"}), 400
 
 # get device monitor actions
+# note: the options list does not depend on the device, it is cached once per fabric by the upstream cache
 @bp.route("/<string:fabric>/device/<string:device_id>/monitor_actions", methods=['GET'])
 @roles_required(["sdwan_admin","sdwan_operator"])
-@cache.cached(timeout=86400, key_prefix=make_key)
 @csrf.exempt
 async def get_device_monitor_actions(fabric,device_id):
     device_id = device_id.replace("_","/")
@@ -119,4 +152,28 @@ async def get_device_monitor_actions_data(fabric,device_id):
     if data:
         return data
     else:
-        return jsonify({"error": f"No data"}), 400
\ No newline at end of file
+        return jsonify({"error": f"No data"}), 400
+
+# query fleet snapshot (interfaces / tlocs / vrrp)
+# usage: /api/sdwan/<fabric>/snapshot/tlocs?color=biz-internet
+#        /api/sdwan/<fabric>/snapshot/vrrp?master=false
+@bp.route("/<string:fabric>/snapshot/<string:kind>", methods=['GET'])
+@roles_required(["sdwan_admin","sdwan_operator"])
+@csrf.exempt
+def get_snapshot(fabric,kind):
+    if not fabric in sdwan.keys():
+        return jsonify({"error": f"Invalid fabric {fabric}"}), 400
+    if not kind in ["interfaces","tlocs","vrrp","errors"]:
+        return jsonify({"error": f"Invalid snapshot kind {kind}"}), 400
+    raw = cache_redis.get(SNAPSHOT_KEY.format(fabric=fabric))
+    if raw is None:
+        return jsonify({"error": f"No snapshot for {fabric}"}), 404
+    snapshot = json.loads(raw)
+    filters = { k:v.lower() for k,v in request.args.items() }
+    rows = [ row for row in snapshot.get(kind, []) if all(str(row.get(k)).lower() == v for k,v in filters.items()) ]
+    return jsonify({
+        "collected_at": snapshot.get("collected_at"),
+        "devices": snapshot.get("devices"),
+        "failed": snapshot.get("failed"),
+        "data": rows
+    })
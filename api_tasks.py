@@ -1,12 +1,45 @@
+import time
 import socket
-from celery.result import AsyncResult
-from flask import Blueprint, request, session, jsonify
+import threading
+from flask import Blueprint, Response, request, session, jsonify
 
-from app import login_required, roles_required, read_user_from_session, csrf
-from tasks import hello, run_ssh_command
+from app import login_required, roles_required, read_user_from_session, csrf, task_redis
+from tasks import hello, run_ssh_command, stream_ssh_command, attach_device_templates, collect_sdwan_fleet
+from tasks import PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW, PRIORITY_LOWEST
+from tasks import read_task_status, read_task_result, write_task_owner, read_task_owner, STREAM_KEY
 
 bp = Blueprint('api_tasks', __name__, url_prefix='/api/tasks')
 
+# Streaming responses are closed after this many seconds, browsers resume them (Last-Event-ID)
+# caution: an open stream holds a web thread, keep this short
+STREAM_WINDOW = 15
+# Concurrent streams per process, so that streams cannot take every web thread (gunicorn runs 4)
+# beyond that, browsers are told to reconnect later (SSE retry) rather than refused: every stream
+# reconnects each STREAM_WINDOW, a refusal would end a working stream for good
+STREAM_MAX = 2
+STREAM_BUSY_RETRY = 2000
+stream_slots = threading.BoundedSemaphore(STREAM_MAX)
+
+# Priority of each task type when submitted by an operator from the UI
+TASK_PRIORITIES = {
+    "hello": PRIORITY_HIGH,
+    "ssh_cmd": PRIORITY_HIGH,
+    "sdwan_attach_template": PRIORITY_NORMAL,
+    "sdwan_collect": PRIORITY_LOW,
+}
+PRIORITY_STEPS = [PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW, PRIORITY_LOWEST]
+
+# Derive the task priority from the task type and the caller
+# - template pushes to more than one device are bulk jobs whoever submits them
+# - browsers send Fetch metadata (Sec-Fetch-Site) on UI requests, scripts using the API do not:
+#   scripted callers are demoted one step, so automation cannot starve operators on a shared queue
+def task_priority(task_type:str, task_data:dict)->int:
+    priority = TASK_PRIORITIES.get(task_type, PRIORITY_NORMAL)
+    if task_type == "sdwan_attach_template" and len(task_data.get("devices", [])) > 1:
+        priority = PRIORITY_LOW
+    if request.headers.get("Sec-Fetch-Site") != "same-origin":
+        priority = PRIORITY_STEPS[min(PRIORITY_STEPS.index(priority) + 1, len(PRIORITY_STEPS) - 1)]
+    return priority
 
 
 # submit Celery task
@@ -21,13 +54,29 @@ def create_task():
 
     if task_type is None or task_data is None:
         return jsonify({"error": "Missing task type or data"}), 400
+    priority = task_priority(task_type, task_data)
 
     match task_type:
         # Hello task
         case "hello":
             result = hello.apply_async(
                 kwargs = task_data,
-                headers = { "owner": user.username }
+                headers = { "owner": user.username },
+                priority = priority
+            )
+        # ssh_cmd, streamed (raw output only, read through /<task_id>/stream)
+        case "ssh_cmd" if task_data.get("stream", False):
+            result = stream_ssh_command.apply_async(
+                kwargs = {
+                    "username": user.username,
+                    "password": user.password,
+                    "host": task_data.get("ip_address"),
+                    "command": task_data.get("cmd"),
+                    "device_type": task_data.get("device_type"),
+                    "port": task_data.get("port",22)
+                },
+                headers = { "owner": user.username },
+                priority = priority
             )
         # ssh_cmd
         case "ssh_cmd":
@@ -38,27 +87,96 @@ def create_task():
                     "host": task_data.get("ip_address"),
                     "command": task_data.get("cmd"),
                     "device_type": task_data.get("device_type"),
-                    "use_textfsm": task_data.get("use_textfsm",False)
+                    "use_textfsm": task_data.get("use_textfsm",False),
+                    "port": task_data.get("port",22)
                 },
-                headers = { "owner": user.username }
+                headers = { "owner": user.username },
+                priority = priority
             )
+        # sdwan_attach_template
+        case "sdwan_attach_template":
+            if not "sdwan_admin" in user.roles:
+                return jsonify({"error": "Forbidden"}), 403
+            result = attach_device_templates.apply_async(
+                kwargs = {
+                    "fabric": task_data.get("fabric"),
+                    "template_id": task_data.get("template_id"),
+                    "devices": task_data.get("devices", [])
+                },
+                headers = { "owner": user.username },
+                priority = priority
+            )
+        # sdwan_collect
+        case "sdwan_collect":
+            if not any(role in ["sdwan_admin","sdwan_operator"] for role in user.roles):
+                return jsonify({"error": "Forbidden"}), 403
+            result = collect_sdwan_fleet.apply_async(
+                kwargs = {
+                    "fabric": task_data.get("fabric")
+                },
+                headers = { "owner": user.username },
+                priority = priority
+            )
+        case _:
+            return jsonify({"error": f"Invalid task type {task_type}"}), 400
 
+    write_task_owner(task_redis, result.id, user.username)
     return jsonify({"task_id": result.id}), 202
 
 # get Celery task status
+# polling only reads the status record, the (compressed) result is loaded once the task is ready
 @bp.route("/<string:task_id>", methods=["GET"])
 @login_required
 @csrf.exempt
 def get_task(task_id):
-    result = AsyncResult(task_id)
+    status = read_task_status(task_redis, task_id)
+    ready = status["status"] in ("SUCCESS", "FAILURE")
 
     response = {
         "task_id": task_id,
-        "status": result.status,
-        "success": result.successful(),
-        "ready": result.ready(),
-        "result": result.result if result.ready() and result.successful() else None,
+        "status": status["status"],
+        "success": status["success"],
+        "ready": ready,
+        "result": read_task_result(task_redis, task_id) if ready and status["success"] else None,
+        "progress": status["progress"] if status["status"] == "PROGRESS" else None,
     }
 
     return jsonify(response)
 
+# stream the output of a streamed ssh_cmd task (Server-Sent Events)
+# - event "output": a block of lines, the event id is the Redis stream entry id
+# - event "end": the task result, the output is complete
+# Reconnecting browsers send the last received id (Last-Event-ID) and resume from there.
+@bp.route("/<string:task_id>/stream", methods=["GET"])
+@login_required
+@csrf.exempt
+def stream_task(task_id):
+    owner = read_task_owner(task_redis, task_id)
+    if owner is None:
+        return jsonify({"error": f"Unknown task {task_id}"}), 404
+    if owner != session["username"]:
+        return jsonify({"error": "Forbidden"}), 403
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if not stream_slots.acquire(blocking=False):
+        return Response(f"retry: {STREAM_BUSY_RETRY}\n\n", mimetype="text/event-stream", headers=headers)
+    key = STREAM_KEY.format(task_id=task_id)
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("after", "0")
+
+    def events():
+        nonlocal last_id
+        yield "retry: 500\n\n"
+        deadline = time.monotonic() + STREAM_WINDOW
+        while time.monotonic() < deadline:
+            for _, entries in task_redis.xread({key: last_id}, count=100, block=1000):
+                for entry_id, fields in entries:
+                    last_id = entry_id.decode()
+                    if b"eof" in fields:
+                        yield f"id: {last_id}\nevent: end\ndata: {fields[b'eof'].decode()}\n\n"
+                        return
+                    lines = fields[b"data"].decode().removesuffix("\n").split("\n")
+                    yield f"id: {last_id}\nevent: output\n" + "".join(f"data: {line}\n" for line in lines) + "\n"
+
+    response = Response(events(), mimetype="text/event-stream", headers=headers)
+    # released when the response is closed, even if the client leaves before the first event
+    response.call_on_close(stream_slots.release)
+    return response
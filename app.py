@@ -5,11 +5,11 @@ import ssl
 import asyncio
 import inspect
 import hashlib
-import socket
-import aiodns
-import ipaddress
+import threading
+import mimetypes
 
-from flask import Flask, render_template, redirect, url_for, abort, jsonify, session, request
+from flask import Flask, render_template, redirect, url_for, abort, jsonify, session, request, copy_current_request_context, send_from_directory, before_render_template, template_rendered
+from flask.json.provider import DefaultJSONProvider
 from flask_wtf import FlaskForm, CSRFProtect
 from flask_wtf.csrf import CSRFError
 from flask_session import Session
@@ -18,16 +18,24 @@ from wtforms import StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired
 from redis import Redis
 from urllib.parse import urlparse
-from ldap3 import Server, Connection, ALL, SUBTREE, Tls
+from ldap3 import Server, Connection, SCHEMA, SUBTREE, RESTARTABLE, Tls
+from ldap3.utils.conv import escape_filter_chars
+from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from functools import wraps
 from dataclasses import dataclass, field, asdict
 from celery import Celery
 from dotenv import load_dotenv
+from lib.breaker import track_stale, is_stale
+from lib.cachetags import format_tags, add_tags
+from lib.aioresolver import Resolver
+from tasks import CELERY_CONFIG
+from lib import metrics, timing
 
 load_dotenv()
 
 # Redis backend for Celery / Server side sessions / Caching / Locks
-# DB0 -> Flask caching
+# DB0 -> Flask caching / SDWAN fleet snapshots
 # DB1 -> Flask sessions
 # DB2 -> Celery
 REDIS_URL = os.environ.get("REDIS_URL")
@@ -37,13 +45,34 @@ LDAP_HOST = f"ldaps://{os.environ.get("LDAP_HOST")}"
 LDAP_BASE_DN = os.environ.get("LDAP_BASE_DN")
 LDAP_USERNAME = os.environ.get("LDAP_USERNAME")
 LDAP_PASSWORD = os.environ.get("LDAP_PASSWORD")
+LDAP_POOL_SIZE = 4
+LDAP_CONNECT_TIMEOUT = 5
+LDAP_RECEIVE_TIMEOUT = 10
+# caution: login is not asynchronous, the request thread blocks on the service account search and
+# then waits for the user bind up to LDAP_BIND_TIMEOUT: keep it short, gunicorn only runs 4 threads
+LDAP_BIND_TIMEOUT = 5
+LDAP_HEALTH_INTERVAL = 60
+# Groups are searched from the domain root by default (LDAP_BASE_DN is often a users OU)
+LDAP_GROUP_BASE_DN = os.environ.get("LDAP_GROUP_BASE_DN") or ",".join(
+    e for e in (LDAP_BASE_DN or "").split(",") if e.strip().upper().startswith("DC=")
+)
+# Active Directory LDAP_MATCHING_RULE_IN_CHAIN (transitive group membership)
+LDAP_IN_CHAIN = "1.2.840.113556.1.4.1941"
 
 # Application roles to LDAP groups mappings
+# groups are given by CN or by full DN
 ROLES = json.loads(os.environ.get("LDAP_ROLES"))
 print(f'ROLES={ROLES}')
+ROLE_INDEX_TTL = 3600
+ROLE_CACHE_TTL = 300
 
 # Session timeout
+# sliding expiry is written at most once per SESSION_REFRESH_SECONDS
 SESSION_TIMEOUT_SECONDS = 3600*12
+SESSION_REFRESH_SECONDS = 300
+
+# Requests slower than this (seconds) are written to the slow-request log
+SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_SECONDS", 2.0))
 
 # DNS resolution
 DNS_SERVERS = json.loads(os.environ.get("DNS_SERVERS"))
@@ -57,12 +86,82 @@ if os.environ['FLASK_ENV'] == 'development':
 else:
     app.secret_key = os.urandom(24).hex()
 
+# Per-request timing breakdown (see lib/timing.py)
+# - emitted as a Server-Timing header (browser devtools > Network > Timing)
+# - spans: session, auth, cache, upstream-<client>, serialize, render, total
+# - requests over SLOW_REQUEST_SECONDS are logged as one JSON line
+def log_slow_request(method, path, status, elapsed, spans):
+    print("[SLOW] " + json.dumps({
+        "method": method,
+        "path": path,
+        "status": int(status.split()[0]),
+        "ms": round(elapsed * 1000, 1),
+        "spans": spans
+    }))
+
+app.wsgi_app = timing.ServerTimingMiddleware(app.wsgi_app, SLOW_REQUEST_SECONDS, log_slow_request)
+
+# JSON responses are timed as "serialize"
+class TimedJSONProvider(DefaultJSONProvider):
+    def response(self, *args, **kwargs):
+        with timing.timed("serialize"):
+            return super().response(*args, **kwargs)
+
+app.json = TimedJSONProvider(app)
+
+# Jinja rendering is timed as "render"
+@before_render_template.connect_via(app)
+def start_render(sender, template, context, **extra):
+    context["_render_started"] = time.monotonic()
+
+@template_rendered.connect_via(app)
+def end_render(sender, template, context, **extra):
+    started = context.get("_render_started")
+    if started is not None:
+        timing.record("render", time.monotonic() - started)
+
+# Fingerprinted static assets (built by build_assets.py into static/dist)
+# usage in templates: {{ asset_url('js/api.js') }}
+# falls back to the plain static URL when the build step did not run (development)
+ASSETS_DIR = os.path.join(app.static_folder, "dist")
+ASSETS_MAX_AGE = 31536000
+try:
+    with open(os.path.join(ASSETS_DIR, "manifest.json")) as f:
+        ASSETS_MANIFEST = json.load(f)
+except FileNotFoundError:
+    ASSETS_MANIFEST = {}
+
+@app.template_global()
+def asset_url(filename: str) -> str:
+    if filename in ASSETS_MANIFEST:
+        return url_for('assets', filename=ASSETS_MANIFEST[filename])
+    return url_for('static', filename=filename)
+
+# Serve fingerprinted assets, pre-compressed when the client supports it
+@app.route('/assets/<path:filename>', methods=['GET'])
+def assets(filename):
+    accept = request.headers.get("Accept-Encoding", "")
+    encoding = None
+    for candidate, ext in [("br", ".br"), ("gzip", ".gz")]:
+        if candidate in accept and os.path.isfile(os.path.join(ASSETS_DIR, filename + ext)):
+            encoding = candidate
+            break
+    if encoding:
+        response = send_from_directory(ASSETS_DIR, filename + (".br" if encoding == "br" else ".gz"), mimetype=mimetypes.guess_type(filename)[0], max_age=ASSETS_MAX_AGE)
+        response.headers["Content-Encoding"] = encoding
+    else:
+        response = send_from_directory(ASSETS_DIR, filename, max_age=ASSETS_MAX_AGE)
+    response.headers["Cache-Control"] = f"public, max-age={ASSETS_MAX_AGE}, immutable"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
 # Caching
 app.config['CACHE_TYPE'] = 'redis'
 app.config['CACHE_REDIS_HOST'] = urlparse(REDIS_URL).hostname
 app.config['CACHE_REDIS_PORT'] = 6379
 app.config['CACHE_REDIS_DB'] = 0
 cache = Cache(app)
+cache_redis = Redis.from_url(f"{REDIS_URL}/0")
 # Custom cache key function
 # usage: @cache.cached(timeout=300, key_prefix=make_key)
 def make_key(*args, **kwargs):
@@ -74,21 +173,152 @@ def make_key(*args, **kwargs):
     # Hash the key
     return "cache:" + hashlib.sha256(base_key.encode()).hexdigest()
 
+# Stale-while-revalidate caching
+# usage: @swr_cached(soft_timeout=300, hard_timeout=3600, tags=["sdwan:{fabric}:inventory"])
+# - younger than soft_timeout: served from cache
+# - between soft and hard timeout: served from cache while a single background refresh runs
+# - older than hard_timeout (or missing): computed by a single caller, concurrent callers wait for it
+# Refreshers are coordinated across threads and processes through a Redis lock
+# Tags are formatted with the route arguments and allow writes to invalidate dependents (see lib/cachetags.py)
+SWR_LOCK_TIMEOUT = 60
+SWR_WAIT_INTERVAL = 0.1
+def swr_cached(soft_timeout: int, hard_timeout: int = None, tags: list[str] = None):
+    hard_timeout = hard_timeout or soft_timeout * 4
+
+    def read(key):
+        with timing.timed("cache"):
+            raw = cache_redis.get(key)
+        return json.loads(raw) if raw else None
+
+    def write(key, value):
+        # only cache successful results (error responses are tuples / Response objects)
+        # last-known-good data (open circuit breaker) is served but never cached as fresh
+        if isinstance(value, (list, dict)) and not is_stale():
+            cache_redis.set(key, app.json.dumps({"created": time.time(), "value": value}), ex=hard_timeout)
+            add_tags(cache_redis, key, format_tags(tags or [], **(request.view_args or {})), hard_timeout)
+        return value
+
+    def lock(key):
+        return cache_redis.lock(f"lock:{key}", timeout=SWR_LOCK_TIMEOUT, thread_local=False)
+
+    def release(l):
+        try:
+            l.release()
+        except Exception:
+            pass  # lock expired in the meantime
+
+    # refresh in a background thread if nobody else does
+    def revalidate(key, call):
+        l = lock(key)
+        if not l.acquire(blocking=False):
+            return
+        @copy_current_request_context
+        def run():
+            # the stale flag is per thread: track it for this refresh
+            track_stale()
+            try:
+                write(key, call())
+            except Exception as e:
+                print(f"[ERROR] Cache refresh failed for {request.path}: {e}")
+            finally:
+                release(l)
+        threading.Thread(target=run, daemon=True).start()
+
+    # serve fresh or stale entry, or None on miss
+    def lookup(key, call):
+        entry = read(key)
+        if entry is None:
+            metrics.registry.inc("yami_cache_requests_total", route=request.endpoint, result="miss")
+            return None
+        if time.time() - entry["created"] >= soft_timeout:
+            metrics.registry.inc("yami_cache_requests_total", route=request.endpoint, result="stale")
+            revalidate(key, call)
+        else:
+            metrics.registry.inc("yami_cache_requests_total", route=request.endpoint, result="hit")
+        return entry
+
+    def decorator(f):
+        @wraps(f)
+        def sync_wrapper(*args, **kwargs):
+            key = "swr:" + make_key()
+            entry = lookup(key, lambda: f(*args, **kwargs))
+            if entry is not None:
+                return entry["value"]
+            l = lock(key)
+            deadline = time.monotonic() + SWR_LOCK_TIMEOUT
+            while not l.acquire(blocking=False) and time.monotonic() < deadline:
+                time.sleep(SWR_WAIT_INTERVAL)
+                entry = read(key)
+                if entry is not None:
+                    return entry["value"]
+            try:
+                return write(key, f(*args, **kwargs))
+            finally:
+                release(l)
+
+        @wraps(f)
+        async def async_wrapper(*args, **kwargs):
+            key = "swr:" + make_key()
+            entry = lookup(key, lambda: asyncio.run(f(*args, **kwargs)))
+            if entry is not None:
+                return entry["value"]
+            l = lock(key)
+            deadline = time.monotonic() + SWR_LOCK_TIMEOUT
+            while not l.acquire(blocking=False) and time.monotonic() < deadline:
+                await asyncio.sleep(SWR_WAIT_INTERVAL)
+                entry = read(key)
+                if entry is not None:
+                    return entry["value"]
+            try:
+                return write(key, await f(*args, **kwargs))
+            finally:
+                release(l)
+
+        return async_wrapper if inspect.iscoroutinefunction(f) else sync_wrapper
+    return decorator
+
 # Server side sessions
 app.config['SESSION_TYPE'] = 'redis'
 app.config['SESSION_REDIS'] = Redis.from_url(f"{REDIS_URL}/1")
+# only write sessions to Redis when they change (the Redis key TTL follows each write)
+app.config['SESSION_REFRESH_EACH_REQUEST'] = False
+app.config['PERMANENT_SESSION_LIFETIME'] = SESSION_TIMEOUT_SECONDS
 Session(app)
 
+# Server side session load / save is timed as "session"
+class TimedSessionInterface:
+    def __init__(self, interface):
+        self.interface = interface
+
+    def __getattr__(self, name):
+        return getattr(self.interface, name)
+
+    def open_session(self, app, request):
+        with timing.timed("session"):
+            return self.interface.open_session(app, request)
+
+    def save_session(self, app, session, response):
+        with timing.timed("session"):
+            return self.interface.save_session(app, session, response)
+
+app.session_interface = TimedSessionInterface(app.session_interface)
+
 
 
 # Attach Celery app
-celery_app = Celery('celery', broker=f"{REDIS_URL}/2", result_backend=f"{REDIS_URL}/2", task_ignore_result=False)
+celery_app = Celery('celery', broker=f"{REDIS_URL}/2", result_backend=f"{REDIS_URL}/2")
+celery_app.conf.update(CELERY_CONFIG)
 celery_app.set_default()
 app.extensions["celery"] = celery_app
+# task status / results written by the workers (see tasks.py)
+task_redis = Redis.from_url(f"{REDIS_URL}/2")
 
 # Refresh session timeout
 @app.before_request
 def refresh_session():
+    # static assets and metrics scrapes don't need session handling
+    if request.endpoint in ["static", "assets", "get_metrics"]:
+        return
     # set default theme
     if "theme" not in session:
         session["theme"] = "sandstone"
@@ -100,10 +330,23 @@ def refresh_session():
         now = int(time.time())
         if session.get('expires_at', 0) < now:
             session.clear()
-        else:
-            # Refresh timeout
+        elif session['expires_at'] - now < SESSION_TIMEOUT_SECONDS - SESSION_REFRESH_SECONDS:
+            # Refresh timeout (throttled, so polling requests don't rewrite the session)
             session['expires_at'] = now + SESSION_TIMEOUT_SECONDS
 
+# Track upstream responses answered with last-known-good data
+@app.before_request
+def reset_stale():
+    track_stale()
+
+# Flag responses built from last-known-good data (open circuit breaker)
+@app.after_request
+def flag_stale(response):
+    if is_stale():
+        response.headers["X-Yami-Stale"] = "1"
+        response.headers["Warning"] = '110 - "Response is Stale"'
+    return response
+
 # CSRF token timeout
 @app.errorhandler(CSRFError)
 def handle_csrf_error(e):
@@ -178,64 +421,234 @@ def roles_required(allowed_roles: list[str]):
         return async_wrapper if asyncio.iscoroutinefunction(f) else sync_wrapper
     return decorator
 
+# LDAP server (schema is downloaded once per process, on the first bind)
+ldap_server = Server(
+    LDAP_HOST,
+    get_info = SCHEMA,
+    port = 636,
+    use_ssl = True,
+    tls = Tls(validate=ssl.CERT_NONE),
+    connect_timeout = LDAP_CONNECT_TIMEOUT
+)
+
+# User binds run in a small thread pool, so that the request thread can stop waiting after LDAP_BIND_TIMEOUT
+# caution: a bind left behind keeps its worker until its own receive timeout, so binds are only submitted
+# while a worker is free (ldap_bind_slots): slow binds cannot pile up behind each other
+ldap_executor = ThreadPoolExecutor(max_workers=LDAP_POOL_SIZE, thread_name_prefix="ldap")
+ldap_bind_slots = threading.BoundedSemaphore(LDAP_POOL_SIZE)
+
+# Process-wide pool of service account connections
+class LdapPool:
+    def __init__(self, size:int=LDAP_POOL_SIZE):
+        self.size = size
+        self.created = 0
+        self.idle = Queue()
+        self.lock = threading.Lock()
+
+    def _connect(self)->Connection:
+        conn = Connection(
+            ldap_server,
+            user = LDAP_USERNAME,
+            password = LDAP_PASSWORD,
+            auto_bind = True,
+            client_strategy = RESTARTABLE,
+            receive_timeout = LDAP_RECEIVE_TIMEOUT
+        )
+        conn.checked_at = time.monotonic()
+        return conn
+
+    # health check: idle connections are verified with a WhoAmI at most every LDAP_HEALTH_INTERVAL
+    def _healthy(self, conn:Connection)->bool:
+        if conn.closed or not conn.bound:
+            return False
+        if time.monotonic() - conn.checked_at < LDAP_HEALTH_INTERVAL:
+            return True
+        try:
+            conn.extend.standard.who_am_i()
+            conn.checked_at = time.monotonic()
+            return True
+        except Exception:
+            return False
+
+    def acquire(self)->Connection:
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except Empty:
+                with self.lock:
+                    create = self.created < self.size
+                    if create:
+                        self.created += 1
+                if create:
+                    try:
+                        return self._connect()
+                    except Exception:
+                        with self.lock:
+                            self.created -= 1
+                        raise
+                conn = self.idle.get(timeout=LDAP_BIND_TIMEOUT)
+            if self._healthy(conn):
+                return conn
+            try:
+                conn.unbind()
+            except Exception:
+                pass
+            with self.lock:
+                self.created -= 1
+
+    def release(self, conn:Connection):
+        self.idle.put(conn)
+
+    def search(self, **kwargs)->list:
+        conn = self.acquire()
+        try:
+            conn.search(**kwargs)
+            return list(conn.entries)
+        except Exception:
+            # drop broken connection instead of returning it to the pool
+            try:
+                conn.unbind()
+            except Exception:
+                pass
+            with self.lock:
+                self.created -= 1
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                self.release(conn)
+
+ldap_pool = LdapPool()
+
+# Group to role resolution
+# ROLES is compiled into a {group DN: roles} index, then a user's roles are resolved
+# with a single in-chain query, which also covers nested group membership
+class RoleResolver:
+    def __init__(self, roles:dict[str, list[str]]):
+        self.roles = roles
+        self.index: dict[str, set[str]] = {}
+        self.index_time = None
+        self.cache: dict[str, tuple[float, list[str]]] = {}
+        self.lock = threading.Lock()
+
+    # compile ROLES into a DN hash index (CNs are looked up once)
+    def refresh(self):
+        index = {}
+        for role_name,role_groups in self.roles.items():
+            for role_group in role_groups:
+                if role_group.upper().startswith("CN=") and "," in role_group:
+                    group_dns = [role_group]
+                else:
+                    entries = ldap_pool.search(
+                        search_base = LDAP_GROUP_BASE_DN,
+                        search_filter = f"(&(objectClass=group)(cn={escape_filter_chars(role_group)}))",
+                        search_scope = SUBTREE,
+                        attributes = []
+                    )
+                    group_dns = [ e.entry_dn for e in entries ]
+                for group_dn in group_dns:
+                    index.setdefault(group_dn.lower(), set()).add(role_name)
+        with self.lock:
+            self.index = index
+            self.index_time = time.monotonic()
+            self.cache.clear()
+
+    def resolve(self, user_dn:str)->list[str]:
+        now = time.monotonic()
+        with self.lock:
+            cached = self.cache.get(user_dn.lower())
+            if cached and cached[0] > now:
+                return cached[1]
+            stale_index = self.index_time is None or now - self.index_time > ROLE_INDEX_TTL
+        if stale_index:
+            self.refresh()
+        index = self.index
+        if not index:
+            return []
+
+        # single query: role groups the user belongs to, directly or through nesting
+        group_filter = "".join(f"(distinguishedName={escape_filter_chars(dn)})" for dn in index)
+        entries = ldap_pool.search(
+            search_base = LDAP_GROUP_BASE_DN,
+            search_filter = f"(&(objectClass=group)(member:{LDAP_IN_CHAIN}:={escape_filter_chars(user_dn)})(|{group_filter}))",
+            search_scope = SUBTREE,
+            attributes = []
+        )
+        roles = sorted({ role for e in entries for role in index.get(e.entry_dn.lower(), ()) })
+        with self.lock:
+            self.cache[user_dn.lower()] = (now + ROLE_CACHE_TTL, roles)
+        return roles
+
+role_resolver = RoleResolver(ROLES)
+
+# Compile the role index at startup (without blocking if the directory is unreachable)
+def warmup_roles():
+    try:
+        role_resolver.refresh()
+    except Exception as e:
+        print(f"[ERROR] Failed to build LDAP role index: {e}")
+threading.Thread(target=warmup_roles, daemon=True).start()
+
+# Bind with user credentials (runs in ldap_executor, holding one of ldap_bind_slots)
+# the receive timeout matches the caller's wait, so that an abandoned bind ends soon after
+def ldap_bind(user_dn: str, password: str) -> bool:
+    try:
+        conn = Connection(ldap_server, user=user_dn, password=password, receive_timeout=LDAP_BIND_TIMEOUT)
+        try:
+            return conn.bind()
+        finally:
+            conn.unbind()
+    finally:
+        ldap_bind_slots.release()
+
 # LDAP login function
 def ldap_login(username: str, password: str) -> User:
-    tls_config = Tls(validate=ssl.CERT_NONE)
-    server = Server(
-        LDAP_HOST,
-        get_info = ALL,
-        port = 636,
-        use_ssl = True,
-        tls = tls_config
-    )
-
     # Use service account to search for user's DN
     try:
-        conn = Connection(
-            server,
-            user = LDAP_USERNAME,
-            password = LDAP_PASSWORD,
-            auto_bind = True
+        entries = ldap_pool.search(
+            search_base = LDAP_BASE_DN,
+            search_filter = f"(sAMAccountName={escape_filter_chars(username)})",
+            search_scope = SUBTREE,
+            attributes = ["distinguishedName", "displayName", "givenName", "mail"]
         )
     except Exception as e:
-        print(f"[ERROR] Failed to bind with service account: {e}")
+        print(f"[ERROR] Failed to search with service account: {e}")
         return User(username=username)
 
-    # Search for the user's DN using sAMAccountName
-    search_filter = f"(sAMAccountName={username})"
-    conn.search(
-        search_base = LDAP_BASE_DN,
-        search_filter = search_filter,
-        search_scope = SUBTREE,
-        attributes = ["distinguishedName", "memberOf", "displayName", "givenName", "mail"]
-    )
-
-    if not conn.entries:
+    if not entries:
         return User(username=username)
 
-    user_dn = conn.entries[0].entry_dn
-    member_of = conn.entries[0].memberOf.values if 'memberOf' in conn.entries[0] else []
-    fullname = conn.entries[0].displayName.value
-    firstname = conn.entries[0].givenName.value
-    email = conn.entries[0].mail.value
+    user_dn = entries[0].entry_dn
+    fullname = entries[0].displayName.value
+    firstname = entries[0].givenName.value
+    email = entries[0].mail.value
 
     # Now try binding with the user's actual credentials
     try:
-        Connection(server, user=user_dn, password=password, auto_bind=True)
+        if not ldap_bind_slots.acquire(blocking=False):
+            print(f"[ERROR] LDAP bind workers busy, login refused for {username}")
+            return User(username=username)
+        future = ldap_executor.submit(ldap_bind, user_dn, password)
+        if not future.result(timeout=LDAP_BIND_TIMEOUT):
+            return User(username=username)
+    except FutureTimeoutError:
+        print(f"[ERROR] LDAP bind timed out for {username}")
+        # a bind that never started does not release its slot
+        if future.cancel():
+            ldap_bind_slots.release()
+        return User(username=username)
     except Exception:
         return User(username=username)
 
     # User role mapping
-    user_roles = set()
-    for role_name,role_groups in ROLES.items():
-        for role_group in role_groups:
-            for user_group in member_of:
-                # Caution! This assumes group CN uniqueness in the directory
-                if user_group.startswith(f'CN={role_group},'):
-                    user_roles.add(role_name)
+    try:
+        user_roles = role_resolver.resolve(user_dn)
+    except Exception as e:
+        print(f"[ERROR] Failed to resolve roles for {username}: {e}")
+        return User(username=username)
 
     return User(
-        authenticated = False if user_roles == set() else True,
+        authenticated = False if user_roles == [] else True,
         username = username,
         password = password,
         dn = user_dn,
@@ -259,7 +672,8 @@ def login():
     if form.validate_on_submit():
         username = form.username.data
         password = form.password.data
-        user = ldap_login(username, password)
+        with timing.timed("auth"):
+            user = ldap_login(username, password)
         if user.authenticated:
             app.session_interface.regenerate(session)
             session["username"] = user.username
@@ -305,6 +719,10 @@ def toggle_theme():
         session["theme"] = new_theme
     return redirect(request.referrer or url_for("home"))
 
+# DNS resolution (shared resolver with TTL cache, see lib/aioresolver.py)
+RESOLVE_BATCH_MAX = 1000
+resolver = Resolver(DNS_SERVERS, DNS_SUFFIXES)
+
 # simple DNS resolver
 @app.route("/resolve", methods=["POST"])
 @login_required
@@ -315,27 +733,45 @@ async def resolve():
     if not name:
         return jsonify({"error": "name is required"}), 400
 
-    # Check if it's already a valid IP address
-    try:
-        ip = str(ipaddress.ip_address(name))
-        return jsonify({"ip": ip})
-    except ValueError:
-        pass  # not an IP, try DNS resolution
+    result = await resolver.resolve(name)
+    if result:
+        return jsonify(result)
+    return jsonify({"error": f"Could not resolve {name}"}), 404
 
-    resolver = aiodns.DNSResolver()
-    resolver.nameservers = DNS_SERVERS
+# batch DNS resolver
+# usage: {"names": ["sw1","sw2"], "ips": ["10.0.0.1"]}
+@app.route("/resolve/batch", methods=["POST"])
+@login_required
+@csrf.exempt
+async def resolve_batch():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "A JSON object is required"}), 400
+    names = payload.get("names", [])
+    ips = payload.get("ips", [])
+    if not all(isinstance(e, list) and all(isinstance(v, str) for v in e) for e in (names, ips)):
+        return jsonify({"error": "names and ips must be lists of strings"}), 400
+    if not names and not ips:
+        return jsonify({"error": "names or ips is required"}), 400
+    if len(names) + len(ips) > RESOLVE_BATCH_MAX:
+        return jsonify({"error": f"Too many entries (max {RESOLVE_BATCH_MAX})"}), 400
+
+    return jsonify(await resolver.resolve_many(names, ips))
     
-    for suffix in DNS_SUFFIXES:
-        fqdn = name if suffix == "" else f"{name}.{suffix}"
-        try:
-            result = await resolver.gethostbyname(fqdn, socket.AF_INET)
-            if result and result.addresses:
-                return jsonify({"ip": result.addresses[0], "fqdn": fqdn})
-        except Exception as e:
-            continue  # try next suffix
+# Prometheus metrics (web tier in-process registry + worker registry in Redis DB0)
+# access: "Authorization: Bearer <METRICS_TOKEN>" for scrapers, or a logged-in session
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+worker_metrics = metrics.Registry(redis=cache_redis)
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    authorized = "username" in session
+    if METRICS_TOKEN and request.headers.get("Authorization") == f"Bearer {METRICS_TOKEN}":
+        authorized = True
+    if not authorized:
+        abort(401)
+    return app.response_class(metrics.render(metrics.registry, worker_metrics), mimetype="text/plain; version=0.0.4")
 
-    return jsonify({"error": f"Could not resolve {name}"}), 404
-    
 # Home route
 @app.route('/', methods=['GET'])
 @login_required
@@ -0,0 +1 @@
+# Benchmarks (not shipped, run from the repository root: python -m bench.<module>)
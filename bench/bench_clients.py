@@ -0,0 +1,182 @@
+# Benchmark lib/ clients against the local mock APIs (see bench/mockapi.py)
+# - latency: wall time of one client call (p50 / p95 / max over iterations, after a warm-up call)
+# - throughput: devices returned per second (at p50)
+# - memory: peak Python allocations during one extra call (tracemalloc)
+# - parse: model parsing time alone (from_api on pre-generated API records)
+#
+# usage:
+#   python -m bench.bench_clients --fleet 100,1000,10000 --latency 0.05
+#   python -m bench.bench_clients --fleet 50000 --scenarios dnac-devices --output after.json --compare before.json
+import json
+import time
+import asyncio
+import argparse
+import statistics
+import tracemalloc
+from typing import Any, Awaitable, Callable
+
+from bench.mockapi import MockServer, MERAKI_ORG, sdwan_controllers, sdwan_edges, dnac_devices, meraki_devices, infoblox_fixedaddresses
+from lib.aiosdwan import Vmanage, SdwanDevice
+from lib.aiodnac import Dnac, DnacDevice
+from lib.aiomeraki import Meraki, MerakiDevice
+from lib.aioinfoblox import Infoblox, FixedAddress
+
+# Scenarios: name -> function(server) returning an async callable, which returns the number of items,
+# and the number of items a correct client returns for the mock fleet
+def vmanage_devices(server:MockServer)->tuple[Callable[[], Awaitable[int]], int]:
+    client = Vmanage(server.host, "admin", "admin", port=server.port)
+    async def run():
+        return len(await client.get_devices() or {})
+    # edges and controllers
+    return run, server.fleet + len(sdwan_controllers())
+
+def vmanage_fleet(server:MockServer)->tuple[Callable[[], Awaitable[int]], int]:
+    client = Vmanage(server.host, "admin", "admin", port=server.port)
+    async def run():
+        snapshot = await client.collect_fleet()
+        return snapshot["devices"] if snapshot else 0
+    # reachable edges only
+    return run, sum(e["reachability"] == "reachable" for e in sdwan_edges(server.fleet))
+
+def dnac_devices_scenario(server:MockServer)->tuple[Callable[[], Awaitable[int]], int]:
+    client = Dnac(server.address, "admin", "admin")
+    async def run():
+        return len(await client.get_devices() or [])
+    return run, server.fleet
+
+def meraki_devices_scenario(server:MockServer)->tuple[Callable[[], Awaitable[int]], int]:
+    client = Meraki("benchmark-key", MERAKI_ORG, host=server.address)
+    async def run():
+        return len(await client.get_devices() or [])
+    return run, server.fleet
+
+def infoblox_fixedaddress_scenario(server:MockServer)->tuple[Callable[[], Awaitable[int]], int]:
+    client = None
+    async def run():
+        # caution: Infoblox keeps one httpx client, which is bound to the event loop it was first used in
+        nonlocal client
+        client = client or Infoblox(server.address, "admin", "admin")
+        return len(await client.get_fixedaddress())
+    return run, server.fleet
+
+SCENARIOS = {
+    "vmanage-devices": vmanage_devices,
+    "vmanage-fleet": vmanage_fleet,
+    "dnac-devices": dnac_devices_scenario,
+    "meraki-devices": meraki_devices_scenario,
+    "infoblox-fixedaddress": infoblox_fixedaddress_scenario,
+}
+DEFAULT_SCENARIOS = ["vmanage-devices", "dnac-devices", "meraki-devices", "infoblox-fixedaddress"]
+
+# Model parsing alone: name -> (record generator, parser)
+PARSERS = {
+    "SdwanDevice": (sdwan_edges, lambda records: [ SdwanDevice.from_api(fabric="bench", device=e) for e in records ]),
+    "DnacDevice": (dnac_devices, lambda records: [ DnacDevice.from_api(e) for e in records ]),
+    "MerakiDevice": (meraki_devices, lambda records: [ MerakiDevice.from_api(e) for e in records ]),
+    "FixedAddress": (infoblox_fixedaddresses, lambda records: [ FixedAddress(**e) for e in records ]),
+}
+
+def percentile(values:list[float], p:float)->float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+def bench_scenario(name:str, server:MockServer, iterations:int)->dict[str, Any]:
+    run, expected = SCENARIOS[name](server)
+
+    async def measure():
+        items = await run()  # warm-up (authentication, connection setup)
+        latencies = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            items = await run()
+            latencies.append(time.perf_counter() - start)
+        # one extra call for memory: tracemalloc slows allocations down, so it is kept out of latencies
+        tracemalloc.start()
+        await run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return items, latencies, peak
+
+    items, latencies, peak = asyncio.run(measure())
+    # a client that stops paginating early is fast, but wrong
+    if items != expected:
+        raise SystemExit(f"[ERROR] {name}: {items} items returned, expected {expected}")
+    p50 = statistics.median(latencies)
+    return {
+        "scenario": name,
+        "fleet": server.fleet,
+        "items": items,
+        "p50_ms": round(p50 * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+        "items_per_s": round(items / p50, 1) if p50 else 0,
+        "peak_mb": round(peak / 2**20, 1),
+    }
+
+def bench_parser(name:str, fleet:int, iterations:int)->dict[str, Any]:
+    generate, parse = PARSERS[name]
+    template = generate(fleet)
+    durations = []
+    for _ in range(iterations):
+        records = [ dict(e) for e in template ]  # from_api mutates its input
+        start = time.perf_counter()
+        parse(records)
+        durations.append(time.perf_counter() - start)
+    p50 = statistics.median(durations)
+    return {
+        "scenario": f"parse-{name}",
+        "fleet": fleet,
+        "items": fleet,
+        "p50_ms": round(p50 * 1000, 1),
+        "p95_ms": round(percentile(durations, 95) * 1000, 1),
+        "max_ms": round(max(durations) * 1000, 1),
+        "items_per_s": round(fleet / p50, 1) if p50 else 0,
+        "peak_mb": None,
+    }
+
+def print_results(results:list[dict[str, Any]], baseline:dict[tuple, dict[str, Any]]=None):
+    columns = ["scenario", "fleet", "items", "p50_ms", "p95_ms", "max_ms", "items_per_s", "peak_mb"]
+    if baseline:
+        columns.append("p50_delta")
+    print(" ".join(f"{c:>22}" if i == 0 else f"{c:>12}" for i,c in enumerate(columns)))
+    for r in results:
+        row = dict(r)
+        before = (baseline or {}).get((r["scenario"], r["fleet"]))
+        if baseline:
+            row["p50_delta"] = f"{(r['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100:+.1f}%" if before and before["p50_ms"] else "-"
+        print(" ".join(f"{str(row[c]):>22}" if i == 0 else f"{str(row[c] if row[c] is not None else '-'):>12}" for i,c in enumerate(columns)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lib/ API clients against local mock servers")
+    parser.add_argument("--fleet", default="100,1000,10000", help="comma separated fleet sizes (default: 100,1000,10000)")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock latency per request in seconds (default: 0.05)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra mock latency per request in seconds")
+    parser.add_argument("--iterations", type=int, default=5, help="measured calls per scenario (default: 5)")
+    parser.add_argument("--scenarios", default=",".join(DEFAULT_SCENARIOS), help=f"comma separated, among {', '.join(SCENARIOS)}")
+    parser.add_argument("--no-parse", action="store_true", help="skip model parsing benchmarks")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON results of a previous run, to print p50 deltas")
+    args = parser.parse_args()
+
+    results = []
+    for fleet in [ int(e) for e in args.fleet.split(",") ]:
+        with MockServer(fleet, latency=args.latency, jitter=args.jitter, port=args.port) as server:
+            for name in args.scenarios.split(","):
+                results.append(bench_scenario(name, server, args.iterations))
+        if not args.no_parse:
+            for name in PARSERS:
+                results.append(bench_parser(name, fleet, args.iterations))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = { (r["scenario"], r["fleet"]):r for r in json.load(f)["results"] }
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# Benchmark SSH command execution against local mock devices (see bench/mockssh.py)
+# - direct: tasks.run_ssh_command called in N threads (no Celery), with the connect / command
+#   split recorded by the task (yami_ssh_seconds)
+# - celery: a worker per pool setting (e.g. prefork:8, threads:32, gevent:200), commands per second
+#   from submission to the last result
+# - parse: TextFSM parsing alone on the canned outputs
+# Both modes require a disposable Redis instance (per-device SSH slots, Celery broker).
+#
+# usage:
+#   python -m bench.bench_ssh --mode direct --concurrency 1,8,32 --commands 200 --delay 0.2
+#   python -m bench.bench_ssh --mode celery --pools prefork:8,threads:32,gevent:200 --redis redis://127.0.0.1:6379
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from bench.mockssh import MockSshServer, OUTPUTS
+from lib import metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_COMMANDS = {"cisco_ios": "show ip interface brief", "cisco_nxos": "show interface status"}
+
+def ssh_kwargs(server:MockSshServer, i:int, command:str, use_textfsm:bool)->dict[str, Any]:
+    return {
+        "host": server.host,
+        "port": server.ports[i % server.devices],
+        "username": "bench",
+        "password": "bench",
+        "command": command,
+        "device_type": server.platform,
+        "use_textfsm": use_textfsm,
+    }
+
+# mean of a yami_ssh_seconds phase between two registry snapshots
+def phase_mean_ms(before:dict, after:dict, phase:str, device_type:str)->float:
+    labels = metrics.format_labels({"device_type": device_type, "phase": phase})
+    series_before = before.get("yami_ssh_seconds", {})
+    series_after = after.get("yami_ssh_seconds", {})
+    total = series_after.get(f"{labels}|sum", 0) - series_before.get(f"{labels}|sum", 0)
+    count = series_after.get(f"{labels}|count", 0) - series_before.get(f"{labels}|count", 0)
+    return round(total / count * 1000, 1) if count else 0.0
+
+def bench_direct(server:MockSshServer, concurrency:int, commands:int, command:str, use_textfsm:bool)->dict[str, Any]:
+    from tasks import run_ssh_command
+
+    before = metrics.registry.collect()
+    latencies = []
+
+    def run(i):
+        start = time.perf_counter()
+        result = run_ssh_command(**ssh_kwargs(server, i, command, use_textfsm))
+        latencies.append(time.perf_counter() - start)
+        return result["success"]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(run, range(commands)))
+    elapsed = time.perf_counter() - start
+    after = metrics.registry.collect()
+    return {
+        "mode": "direct",
+        "setting": f"threads:{concurrency}",
+        "commands": commands,
+        "errors": results.count(False),
+        "commands_per_s": round(commands / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "connect_ms": phase_mean_ms(before, after, "connect", server.platform),
+        "command_ms": phase_mean_ms(before, after, "command", server.platform),
+    }
+
+def bench_celery(server:MockSshServer, pool:str, concurrency:int, commands:int, command:str, use_textfsm:bool, redis:str)->dict[str, Any]:
+    from celery import Celery
+    from tasks import run_ssh_command, CELERY_CONFIG, SSH_QUEUE, get_task_redis, read_task_status, read_task_result
+
+    client = Celery("celery", broker=f"{redis}/2", result_backend=f"{redis}/2")
+    client.conf.update(CELERY_CONFIG)
+    client.set_default()
+    env = os.environ | {"SDWAN_FABRICS": "[]"}
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "celery", "-A", "worker", "worker", "-Q", SSH_QUEUE, f"--pool={pool}", f"--concurrency={concurrency}", "--loglevel=WARNING"],
+        env=env, cwd=ROOT
+    )
+    try:
+        # wait for the worker to answer pings before measuring
+        deadline = time.monotonic() + 60
+        while not client.control.ping(timeout=1.0):
+            if time.monotonic() > deadline or worker.poll() is not None:
+                raise RuntimeError(f"Celery worker ({pool}:{concurrency}) did not start")
+
+        start = time.perf_counter()
+        results = [ run_ssh_command.apply_async(kwargs=ssh_kwargs(server, i, command, use_textfsm)) for i in range(commands) ]
+        # results are read from the task status / result records, as the web tier does
+        store = get_task_redis()
+        pending = { r.id for r in results }
+        outcomes = []
+        deadline = time.monotonic() + 600
+        while pending and time.monotonic() < deadline:
+            for task_id in list(pending):
+                if read_task_status(store, task_id)["status"] in ("SUCCESS", "FAILURE"):
+                    outcomes.append(read_task_result(store, task_id) or {})
+                    pending.discard(task_id)
+            time.sleep(0.05)
+        outcomes += [ {"success": False} for _ in pending ]
+        elapsed = time.perf_counter() - start
+    finally:
+        worker.send_signal(signal.SIGTERM)
+        try:
+            worker.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+    return {
+        "mode": "celery",
+        "setting": f"{pool}:{concurrency}",
+        "commands": commands,
+        "errors": sum(1 for o in outcomes if not o.get("success")),
+        "commands_per_s": round(commands / elapsed, 2),
+        "p50_ms": None,
+        "connect_ms": None,
+        "command_ms": None,
+    }
+
+def bench_parse(platform:str, command:str, rows:int, iterations:int=20)->float:
+    from netmiko.utilities import get_structured_data
+    output = OUTPUTS[platform][command]("SW0000", rows)
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        get_structured_data(output, platform=platform, command=command)
+        durations.append(time.perf_counter() - start)
+    return round(statistics.median(durations) * 1000, 2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SSH command execution against mock devices")
+    parser.add_argument("--mode", choices=["direct", "celery"], default="direct")
+    parser.add_argument("--concurrency", default="1,8,32", help="direct mode: comma separated thread counts (default: 1,8,32)")
+    parser.add_argument("--pools", default="prefork:8", help="celery mode: comma separated pool:concurrency (default: prefork:8)")
+    parser.add_argument("--commands", type=int, default=100, help="commands per setting (default: 100)")
+    parser.add_argument("--platform", choices=list(OUTPUTS), default="cisco_ios")
+    parser.add_argument("--command", help="command to run (default: a table output of the platform)")
+    parser.add_argument("--no-textfsm", action="store_true", help="return raw output only")
+    parser.add_argument("--devices", type=int, default=8, help="mock devices, commands are spread over them (default: 8)")
+    parser.add_argument("--rows", type=int, default=48, help="rows of table outputs (default: 48)")
+    parser.add_argument("--delay", type=float, default=0.2, help="device delay before each output in seconds (default: 0.2)")
+    parser.add_argument("--vty-lines", type=int, default=64, help="concurrent sessions per mock device (default: 64)")
+    parser.add_argument("--redis", default="redis://127.0.0.1:6379", help="Redis URL without DB number")
+    parser.add_argument("--port", type=int, default=2222)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    command = args.command or DEFAULT_COMMANDS[args.platform]
+    use_textfsm = not args.no_textfsm
+    results = []
+    # per-device slots would cap throughput at devices x SSH_HOST_LIMIT, the mock vty limit applies instead
+    os.environ.update({"REDIS_URL": args.redis, "SSH_HOST_LIMIT": str(args.vty_lines), "SSH_HOST_LIMITS": "{}"})
+    with MockSshServer(args.devices, args.platform, args.rows, args.delay, args.vty_lines, args.port) as server:
+        if args.mode == "direct":
+            for concurrency in [ int(e) for e in args.concurrency.split(",") ]:
+                results.append(bench_direct(server, concurrency, args.commands, command, use_textfsm))
+        else:
+            for setting in args.pools.split(","):
+                pool, concurrency = setting.split(":")
+                results.append(bench_celery(server, pool, int(concurrency), args.commands, command, use_textfsm, args.redis))
+
+    parse_ms = bench_parse(args.platform, command, args.rows) if use_textfsm and command in OUTPUTS[args.platform] else None
+    print(f"{'mode':>8} {'setting':>14} {'commands':>9} {'errors':>7} {'cmd/s':>9} {'p50_ms':>9} {'connect_ms':>11} {'command_ms':>11}")
+    for r in results:
+        print(" ".join(f"{str(r[k] if r[k] is not None else '-'):>{w}}" for k,w in [("mode",8),("setting",14),("commands",9),("errors",7),("commands_per_s",9),("p50_ms",9),("connect_ms",11),("command_ms",11)]))
+    if parse_ms is not None:
+        print(f"TextFSM parse of '{command}' ({args.rows} rows): {parse_ms} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results, "parse_ms": parse_ms}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
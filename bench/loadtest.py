@@ -0,0 +1,278 @@
+# End-to-end load test of the web tier
+# Starts the mock upstream APIs, a stub LDAPS server, gunicorn (app:app) and the Celery workers
+# (interactive + bulk queues, and ssh queue),
+# then drives operator flows with an increasing number of concurrent virtual users:
+# - sdwan_index:  SD-WAN index page + device list API
+# - sdwan_device: device page + template values + monitor actions
+# - route_table:  device route table (filtered client side)
+# - ssh_task:     ssh_cmd task creation, then polling until ready ("task" = end to end)
+# and reports p50 / p95 / p99 latency and error rate per route and concurrency step.
+#
+# Redis is not started: point --redis at a disposable instance (DB0..DB2 are used as in production).
+# SSH tasks target --ssh-target (nothing listens there by default: tasks fail fast but still
+# exercise the queue and the polling path), or mock devices with --mock-ssh (see bench/mockssh.py).
+#
+# usage:
+#   python -m bench.loadtest --concurrency 1,5,10,25,50 --duration 30
+#   python -m bench.loadtest --url http://127.0.0.1:5000 ...   (app and worker already running)
+import os
+import re
+import sys
+import json
+import time
+import random
+import signal
+import asyncio
+import argparse
+import contextlib
+import subprocess
+from collections import defaultdict
+from typing import Any, Optional
+
+import httpx
+
+from bench.mockapi import MockServer, sdwan_edges
+from bench.stubldap import StubLdapServer, USER_PREFIX, PASSWORD, SERVICE_DN, BASE_DN, GROUPS
+from bench.mockssh import MockSshServer
+from tasks import SSH_QUEUE, INTERACTIVE_QUEUE, BULK_QUEUE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FABRIC = "BENCH"
+CSRF_TOKEN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+TASK_POLL_INTERVAL = 0.5
+TASK_TIMEOUT = 60.0
+
+# Flow weights (share of virtual user iterations)
+FLOWS = {
+    "sdwan_index": 3,
+    "sdwan_device": 3,
+    "route_table": 2,
+    "ssh_task": 2,
+}
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def add(self, route:str, latency:float, ok:bool):
+        self.latencies[route].append(latency)
+        if not ok:
+            self.errors[route] += 1
+
+def percentile(values:list[float], p:float)->float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))] if values else 0.0
+
+class VirtualUser:
+    def __init__(self, base_url:str, username:str, stats:Stats, devices:list[str], ssh_targets:list[tuple[str, int]], think:float):
+        self.base_url = base_url
+        self.username = username
+        self.stats = stats
+        self.devices = devices
+        self.ssh_targets = ssh_targets
+        self.think = think
+        # Fetch metadata as sent by browsers, so tasks get the priority of UI requests
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=60.0, follow_redirects=False, headers={"Sec-Fetch-Site": "same-origin"})
+
+    async def request(self, route:str, method:str, url:str, **kwargs)->Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            r = await self.client.request(method, url, **kwargs)
+            # redirects to /login mean the session was lost
+            ok = r.status_code < 400 and not (r.status_code == 302 and "/login" in r.headers.get("location", ""))
+        except httpx.HTTPError:
+            r, ok = None, False
+        self.stats.add(route, time.perf_counter() - start, ok)
+        return r if ok else None
+
+    async def login(self)->bool:
+        r = await self.request("GET /login", "GET", "/login")
+        token = CSRF_TOKEN.search(r.text) if r is not None else None
+        if not token:
+            return False
+        r = await self.request("POST /login", "POST", "/login", data={
+            "csrf_token": token.group(1),
+            "username": self.username,
+            "password": PASSWORD,
+            "submit": "Login"
+        })
+        return r is not None and r.status_code == 302
+
+    async def sdwan_index(self):
+        await self.request("GET /ui/sdwan/", "GET", "/ui/sdwan/")
+        await self.request("GET /api/sdwan/<fabric>/device", "GET", f"/api/sdwan/{FABRIC}/device")
+
+    async def sdwan_device(self):
+        device = random.choice(self.devices)
+        await self.request("GET /ui/sdwan/<fabric>/<id>", "GET", f"/ui/sdwan/{FABRIC}/{device}")
+        template = f"template-{int(device.split('-')[-1]) % 20}"
+        await asyncio.gather(
+            self.request("GET /api/sdwan/<fabric>/device/<id>/template_values/<template>", "GET", f"/api/sdwan/{FABRIC}/device/{device}/template_values/{template}"),
+            self.request("GET /api/sdwan/<fabric>/device/<id>/monitor_actions", "GET", f"/api/sdwan/{FABRIC}/device/{device}/monitor_actions"),
+        )
+
+    async def route_table(self):
+        device = random.choice(self.devices)
+        await self.request("GET /api/sdwan/<fabric>/device/<id>/route_table", "GET", f"/api/sdwan/{FABRIC}/device/{device}/route_table")
+
+    async def ssh_task(self):
+        start = time.perf_counter()
+        host, port = random.choice(self.ssh_targets)
+        r = await self.request("POST /api/tasks/", "POST", "/api/tasks/", json={
+            "type": "ssh_cmd",
+            "data": {"ip_address": host, "port": port, "cmd": "show version", "device_type": "cisco_ios", "use_textfsm": True}
+        })
+        if r is None:
+            self.stats.add("task (create to ready)", time.perf_counter() - start, False)
+            return
+        task_id = r.json()["task_id"]
+        deadline = time.monotonic() + TASK_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(TASK_POLL_INTERVAL)
+            r = await self.request("GET /api/tasks/<id>", "GET", f"/api/tasks/{task_id}")
+            if r is not None and r.json().get("ready"):
+                self.stats.add("task (create to ready)", time.perf_counter() - start, bool(r.json().get("success")))
+                return
+        self.stats.add("task (create to ready)", time.perf_counter() - start, False)
+
+    async def run(self, until:float):
+        flows = list(FLOWS)
+        weights = list(FLOWS.values())
+        while time.monotonic() < until:
+            await getattr(self, random.choices(flows, weights)[0])()
+            await asyncio.sleep(random.expovariate(1 / self.think) if self.think else 0)
+
+async def run_step(base_url:str, concurrency:int, duration:float, devices:list[str], ssh_targets:list[tuple[str, int]], think:float)->tuple[Stats, float]:
+    stats = Stats()
+    users = [ VirtualUser(base_url, f"{USER_PREFIX}{i}", stats, devices, ssh_targets, think) for i in range(concurrency) ]
+    logged_in = await asyncio.gather(*(u.login() for u in users))
+    users = [ u for u,ok in zip(users, logged_in) if ok ]
+    start = time.monotonic()
+    await asyncio.gather(*(u.run(start + duration) for u in users))
+    elapsed = time.monotonic() - start
+    await asyncio.gather(*(u.client.aclose() for u in users))
+    return stats, elapsed
+
+def report(concurrency:int, stats:Stats, elapsed:float)->list[dict[str, Any]]:
+    rows = []
+    for route in sorted(stats.latencies):
+        values = stats.latencies[route]
+        rows.append({
+            "concurrency": concurrency,
+            "route": route,
+            "count": len(values),
+            "rps": round(len(values) / elapsed, 2),
+            "error_pct": round(stats.errors[route] / len(values) * 100, 1),
+            "p50_ms": round(percentile(values, 50) * 1000, 1),
+            "p95_ms": round(percentile(values, 95) * 1000, 1),
+            "p99_ms": round(percentile(values, 99) * 1000, 1),
+        })
+    print(f"\n== {concurrency} concurrent users, {elapsed:.0f}s")
+    print(f"{'route':<64} {'count':>7} {'rps':>7} {'err%':>6} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9}")
+    for r in rows:
+        print(f"{r['route']:<64} {r['count']:>7} {r['rps']:>7} {r['error_pct']:>6} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+    return rows
+
+# Environment of the app and worker under test (production settings, test endpoints)
+def app_environment(args, mock:MockServer, ldap:StubLdapServer)->dict[str, str]:
+    fabric = {"name": FABRIC, "host": mock.host, "port": mock.port, "username": "admin", "password": "admin"}
+    return os.environ | {
+        "FLASK_APP": "app",
+        "FLASK_ENV": "production",
+        "REDIS_URL": args.redis,
+        "LDAP_HOST": ldap.address,
+        "LDAP_USERNAME": SERVICE_DN,
+        "LDAP_PASSWORD": "service",
+        "LDAP_BASE_DN": BASE_DN,
+        "LDAP_ROLES": json.dumps({ role:GROUPS for role in ["sdwan_admin", "lan_admin", "wlan_admin"] }),
+        "DNS_SERVERS": json.dumps(["127.0.0.1"]),
+        "DNS_SUFFIXES": json.dumps([]),
+        "SDWAN_FABRICS": json.dumps([fabric]),
+        "DNAC_FABRICS": json.dumps([{"name": "DNAC", "host": mock.address, "username": "admin", "password": "admin"}]),
+        "MERAKI_FABRICS": json.dumps([]),
+    }
+
+def wait_http(url:str, timeout:float=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=2.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.5)
+    raise RuntimeError(f"{url} did not answer within {timeout}s")
+
+def stop(process:subprocess.Popen):
+    if process and process.poll() is None:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the web tier with scripted operator flows")
+    parser.add_argument("--concurrency", default="1,5,10,25", help="comma separated virtual user counts (default: 1,5,10,25)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per concurrency step (default: 30)")
+    parser.add_argument("--think", type=float, default=1.0, help="mean think time between flows in seconds (default: 1.0)")
+    parser.add_argument("--fleet", type=int, default=1000, help="mock SD-WAN fleet size (default: 1000)")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock upstream latency in seconds (default: 0.05)")
+    parser.add_argument("--redis", default="redis://127.0.0.1:6379", help="Redis URL without DB number")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers (default: 1, as in the Dockerfile)")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads (default: 4, as in the Dockerfile)")
+    parser.add_argument("--worker-args", default="--concurrency=8", help="extra Celery worker arguments (default: --concurrency=8)")
+    parser.add_argument("--ssh-worker-args", default="--pool=gevent --concurrency=200", help="extra Celery ssh worker arguments (default: --pool=gevent --concurrency=200)")
+    parser.add_argument("--ssh-target", default="127.0.0.1:2222", help="host:port used by ssh_cmd tasks")
+    parser.add_argument("--mock-ssh", type=int, default=0, metavar="DEVICES", help="start this many mock SSH devices and target them instead")
+    parser.add_argument("--port", type=int, default=5055, help="gunicorn port")
+    parser.add_argument("--url", help="test an already running app (the app must use this script's mock upstreams and stub LDAP)")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    host, port = args.ssh_target.rsplit(":", 1)
+    ssh_targets = [(host, int(port))]
+    devices = [ d["uuid"] for d in sdwan_edges(args.fleet) ]
+    results = []
+
+    with contextlib.ExitStack() as stack:
+        mock = stack.enter_context(MockServer(args.fleet, latency=args.latency))
+        ldap = stack.enter_context(StubLdapServer())
+        if args.mock_ssh:
+            ssh = stack.enter_context(MockSshServer(devices=args.mock_ssh, delay=0.2))
+            ssh_targets = [ (ssh.host, port) for port in ssh.ports ]
+        web = worker = ssh_worker = None
+        base_url = args.url
+        try:
+            if base_url is None:
+                env = app_environment(args, mock, ldap)
+                base_url = f"http://127.0.0.1:{args.port}"
+                web = subprocess.Popen(
+                    [sys.executable, "-m", "gunicorn", "--chdir", ROOT, "--bind", f"127.0.0.1:{args.port}", "app:app",
+                     "--workers", str(args.workers), "--threads", str(args.threads), "--log-level", "warning"],
+                    env=env, cwd=ROOT
+                )
+                worker = subprocess.Popen(
+                    [sys.executable, "-m", "celery", "-A", "worker", "worker", "-Q", f"{INTERACTIVE_QUEUE},{BULK_QUEUE}", "-n", "loadtest@%h", "--loglevel=WARNING", *args.worker_args.split()],
+                    env=env, cwd=ROOT
+                )
+                ssh_worker = subprocess.Popen(
+                    [sys.executable, "-m", "celery", "-A", "worker", "worker", "-Q", SSH_QUEUE, "-n", "loadtest-ssh@%h", "--loglevel=WARNING", *args.ssh_worker_args.split()],
+                    env=env, cwd=ROOT
+                )
+                wait_http(f"{base_url}/login")
+
+            for concurrency in [ int(e) for e in args.concurrency.split(",") ]:
+                stats, elapsed = asyncio.run(run_step(base_url, concurrency, args.duration, devices, ssh_targets, args.think))
+                results += report(concurrency, stats, elapsed)
+        finally:
+            stop(web)
+            stop(worker)
+            stop(ssh_worker)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+# Local stand-in for vManage, DNAC, Meraki and Infoblox APIs
+# - deterministic fleets of configurable size (same seed -> same devices)
+# - injected per-request latency (+ jitter)
+# - served over HTTPS (self-signed) by uvicorn in a separate process, so the
+#   server does not compete with the benchmarked client for the GIL
+#
+# usage:
+#   with MockServer(fleet=1000, latency=0.05) as server:
+#       vmanage = Vmanage(server.host, "admin", "admin", port=server.port)
+#
+# standalone: python -m bench.mockapi --fleet 5000 --latency 0.05 --port 8443
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import ipaddress
+import multiprocessing
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlencode
+from datetime import datetime, timedelta, timezone
+
+import uvicorn
+
+WAPI = "v2.10"
+MERAKI_ORG = "123456"
+DNAC_PAGE_CAP = 500
+MERAKI_PAGE_CAP = 1000
+INFOBLOX_PAGE_CAP = 1000
+SEED = 42
+
+# Fleet generators (plain API dictionaries, as returned by the real controllers)
+def sdwan_controllers()->list[dict[str, Any]]:
+    return [
+        {
+            "uuid": f"controller-{i}",
+            "personality": persona,
+            "deviceModel": model,
+            "host-name": f"{persona.upper()}-{i:02d}",
+            "system-ip": f"1.1.1.{i + 1}",
+            "site-id": "1",
+            "version": "20.12.4",
+            "validity": "valid",
+            "managed-by": "Unmanaged",
+            "reachability": "reachable",
+            "configStatusMessage": "In Sync",
+        }
+        for i,(persona,model) in enumerate([("vmanage","vmanage"),("vsmart","vsmart"),("vbond","vedge-cloud")])
+    ]
+
+def sdwan_edges(count:int, seed:int=SEED)->list[dict[str, Any]]:
+    rnd = random.Random(seed)
+    base = int(ipaddress.IPv4Address("10.0.0.1"))
+    now = int(datetime.now(timezone.utc).timestamp() * 1000)
+    edges = []
+    for i in range(count):
+        edges.append({
+            "uuid": f"C8K-{i:08d}",
+            "personality": "vedge",
+            "deviceModel": rnd.choice(["vedge-C8300-1N1S-4T2X", "vedge-C8200L-1N-4T", "vedge-ISR-4331"]),
+            "host-name": f"EDGE{i:05d}",
+            "system-ip": str(ipaddress.IPv4Address(base + i)),
+            "site-id": str(1000 + i // 2),
+            "version": rnd.choice(["17.9.5a", "17.12.4", "17.12.3a"]),
+            "templateId": f"template-{i % 20}",
+            "template": f"TPL-EDGE-{i % 20}",
+            "validity": "valid",
+            "managed-by": "vmanage",
+            "reachability": "reachable" if rnd.random() > 0.02 else "unreachable",
+            "configStatusMessage": "In Sync" if rnd.random() > 0.05 else "Out of Sync",
+            "latitude": str(round(rnd.uniform(42.0, 51.0), 4)),
+            "longitude": str(round(rnd.uniform(-4.0, 8.0), 4)),
+            "uptime-date": now - rnd.randint(1, 400) * 86400000,
+            "deviceCSR": "-----BEGIN CERTIFICATE REQUEST-----" + "A" * 900,
+        })
+    return edges
+
+def sdwan_interfaces(system_ip:str)->list[dict[str, Any]]:
+    ip = ipaddress.IPv4Address(system_ip)
+    return [
+        {"ifname": f"GigabitEthernet0/0/{i}", "description": f"uplink {i}", "interface-type": "ethernet",
+         "hwaddr": f"00:11:22:33:{i:02x}:01", "vpn-id": str(i), "ip-address": str(ip + 256 * (i + 1)),
+         "ipv4-subnet-mask": "255.255.255.0", "vdevice-name": system_ip}
+        for i in range(4)
+    ]
+
+def sdwan_tlocs(system_ip:str)->list[dict[str, Any]]:
+    return [
+        {"site-id": "1000", "ip": system_ip, "tloc-private-ip": "192.168.0.2", "tloc-public-ip": "203.0.113.2",
+         "preference": "0", "weight": "1", "encap": "ipsec", "color": color}
+        for color in ["mpls", "biz-internet"]
+    ]
+
+def sdwan_vrrp(system_ip:str)->list[dict[str, Any]]:
+    return [
+        {"if-name": "GigabitEthernet0/0/1.100", "virtual-ip": "10.100.0.1", "group-id": "1", "priority": "110",
+         "preempt": "true", "vrrp-state": "proto-state-master"}
+    ]
+
+def sdwan_routes(device:str, count:int=200)->list[dict[str, Any]]:
+    return [
+        {"vdevice-name": device, "vpn-id": str(i % 4), "prefix": f"10.{i // 256}.{i % 256}.0/24", "protocol": "omp" if i % 5 else "connected",
+         "nexthop-addr": "1.1.1.2", "nexthop-ifname": "", "color": "mpls" if i % 2 else "biz-internet", "status": "Installed"}
+        for i in range(count)
+    ]
+
+def dnac_devices(count:int, seed:int=SEED)->list[dict[str, Any]]:
+    rnd = random.Random(seed)
+    base = int(ipaddress.IPv4Address("10.128.0.1"))
+    devices = []
+    for i in range(count):
+        stack = rnd.choice([1, 1, 2, 4])
+        devices.append({
+            "id": f"00000000-0000-0000-0000-{i:012d}",
+            "name": f"sw{i:05d}.net.company.com",
+            "managementIpAddress": str(ipaddress.IPv4Address(base + i)),
+            "deviceRole": rnd.choice(["ACCESS", "ACCESS", "DISTRIBUTION", "CORE"]),
+            "softwareVersion": rnd.choice(["17.9.5", "17.12.4"]),
+            "platformId": ", ".join(["C9300-48P"] * stack),
+            "serialNumber": ", ".join(f"FOC{i:05d}{s}" for s in range(stack)),
+            "upTime": rnd.randint(1, 400) * 86400,
+            "collectionStatus": "Managed",
+            "reachabilityStatus": "Reachable",
+            "family": "Switches and Hubs",
+        })
+    return devices
+
+def meraki_devices(count:int, seed:int=SEED)->list[dict[str, Any]]:
+    rnd = random.Random(seed)
+    return [
+        {
+            "serial": f"Q2XX-{i // 10000:04d}-{i % 10000:04d}",
+            "name": f"AP{i:05d}",
+            "networkId": f"L_{i // 20:06d}",
+            "firmware": "wireless-29-7",
+            "model": rnd.choice(["MR36", "MR46", "CW9166I"]),
+            "productType": "wireless",
+            "lanIp": f"10.{64 + i // 65536}.{(i // 256) % 256}.{i % 256}",
+            "lat": round(rnd.uniform(42.0, 51.0), 4),
+            "lng": round(rnd.uniform(-4.0, 8.0), 4),
+            "url": f"https://n1.meraki.com/o/x/manage/nodes/new_list/{i}",
+            "tags": ["office"],
+        }
+        for i in range(count)
+    ]
+
+def infoblox_fixedaddresses(count:int, seed:int=SEED)->list[dict[str, Any]]:
+    base = int(ipaddress.IPv4Address("10.192.0.1"))
+    return [
+        {
+            "_ref": f"fixedaddress/ZG5z{i:010d}:{ipaddress.IPv4Address(base + i)}/default",
+            "ipv4addr": str(ipaddress.IPv4Address(base + i)),
+            "mac": f"00:50:56:{(i >> 16) & 0xff:02x}:{(i >> 8) & 0xff:02x}:{i & 0xff:02x}",
+            "name": f"host{i:05d}",
+            "comment": "benchmark",
+        }
+        for i in range(count)
+    ]
+
+class MockApi:
+    """
+    ASGI application emulating the upstream endpoints used by lib/ clients.
+
+    Pagination follows each product: DNAC offset/limit (1-based offset, page cap),
+    Meraki perPage/startingAfter with a Link header, Infoblox _paging/_page_id.
+    """
+    def __init__(self, fleet:int, latency:float=0.0, jitter:float=0.0, dnac_page_cap:int=DNAC_PAGE_CAP, seed:int=SEED):
+        self.latency = latency
+        self.jitter = jitter
+        self.dnac_page_cap = dnac_page_cap
+        self.rnd = random.Random(seed)
+        self.controllers = sdwan_controllers()
+        self.edges = sdwan_edges(fleet, seed)
+        self.dnac = dnac_devices(fleet, seed)
+        self.dnac_index = { d["id"]:d for d in self.dnac }
+        self.meraki = meraki_devices(fleet, seed)
+        self.meraki_index = { d["serial"]:i for i,d in enumerate(self.meraki) }
+        self.infoblox = infoblox_fixedaddresses(fleet, seed)
+        self.requests = 0
+        self.routes: list[tuple[str, str, Callable]] = [
+            ("POST", "/j_security_check", self.vmanage_login),
+            ("GET", "/dataservice/client/token", self.vmanage_token),
+            ("GET", "/dataservice/system/device/controllers", self.vmanage_controllers),
+            ("GET", "/dataservice/system/device/vedges", self.vmanage_edges),
+            ("GET", "/dataservice/device", self.vmanage_status),
+            ("GET", "/dataservice/device/interface/synced", self.vmanage_per_device(sdwan_interfaces)),
+            ("GET", "/dataservice/device/omp/tlocs/advertised", self.vmanage_per_device(sdwan_tlocs)),
+            ("GET", "/dataservice/device/vrrp", self.vmanage_per_device(sdwan_vrrp)),
+            ("GET", "/dataservice/device/ip/ipRoutes", self.vmanage_per_device(sdwan_routes)),
+            ("GET", "/dataservice/client/monitor/device/options", self.vmanage_monitor_options),
+            ("POST", "/dataservice/template/device/config/input", self.vmanage_template_input),
+            ("POST", "/dna/system/api/v1/auth/token", self.dnac_token),
+            ("GET", "/dna/data/api/v1/networkDevices/count", self.dnac_count),
+            ("GET", "/dna/data/api/v1/networkDevices", self.dnac_devices),
+            ("GET", f"/api/v1/organizations/{MERAKI_ORG}/devices", self.meraki_devices),
+            ("GET", f"/wapi/{WAPI}/fixedaddress", self.infoblox_fixedaddress),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                await send({"type": "lifespan.startup.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+        self.requests += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self.rnd.uniform(0, self.jitter))
+
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        request = {
+            "query": parse_qs(scope["query_string"].decode()),
+            "host": dict(scope["headers"]).get(b"host", b"").decode(),
+            "json": json.loads(body) if body.startswith((b"{", b"[")) else None
+        }
+        for method, path, handler in self.routes:
+            if scope["method"] == method and scope["path"] == path:
+                status, body, headers = handler(request)
+                break
+        else:
+            status, body, headers = 404, {"error": f"No mock for {scope['method']} {scope['path']}"}, []
+
+        payload = body.encode() if isinstance(body, str) else json.dumps(body).encode()
+        content_type = b"text/plain" if isinstance(body, str) else b"application/json"
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", content_type), (b"content-length", str(len(payload)).encode())] + headers
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+    # vManage
+    def vmanage_login(self, request):
+        return 200, "", [(b"set-cookie", b"JSESSIONID=benchmark; Path=/; Secure; HttpOnly")]
+
+    def vmanage_token(self, request):
+        return 200, "benchmark-xsrf-token", []
+
+    def vmanage_controllers(self, request):
+        return 200, {"data": self.controllers}, []
+
+    def vmanage_edges(self, request):
+        return 200, {"data": self.edges}, []
+
+    def vmanage_status(self, request):
+        return 200, {"data": self.controllers + self.edges}, []
+
+    def vmanage_per_device(self, generator):
+        def handler(request):
+            return 200, {"data": generator(request["query"].get("deviceId", ["10.0.0.1"])[0])}, []
+        return handler
+
+    def vmanage_monitor_options(self, request):
+        return 200, {"data": [
+            {"name": name, "uri": f"dataservice/device/{name.lower()}", "parent": "Real Time", "personality": ["vedge"]}
+            for name in ["Interface", "VRRP", "OMP", "BFD", "Control"]
+        ]}, []
+
+    def vmanage_template_input(self, request):
+        devices = (request["json"] or {}).get("deviceIds", [])
+        return 200, {
+            "header": {"columns": [{"property": p} for p in ["csv-status", "csv-deviceId", "csv-host-name", "/0/vpn_if_name/interface/if-name"]]},
+            "data": [ {"csv-status": "complete", "csv-deviceId": uuid, "csv-host-name": uuid, "/0/vpn_if_name/interface/if-name": "GigabitEthernet0/0/0"} for uuid in devices ]
+        }, []
+
+    # DNAC
+    def dnac_token(self, request):
+        return 200, {"Token": "benchmark-token"}, []
+
+    def dnac_count(self, request):
+        return 200, {"response": {"count": len(self.dnac)}, "version": "1.0"}, []
+
+    def dnac_devices(self, request):
+        query = request["query"]
+        limit = min(int(query.get("limit", [str(self.dnac_page_cap)])[0]), self.dnac_page_cap)
+        if "id" in query:
+            ids = [ i for value in query["id"] for i in value.split(",") ]
+            return 200, {"response": [ self.dnac_index[i] for i in ids if i in self.dnac_index ][:limit], "version": "1.0"}, []
+        offset = max(int(query.get("offset", ["1"])[0]), 1)
+        return 200, {"response": self.dnac[offset - 1:offset - 1 + limit], "version": "1.0"}, []
+
+    # Meraki
+    def meraki_devices(self, request):
+        query = request["query"]
+        per_page = min(int(query.get("perPage", ["1000"])[0]), MERAKI_PAGE_CAP)
+        start = self.meraki_index[query["startingAfter"][0]] + 1 if "startingAfter" in query else 0
+        page = self.meraki[start:start + per_page]
+        headers = []
+        if start + per_page < len(self.meraki):
+            next_query = urlencode({"perPage": per_page, "startingAfter": page[-1]["serial"]})
+            link = f"<https://{request['host']}/api/v1/organizations/{MERAKI_ORG}/devices?{next_query}>; rel=next"
+            headers.append((b"link", link.encode()))
+        return 200, page, headers
+
+    # Infoblox (page ids encode offset and page size, since later pages only send _page_id)
+    def infoblox_fixedaddress(self, request):
+        query = request["query"]
+        if "_page_id" in query:
+            offset, size = (int(e) for e in query["_page_id"][0].split(":"))
+        else:
+            offset, size = 0, min(int(query.get("_max_results", ["1000"])[0]), INFOBLOX_PAGE_CAP)
+        result = {"result": self.infoblox[offset:offset + size]}
+        if offset + size < len(self.infoblox):
+            result["next_page_id"] = f"{offset + size}:{size}"
+        return 200, result, []
+
+# Self-signed certificate for the mock HTTPS endpoint (clients run with verify=False)
+def self_signed_certificate(folder:str)->tuple[str, str]:
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(days=1))
+        .not_valid_after(now + timedelta(days=30))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost"), x509.IPAddress(ipaddress.IPv4Address("127.0.0.1"))]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    certfile = os.path.join(folder, "cert.pem")
+    keyfile = os.path.join(folder, "key.pem")
+    with open(certfile, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(keyfile, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    return certfile, keyfile
+
+def serve(port:int, fleet:int, latency:float, jitter:float, dnac_page_cap:int, certfile:str, keyfile:str):
+    app = MockApi(fleet, latency, jitter, dnac_page_cap)
+    uvicorn.run(app, host="127.0.0.1", port=port, ssl_certfile=certfile, ssl_keyfile=keyfile, log_level="warning", backlog=4096)
+
+class MockServer:
+    """
+    Run MockApi in a child process for the duration of a `with` block.
+    """
+    def __init__(self, fleet:int, latency:float=0.0, jitter:float=0.0, port:int=8443, dnac_page_cap:int=DNAC_PAGE_CAP, startup_timeout:float=120.0):
+        self.fleet = fleet
+        self.latency = latency
+        self.jitter = jitter
+        self.port = port
+        self.dnac_page_cap = dnac_page_cap
+        self.startup_timeout = startup_timeout
+        self.host = "127.0.0.1"
+        self.process = None
+        self.folder = None
+
+    @property
+    def address(self)->str:
+        return f"{self.host}:{self.port}"
+
+    def __enter__(self)->"MockServer":
+        import httpx
+        self.folder = tempfile.TemporaryDirectory()
+        certfile, keyfile = self_signed_certificate(self.folder.name)
+        self.process = multiprocessing.get_context("spawn").Process(
+            target=serve,
+            args=(self.port, self.fleet, self.latency, self.jitter, self.dnac_page_cap, certfile, keyfile),
+            daemon=True
+        )
+        self.process.start()
+        # wait until the server answers (large fleets take a while to generate)
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            try:
+                httpx.get(f"https://{self.address}/dataservice/client/token", verify=False, timeout=1.0)
+                return self
+            except httpx.HTTPError:
+                if not self.process.is_alive():
+                    break
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"Mock server did not start on {self.address}")
+
+    def __exit__(self, *exc):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join(timeout=10)
+        if self.folder is not None:
+            self.folder.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock vManage / DNAC / Meraki / Infoblox API")
+    parser.add_argument("--fleet", type=int, default=1000, help="devices per product (default: 1000)")
+    parser.add_argument("--latency", type=float, default=0.0, help="added latency per request in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency per request in seconds")
+    parser.add_argument("--dnac-page-cap", type=int, default=DNAC_PAGE_CAP, help="max DNAC devices per page")
+    parser.add_argument("--port", type=int, default=8443)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as folder:
+        certfile, keyfile = self_signed_certificate(folder)
+        print(f"Mock API on https://127.0.0.1:{args.port} (fleet={args.fleet}, latency={args.latency}s)")
+        serve(args.port, args.fleet, args.latency, args.jitter, args.dnac_page_cap, certfile, keyfile)
@@ -0,0 +1,287 @@
+# Local SSH server emulating Cisco IOS and NX-OS CLI sessions (paramiko)
+# - prompt handling as expected by netmiko (terminal length/width, command echo, prompt after output)
+# - canned "show" outputs with configurable size (rows) and per-command delay
+# - optional vty limit per device (sessions over the limit are refused, as on a real switch)
+# - one device per port, starting at --port (e.g. 2222 = SW0000, 2223 = SW0001, ...)
+# Any username / password is accepted.
+#
+# usage:
+#   with MockSshServer(devices=4, rows=500, delay=0.2) as ssh:
+#       run_ssh_command(ssh.host, "user", "pass", "show ip interface brief", port=ssh.ports[0])
+#
+# standalone: python -m bench.mockssh --devices 4 --rows 500 --delay 0.2 --port 2222
+import time
+import socket
+import argparse
+import threading
+import multiprocessing
+from typing import Callable
+
+import paramiko
+
+VTY_LINES = 16
+
+# Canned outputs: command -> function(hostname, rows) returning the CLI output
+def ios_show_version(hostname:str, rows:int)->str:
+    return "\n".join([
+        "Cisco IOS XE Software, Version 17.09.05",
+        "Cisco IOS Software [Cupertino], Catalyst L3 Switch Software (CAT9K_IOSXE), Version 17.9.5, RELEASE SOFTWARE (fc4)",
+        "Technical Support: http://www.cisco.com/techsupport",
+        "Copyright (c) 1986-2024 by Cisco Systems, Inc.",
+        "",
+        "ROM: IOS-XE ROMMON",
+        "BOOTLDR: System Bootstrap, Version 17.9.1r, RELEASE SOFTWARE (P)",
+        "",
+        f"{hostname} uptime is 1 year, 12 weeks, 3 days, 4 hours, 5 minutes",
+        "Uptime for this control processor is 1 year, 12 weeks, 3 days, 4 hours, 7 minutes",
+        "System returned to ROM by Reload Command",
+        'System image file is "flash:packages.conf"',
+        "Last reload reason: Reload Command",
+        "",
+        "cisco C9300-48P (X86) processor with 1312935K/6147K bytes of memory.",
+        "Processor board ID FOC2345X0YZ",
+        "2048K bytes of non-volatile configuration memory.",
+        "",
+        "Base Ethernet MAC Address          : 00:11:22:33:44:00",
+        "Motherboard Serial Number          : FOC2345X0YZ",
+        "Model Number                       : C9300-48P",
+        "System Serial Number               : FOC2345X0YZ",
+        "",
+        "Configuration register is 0x102",
+    ])
+
+def ios_show_ip_interface_brief(hostname:str, rows:int)->str:
+    lines = ["Interface              IP-Address      OK? Method Status                Protocol"]
+    for i in range(rows):
+        name = f"GigabitEthernet{1 + i // 48}/0/{1 + i % 48}"
+        lines.append(f"{name:<23}unassigned      YES unset  {'up' if i % 3 else 'down':<22}{'up' if i % 3 else 'down'}")
+    lines.append(f"{'Vlan100':<23}10.0.100.2      YES NVRAM  up                    up")
+    return "\n".join(lines)
+
+def ios_show_interfaces_status(hostname:str, rows:int)->str:
+    lines = ["", "Port         Name               Status       Vlan       Duplex  Speed Type"]
+    for i in range(rows):
+        name = f"Gi{1 + i // 48}/0/{1 + i % 48}"
+        status = "connected" if i % 3 else "notconnect"
+        lines.append(f"{name:<13}{'user port':<19}{status:<13}{100 + i % 4:<11}{'a-full':<8}{'a-1000':<6}10/100/1000BaseTX")
+    return "\n".join(lines)
+
+def ios_show_logging(hostname:str, rows:int)->str:
+    return "\n".join(f"*Jan  1 00:{(i // 60) % 60:02d}:{i % 60:02d}.000: %LINK-3-UPDOWN: Interface GigabitEthernet1/0/{1 + i % 48}, changed state to up" for i in range(rows * 10))
+
+def ios_show_running_config(hostname:str, rows:int)->str:
+    lines = ["Building configuration...", "", "Current configuration : 123456 bytes", "!", f"hostname {hostname}", "!"]
+    for i in range(rows):
+        lines += [
+            f"interface GigabitEthernet{1 + i // 48}/0/{1 + i % 48}",
+            " description user port",
+            " switchport access vlan 100",
+            " switchport mode access",
+            " spanning-tree portfast",
+            "!",
+        ]
+    lines.append("end")
+    return "\n".join(lines)
+
+def nxos_show_version(hostname:str, rows:int)->str:
+    return "\n".join([
+        "Cisco Nexus Operating System (NX-OS) Software",
+        "Software",
+        "  BIOS: version 05.47",
+        "  NXOS: version 10.3(4a) [Maintenance Release]",
+        "Hardware",
+        "  cisco Nexus9000 C93180YC-FX Chassis",
+        "  Intel(R) Xeon(R) CPU D-1528 @ 1.90GHz with 24569356 kB of memory.",
+        "  Processor Board ID FDO23450ABC",
+        "",
+        f"  Device name: {hostname}",
+        "  bootflash:   53298520 kB",
+        "Kernel uptime is 412 day(s), 3 hour(s), 2 minute(s), 1 second(s)",
+    ])
+
+def nxos_show_interface_status(hostname:str, rows:int)->str:
+    lines = [
+        "--------------------------------------------------------------------------------",
+        "Port          Name               Status    Vlan      Duplex  Speed   Type",
+        "--------------------------------------------------------------------------------",
+    ]
+    for i in range(rows):
+        lines.append(f"{f'Eth1/{1 + i}':<14}{'server':<19}{'connected' if i % 3 else 'xcvrAbsen':<10}{'trunk':<10}{'full':<8}{'25G':<8}10Gbase-SR")
+    return "\n".join(lines)
+
+OUTPUTS: dict[str, dict[str, Callable[[str, int], str]]] = {
+    "cisco_ios": {
+        "show version": ios_show_version,
+        "show ip interface brief": ios_show_ip_interface_brief,
+        "show interfaces status": ios_show_interfaces_status,
+        "show logging": ios_show_logging,
+        "show running-config": ios_show_running_config,
+    },
+    "cisco_nxos": {
+        "show version": nxos_show_version,
+        "show interface status": nxos_show_interface_status,
+    },
+}
+
+# Session setup commands answered with the prompt only
+SETUP = ("terminal length", "terminal width", "terminal no monitor", "terminal monitor", "terminal exec prompt")
+
+class Server(paramiko.ServerInterface):
+    def __init__(self):
+        self.shell = threading.Event()
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell.set()
+        return True
+
+class Device:
+    def __init__(self, hostname:str, platform:str, rows:int, delay:float, vty_lines:int):
+        self.hostname = hostname
+        self.platform = platform
+        self.rows = rows
+        self.delay = delay
+        self.vty_lines = vty_lines
+        self.sessions = 0
+        self.lock = threading.Lock()
+        # outputs are rendered once, sessions only replay them
+        self.outputs = { command:render(hostname, rows).replace("\n", "\r\n") for command,render in OUTPUTS[platform].items() }
+
+    @property
+    def prompt(self)->str:
+        return f"{self.hostname}#"
+
+    def session(self, channel:paramiko.Channel):
+        channel.send(f"\r\n{self.prompt}")
+        buffer = ""
+        while True:
+            data = channel.recv(4096)
+            if not data:
+                return
+            buffer += data.decode(errors="replace")
+            while "\n" in buffer or "\r" in buffer:
+                index = min(i for i in (buffer.find("\n"), buffer.find("\r")) if i >= 0)
+                line, buffer = buffer[:index].strip(), buffer[index + 1:].lstrip("\r\n")
+                if line in ("exit", "logout"):
+                    return
+                channel.send(f"{line}\r\n")
+                if line and not line.startswith(SETUP):
+                    output = self.outputs.get(line)
+                    if self.delay:
+                        time.sleep(self.delay)
+                    if output is None:
+                        output = "% Invalid input detected at '^' marker."
+                    channel.sendall(f"{output}\r\n")
+                channel.send(self.prompt)
+
+    def handle(self, client:socket.socket, host_key:paramiko.PKey):
+        transport = paramiko.Transport(client)
+        transport.add_server_key(host_key)
+        server = Server()
+        try:
+            transport.start_server(server=server)
+            channel = transport.accept(timeout=30)
+            if channel is None or not server.shell.wait(timeout=30):
+                return
+            with self.lock:
+                refused = self.sessions >= self.vty_lines
+                if not refused:
+                    self.sessions += 1
+            if refused:
+                channel.send("% All vty lines in use\r\n")
+                return
+            try:
+                self.session(channel)
+            finally:
+                with self.lock:
+                    self.sessions -= 1
+        except (EOFError, OSError, paramiko.SSHException):
+            pass
+        finally:
+            transport.close()
+
+def serve(port:int, devices:int, platform:str, rows:int, delay:float, vty_lines:int):
+    host_key = paramiko.RSAKey.generate(2048)
+    listeners = []
+    for i in range(devices):
+        device = Device(f"SW{i:04d}", platform, rows, delay, vty_lines)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", port + i))
+        sock.listen(1024)
+        listeners.append((device, sock))
+
+    def accept(device, sock):
+        while True:
+            client, _ = sock.accept()
+            threading.Thread(target=device.handle, args=(client, host_key), daemon=True).start()
+
+    for device, sock in listeners:
+        threading.Thread(target=accept, args=(device, sock), daemon=True).start()
+    threading.Event().wait()
+
+class MockSshServer:
+    """
+    Run the mock SSH devices in a child process for the duration of a `with` block.
+    """
+    def __init__(self, devices:int=1, platform:str="cisco_ios", rows:int=48, delay:float=0.0, vty_lines:int=VTY_LINES, port:int=2222, startup_timeout:float=30.0):
+        self.devices = devices
+        self.platform = platform
+        self.rows = rows
+        self.delay = delay
+        self.vty_lines = vty_lines
+        self.port = port
+        self.startup_timeout = startup_timeout
+        self.host = "127.0.0.1"
+        self.process = None
+
+    @property
+    def ports(self)->list[int]:
+        return [ self.port + i for i in range(self.devices) ]
+
+    def __enter__(self)->"MockSshServer":
+        self.process = multiprocessing.get_context("spawn").Process(
+            target=serve,
+            args=(self.port, self.devices, self.platform, self.rows, self.delay, self.vty_lines),
+            daemon=True
+        )
+        self.process.start()
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection((self.host, self.ports[-1]), timeout=1.0).close()
+                return self
+            except OSError:
+                if not self.process.is_alive():
+                    break
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"Mock SSH server did not start on {self.host}:{self.port}")
+
+    def __exit__(self, *exc):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join(timeout=10)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Cisco IOS / NX-OS SSH devices")
+    parser.add_argument("--devices", type=int, default=1, help="number of devices (one port each)")
+    parser.add_argument("--platform", choices=list(OUTPUTS), default="cisco_ios")
+    parser.add_argument("--rows", type=int, default=48, help="rows of table outputs, e.g. interfaces (default: 48)")
+    parser.add_argument("--delay", type=float, default=0.0, help="delay before each command output in seconds")
+    parser.add_argument("--vty-lines", type=int, default=VTY_LINES, help=f"concurrent sessions per device (default: {VTY_LINES})")
+    parser.add_argument("--port", type=int, default=2222)
+    args = parser.parse_args()
+    print(f"Mock {args.platform} devices on 127.0.0.1:{args.port}-{args.port + args.devices - 1} (commands: {', '.join(OUTPUTS[args.platform])})")
+    serve(args.port, args.devices, args.platform, args.rows, args.delay, args.vty_lines)
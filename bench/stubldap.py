@@ -0,0 +1,259 @@
+# Stub LDAPS server for load tests (just enough of Active Directory for app.py)
+# - simple binds: the service account and any "<prefix><n>" user with the shared password
+# - searches: root DSE, user by sAMAccountName, group by cn, in-chain group membership
+# - WhoAmI extended operation (LDAP pool health check)
+# Every user is a member of every group, so all configured roles are granted.
+#
+# usage:
+#   with StubLdapServer(port=8636) as ldap:
+#       env["LDAP_HOST"] = ldap.address
+#
+# standalone: python -m bench.stubldap --port 8636
+import re
+import ssl
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import multiprocessing
+from typing import Optional
+
+from bench.mockapi import self_signed_certificate
+
+BASE_DN = "DC=bench,DC=local"
+USER_PREFIX = "loadtest"
+PASSWORD = "loadtest"
+SERVICE_DN = f"CN=yami-service,OU=Services,{BASE_DN}"
+GROUPS = ["yami-admins"]
+WHOAMI_OID = "1.3.6.1.4.1.4203.1.11.3"
+
+# Result codes
+SUCCESS = 0
+INVALID_CREDENTIALS = 49
+UNWILLING_TO_PERFORM = 53
+
+# BER encoding (definite lengths only, as used by LDAP)
+def ber_length(length:int)->bytes:
+    if length < 0x80:
+        return bytes([length])
+    raw = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([0x80 | len(raw)]) + raw
+
+def tlv(tag:int, value:bytes)->bytes:
+    return bytes([tag]) + ber_length(len(value)) + value
+
+def ber_int(value:int, tag:int=0x02)->bytes:
+    return tlv(tag, value.to_bytes(max(1, (value.bit_length() + 8) // 8), "big", signed=True))
+
+def ber_str(value:str, tag:int=0x04)->bytes:
+    return tlv(tag, value.encode())
+
+def ldap_result(tag:int, code:int, matched:str="", message:str="", extra:bytes=b"")->bytes:
+    return tlv(tag, ber_int(code, 0x0a) + ber_str(matched) + ber_str(message) + extra)
+
+def ldap_message(message_id:int, op:bytes)->bytes:
+    return tlv(0x30, ber_int(message_id) + op)
+
+def search_entry(dn:str, attributes:dict[str, list[str]])->bytes:
+    attrs = b"".join(tlv(0x30, ber_str(k) + tlv(0x31, b"".join(ber_str(v) for v in values))) for k,values in attributes.items())
+    return tlv(0x64, ber_str(dn) + tlv(0x30, attrs))
+
+# BER decoding
+def read_tlv(data:bytes, offset:int=0)->tuple[int, bytes, int]:
+    tag = data[offset]
+    length = data[offset + 1]
+    offset += 2
+    if length & 0x80:
+        count = length & 0x7f
+        length = int.from_bytes(data[offset:offset + count], "big")
+        offset += count
+    return tag, data[offset:offset + length], offset + length
+
+def read_all(data:bytes)->list[tuple[int, bytes]]:
+    items, offset = [], 0
+    while offset < len(data):
+        tag, value, offset = read_tlv(data, offset)
+        items.append((tag, value))
+    return items
+
+# LDAP filter (RFC 4511) to its string representation, e.g. (&(objectClass=group)(cn=x))
+def filter_to_string(tag:int, value:bytes)->str:
+    match tag:
+        case 0xa0 | 0xa1:
+            operator = "&" if tag == 0xa0 else "|"
+            return f"({operator}{''.join(filter_to_string(t, v) for t,v in read_all(value))})"
+        case 0xa2:
+            t, v = read_all(value)[0]
+            return f"(!{filter_to_string(t, v)})"
+        case 0xa3 | 0xa5 | 0xa6 | 0xa8:
+            (_, attr), (_, val) = read_all(value)
+            operator = {0xa3: "=", 0xa5: ">=", 0xa6: "<=", 0xa8: "~="}[tag]
+            return f"({attr.decode()}{operator}{val.decode()})"
+        case 0xa4:
+            (_, attr), (_, subs) = read_all(value)
+            parts = { t:v.decode() for t,v in read_all(subs) }
+            return f"({attr.decode()}={parts.get(0x80, '')}*{parts.get(0x81, '')}*{parts.get(0x82, '')})"
+        case 0x87:
+            return f"({value.decode()}=*)"
+        case 0xa9:
+            parts = { t:v.decode() for t,v in read_all(value) if t != 0x84 }
+            return f"({parts.get(0x82, '')}:{parts.get(0x81, '')}:={parts.get(0x83, '')})"
+    return "(unknown)"
+
+class StubDirectory:
+    def __init__(self, base_dn:str=BASE_DN, user_prefix:str=USER_PREFIX, password:str=PASSWORD, groups:list[str]=GROUPS):
+        self.base_dn = base_dn
+        self.user_prefix = user_prefix
+        self.password = password
+        self.groups = { f"CN={g},OU=Groups,{base_dn}":g for g in groups }
+
+    def user_dn(self, username:str)->str:
+        return f"CN={username},OU=Users,{self.base_dn}"
+
+    def bind(self, dn:str, password:str)->bool:
+        if not dn:
+            return True  # anonymous
+        if dn.lower() == SERVICE_DN.lower():
+            return True
+        return dn.lower().startswith(f"cn={self.user_prefix}") and password == self.password
+
+    def search(self, base:str, filter:str)->list[tuple[str, dict[str, list[str]]]]:
+        lowered = filter.lower()
+        # root DSE (no subschemaSubentry: clients skip schema download)
+        if base == "":
+            return [("", {"namingContexts": [self.base_dn], "supportedLDAPVersion": ["3"], "vendorName": ["yami stub"]})]
+        # user lookup
+        user = re.search(r"\(samaccountname=([^)]+)\)", lowered)
+        if user:
+            username = user.group(1)
+            if not username.startswith(self.user_prefix):
+                return []
+            return [(self.user_dn(username), {
+                "distinguishedName": [self.user_dn(username)],
+                "displayName": [f"Load Test {username}"],
+                "givenName": ["Load"],
+                "mail": [f"{username}@bench.local"],
+            })]
+        # groups: by cn, or by DN list for in-chain membership queries
+        if "objectclass=group" in lowered:
+            return [ (dn, {}) for dn,cn in self.groups.items() if f"(cn={cn.lower()})" in lowered or dn.lower() in lowered ]
+        return []
+
+async def handle(directory:StubDirectory, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+    bound_dn = ""
+    try:
+        while True:
+            header = await reader.readexactly(2)
+            extra = b""
+            if header[1] & 0x80:
+                extra = await reader.readexactly(header[1] & 0x7f)
+            length = int.from_bytes(extra, "big") if extra else header[1]
+            body = await reader.readexactly(length)
+            items = read_all(body)
+            message_id = int.from_bytes(items[0][1], "big", signed=True)
+            op_tag, op = items[1]
+
+            match op_tag:
+                # bind
+                case 0x60:
+                    _, name, auth = read_all(op)
+                    if auth[0] != 0x80:
+                        response = ldap_result(0x61, UNWILLING_TO_PERFORM, message="simple bind only")
+                    elif directory.bind(name[1].decode(), auth[1].decode()):
+                        bound_dn = name[1].decode()
+                        response = ldap_result(0x61, SUCCESS)
+                    else:
+                        response = ldap_result(0x61, INVALID_CREDENTIALS, message="80090308: LdapErr: DSID-0C09044E, data 52e")
+                    writer.write(ldap_message(message_id, response))
+                # unbind
+                case 0x42:
+                    break
+                # search
+                case 0x63:
+                    fields = read_all(op)
+                    base = fields[0][1].decode()
+                    filter = filter_to_string(*fields[6])
+                    for dn, attributes in directory.search(base, filter):
+                        writer.write(ldap_message(message_id, search_entry(dn, attributes)))
+                    writer.write(ldap_message(message_id, ldap_result(0x65, SUCCESS)))
+                # extended (WhoAmI only)
+                case 0x77:
+                    name = read_all(op)[0][1].decode()
+                    if name == WHOAMI_OID:
+                        response = ldap_result(0x78, SUCCESS, extra=ber_str(f"dn:{bound_dn}", 0x8b))
+                    else:
+                        response = ldap_result(0x78, UNWILLING_TO_PERFORM, message=f"unsupported extended operation {name}")
+                    writer.write(ldap_message(message_id, response))
+                # abandon: nothing to answer
+                case 0x50:
+                    pass
+                case _:
+                    writer.write(ldap_message(message_id, ldap_result(0x65, UNWILLING_TO_PERFORM, message="unsupported operation")))
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError, ssl.SSLError):
+        pass
+    finally:
+        writer.close()
+
+def serve(port:int, certfile:Optional[str], keyfile:Optional[str]):
+    directory = StubDirectory()
+    context = None
+    if certfile:
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(certfile, keyfile)
+
+    async def main():
+        server = await asyncio.start_server(lambda r,w: handle(directory, r, w), "127.0.0.1", port, ssl=context, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+class StubLdapServer:
+    """
+    Run the stub LDAPS server in a child process for the duration of a `with` block.
+    """
+    def __init__(self, port:int=8636, startup_timeout:float=30.0):
+        self.port = port
+        self.startup_timeout = startup_timeout
+        self.host = "127.0.0.1"
+        self.process = None
+        self.folder = None
+
+    @property
+    def address(self)->str:
+        return f"{self.host}:{self.port}"
+
+    def __enter__(self)->"StubLdapServer":
+        self.folder = tempfile.TemporaryDirectory()
+        certfile, keyfile = self_signed_certificate(self.folder.name)
+        self.process = multiprocessing.get_context("spawn").Process(target=serve, args=(self.port, certfile, keyfile), daemon=True)
+        self.process.start()
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection((self.host, self.port), timeout=1.0).close()
+                return self
+            except OSError:
+                if not self.process.is_alive():
+                    break
+                time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"Stub LDAP server did not start on {self.address}")
+
+    def __exit__(self, *exc):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join(timeout=10)
+        if self.folder is not None:
+            self.folder.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub LDAPS server for load tests")
+    parser.add_argument("--port", type=int, default=8636)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as folder:
+        certfile, keyfile = self_signed_certificate(folder)
+        print(f"Stub LDAPS on 127.0.0.1:{args.port} (users {USER_PREFIX}<n> / {PASSWORD}, service {SERVICE_DN})")
+        serve(args.port, certfile, keyfile)
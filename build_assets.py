@@ -0,0 +1,83 @@
+# Static asset build step
+# - copies every file from static/ to static/dist/ with a content hash in its name
+# - rewrites relative url(...) references in CSS to the hashed names
+# - writes gzip and brotli variants of text assets
+# - writes static/dist/manifest.json ({"css/ui.css": "css/ui.<hash>.css", ...}) used by asset_url()
+#
+# usage: python build_assets.py
+import os
+import re
+import gzip
+import json
+import shutil
+import hashlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST = "manifest.json"
+COMPRESS = (".css", ".js", ".svg", ".webmanifest", ".ico")
+CSS_URL = re.compile(r"""url\(\s*(["']?)(\./)?([^"')?#:]+)([?#][^"')]*)?\1\s*\)""")
+
+# Hashed file name, e.g. css/ui.css -> css/ui.0123456789ab.css
+def hashed_name(name:str, content:bytes)->str:
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    base, ext = os.path.splitext(name)
+    return f"{base}.{digest}{ext}"
+
+# Rewrite relative url(...) references of a CSS file to hashed names
+def rewrite_css(name:str, content:bytes, manifest:dict[str, str])->bytes:
+    folder = os.path.dirname(name)
+
+    def replace(match):
+        quote, _, target, suffix = match.groups()
+        source = os.path.normpath(os.path.join(folder, target)).replace(os.sep, "/")
+        if source not in manifest:
+            return match.group(0)
+        return f"url({quote}{os.path.relpath(manifest[source], folder).replace(os.sep, '/')}{quote})"
+
+    return CSS_URL.sub(replace, content.decode()).encode()
+
+def write(path:str, content:bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    if path.endswith(COMPRESS):
+        with open(f"{path}.gz", "wb") as f:
+            f.write(gzip.compress(content, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(f"{path}.br", "wb") as f:
+                f.write(brotli.compress(content))
+
+def build()->dict[str, str]:
+    sources = {}
+    for root, dirs, files in os.walk(STATIC_DIR):
+        if os.path.abspath(root).startswith(DIST_DIR):
+            continue
+        for file in files:
+            path = os.path.join(root, file)
+            name = os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")
+            with open(path, "rb") as f:
+                sources[name] = f.read()
+
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    manifest = {}
+    # CSS last, so its url(...) references can point to hashed names
+    for name in sorted(sources, key=lambda e: e.endswith(".css")):
+        content = sources[name]
+        if name.endswith(".css"):
+            content = rewrite_css(name, content, manifest)
+        manifest[name] = hashed_name(name, content)
+        write(os.path.join(DIST_DIR, manifest[name]), content)
+
+    with open(os.path.join(DIST_DIR, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+if __name__ == "__main__":
+    manifest = build()
+    print(f"Built {len(manifest)} assets into {DIST_DIR}" + ("" if brotli else " (brotli not installed, gzip only)"))
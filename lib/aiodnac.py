@@ -1,11 +1,26 @@
 import json
+import time
 import httpx
-from typing import Any
+import asyncio
+from typing import Any, AsyncIterator, Optional
 from dataclasses import dataclass, asdict, field
 from datetime import datetime, timedelta, timezone
+from lib.breaker import BreakerSet, UpstreamError, CircuitOpenError
+from lib.upstreamcache import UpstreamCache
+from lib.batchloader import BatchLoader
+from lib import metrics, timing
+from redis import Redis
 
 TIMEOUT = 5.0
 SESSION_LIFETIME = 3600
+# networkDevices paging (DNAC caps pages at 500 devices, offsets are 1-based)
+PAGE_SIZE = 500
+CONCURRENCY = 8
+
+# Upstream cache TTL per GET endpoint (first match wins, unmatched paths are not cached)
+CACHE_POLICY = [
+    (r"/dna/data/api/v1/networkDevices(/.+)?", 300),
+]
 
 @dataclass
 class DnacDevice:
@@ -52,14 +67,20 @@ class DnacDevice:
         return json.dumps(asdict(self))  
     
 class Dnac:
-    def __init__(self, host:str, username:str, password:str, verify:bool=False, timeout:float=TIMEOUT):
+    def __init__(self, host:str, username:str, password:str, verify:bool=False, timeout:float=TIMEOUT, cache:Redis=None, page_size:int=PAGE_SIZE, concurrency:int=CONCURRENCY):
         self.host = host
         self.username = username
         self.password = password
         self.verify = verify
         self.timeout = timeout
+        self.page_size = page_size
+        self.concurrency = concurrency
         self.url = f"https://{host}"
         self.token_time = None
+        self.breakers = BreakerSet(host)
+        self.cache = UpstreamCache(cache, CACHE_POLICY, namespace=host) if cache is not None else None
+        # device lookups by id, batched across concurrent requests (see load_device)
+        self.device_loader = BatchLoader(self._get_devices_by_id, name=f"dnac:{host}")
 
     def connect(self)->bool:
         # check if a valid token is set
@@ -71,7 +92,9 @@ class Dnac:
             auth = (self.username,self.password),
             headers = {'content-type': 'application/json'},
             verify = self.verify,
+            timeout = self.timeout,
         )
+        metrics.registry.inc("yami_upstream_auth_total", client="dnac", fabric=self.host, result="success" if r.status_code == 200 else "failure")
         if r.status_code == 200:
             self.token_time = datetime.now(timezone.utc)
             self.headers = {
@@ -83,26 +106,158 @@ class Dnac:
             return False
     
     async def _get(self,object:str, params:dict[str,Any]=None)->list[Any]:
-        # check or set authentication
-        if not self.connect():
-            return None
-        # prepare request
-        url = f"{self.url}{object}"
-        async with httpx.AsyncClient(headers=self.headers,verify=self.verify,timeout=self.timeout) as client:
-            r = await client.get(url, headers=self.headers, params=params)
-        # check response
-        if r.status_code == 200:
-            return r.json()
-        else:
+        async def fetch():
+            # check or set authentication
+            try:
+                if not self.connect():
+                    return None
+            except httpx.HTTPError as exc:
+                raise UpstreamError(f"Authentication failed on {self.host}: {exc}") from exc
+            # prepare request
+            url = f"{self.url}{object}"
+            try:
+                async with httpx.AsyncClient(headers=self.headers,verify=self.verify,timeout=self.timeout) as client:
+                    start = time.monotonic()
+                    r = await client.get(url, headers=self.headers, params=params)
+                    elapsed = time.monotonic() - start
+                    metrics.registry.observe("yami_upstream_request_seconds", elapsed, client="dnac", fabric=self.host, endpoint=endpoint_class, method="GET")
+                    timing.record("upstream-dnac", elapsed)
+            except httpx.HTTPError as exc:
+                metrics.registry.inc("yami_upstream_errors_total", client="dnac", fabric=self.host, endpoint=endpoint_class, method="GET")
+                raise UpstreamError(f"ConnectionError on GET {object}: {exc}") from exc
+            # check response
+            if r.status_code >= 500:
+                metrics.registry.inc("yami_upstream_errors_total", client="dnac", fabric=self.host, endpoint=endpoint_class, method="GET")
+                raise UpstreamError(f"HTTP {r.status_code} on GET {object}")
+            if r.status_code == 200:
+                if self.cache:
+                    self.cache.set("GET", object, params, r.json())
+                return r.json()
+            else:
+                return None
+
+        if self.cache:
+            cached = self.cache.get("GET", object, params)
+            if cached is not None:
+                return cached
+
+        # circuit breaker per endpoint class, e.g. "/dna/data/api/v1/networkDevices/<id>" -> "networkDevices"
+        endpoint_class = object.split("/api/v1/")[-1].strip("/").split("/")[0]
+        key = (object, json.dumps(params or {}, sort_keys=True, default=str))
+        try:
+            return await self.breakers.get(endpoint_class).call(key, fetch)
+        except CircuitOpenError:
             return None
 
+    async def get_device_count(self, params:dict[str,Any]=None)->Optional[int]:
+        data = await self._get("/dna/data/api/v1/networkDevices/count", params=params)
+        if data and "response" in data:
+            return data["response"].get("count")
+        return None
+
+    async def iter_device_pages(self, params:dict[str,Any]=None)->AsyncIterator[tuple[int, list[DnacDevice]]]:
+        """
+        Fetch every page of networkDevices matching the filters, concurrently.
+
+        The total is read from the count endpoint first, then pages are requested
+        with offset/limit under the `concurrency` limit and yielded as they arrive
+        (not in offset order). Without a count, pages are read one after the other
+        until a short page.
+
+        Args:
+            params: Filters (e.g. {"family": "Switches and Hubs"}), without offset / limit.
+
+        Yields:
+            (offset, devices) per page.
+
+        Raises:
+            UpstreamError: A page is unavailable.
+        """
+        params = dict(params or {})
+
+        async def page(offset:int)->tuple[int, list[DnacDevice]]:
+            data = await self._get("/dna/data/api/v1/networkDevices", params=params | {"offset": offset, "limit": self.page_size})
+            if not data or "response" not in data:
+                raise UpstreamError(f"No data for networkDevices at offset {offset} on {self.host}")
+            return offset, [ DnacDevice.from_api(device) for device in data["response"] ]
+
+        count = await self.get_device_count(params)
+        if count is None:
+            offset = 1
+            while True:
+                result = await page(offset)
+                yield result
+                if len(result[1]) < self.page_size:
+                    return
+                offset += self.page_size
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(offset:int)->tuple[int, list[DnacDevice]]:
+            async with semaphore:
+                return await page(offset)
+
+        tasks = [ asyncio.create_task(limited(offset)) for offset in range(1, count + 1, self.page_size) ]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                yield await next_page
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def iter_devices(self, params:dict[str,Any]=None)->AsyncIterator[DnacDevice]:
+        """
+        Stream `DnacDevice` objects as their pages arrive (see `iter_device_pages`).
+
+        Usage:
+            async for device in dnac.iter_devices({"family": "Switches and Hubs"}):
+                ...
+        """
+        async for _, devices in self.iter_device_pages(params):
+            for device in devices:
+                yield device
+
     async def get_devices(self,params:dict[str,Any]=None):
-        data = await self._get("/dna/data/api/v1/networkDevices",params=params)
+        # explicit lookups (ids) or pages are a single request
+        if params and any(k in params for k in ("id", "offset", "limit")):
+            data = await self._get("/dna/data/api/v1/networkDevices",params=params)
+            if data and "response" in data:
+                return [DnacDevice.from_api(device) for device in data.get("response")]
+            return None
 
-        if data and "response" in data:
-            return [DnacDevice.from_api(device) for device in data.get("response")]
-        else:
+        # whole inventory: every page, in offset order
+        try:
+            pages = { offset:devices async for offset,devices in self.iter_device_pages(params) }
+        except UpstreamError as err:
+            print(f"[ERROR] {err}")
             return None
+        devices = [ device for offset in sorted(pages) for device in pages[offset] ]
+        # device pages opened from the inventory then need no upstream call
+        for device in devices:
+            self.device_loader.prime(device.id, device)
+        return devices
+
+    async def _get_devices_by_id(self, ids:list[str])->dict[str, DnacDevice]:
+        # without a limit DNAC returns at most a default page of the requested ids
+        devices = await self.get_devices({"id": ",".join(ids), "limit": len(ids)})
+        if devices is None:
+            raise UpstreamError(f"No data for networkDevices {','.join(ids)} on {self.host}")
+        return { device.id:device for device in devices }
+
+    async def load_device(self, id:str)->Optional[DnacDevice]:
+        """
+        Look up one device by id, batched with the lookups of concurrent requests.
+
+        Lookups arriving within a few milliseconds are fetched by one multi-id
+        networkDevices query, and devices are cached for 5 minutes.
+
+        Returns:
+            The device, or None if DNAC does not know the id.
+
+        Raises:
+            UpstreamError: The batch query failed.
+        """
+        return await self.device_loader.load(id)
     
     async def get_device(self,id:str):
         data = await self._get(f"/dna/data/api/v1/networkDevices/{id}")
@@ -1,8 +1,10 @@
+import time
 import asyncio
 import httpx
 import json
 from typing import Any
 from dataclasses import dataclass, asdict
+from lib import metrics, timing
 
 WAPI = "v2.10"
 TIMEOUT = 15.0
@@ -92,7 +94,13 @@ class Infoblox:
         data = []
         # Loop on pages
         while True:
+            start = time.monotonic()
             response = await self.client.get(url, params=params)
+            elapsed = time.monotonic() - start
+            metrics.registry.observe("yami_upstream_request_seconds", elapsed, client="infoblox", fabric=self.host, endpoint=object, method="GET")
+            timing.record("upstream-infoblox", elapsed)
+            if response.status_code >= 500:
+                metrics.registry.inc("yami_upstream_errors_total", client="infoblox", fabric=self.host, endpoint=object, method="GET")
             response.raise_for_status()
             page = response.json()
             data = data + page.get("result",[])
@@ -1,12 +1,35 @@
 import json
+import time
 import httpx
 from typing import Any
 from dataclasses import dataclass, asdict, field
 from datetime import datetime, timedelta, timezone
+from lib.breaker import BreakerSet, UpstreamError, CircuitOpenError
+from lib.upstreamcache import UpstreamCache
+from lib import metrics, timing
+from redis import Redis
 
 TIMEOUT = 5.0
 SESSION_LIFETIME = 3600
 
+# Next page URL of a 'Link' header, e.g. '<https://...&startingAfter=Q2XX>; rel=next'
+# (Meraki leaves rel values unquoted, RFC 8288 allows both forms)
+def next_link(link:str)->str:
+    for part in (link or "").split(","):
+        url, _, params = part.partition(";")
+        if any(p.strip().replace('"', '') == "rel=next" for p in params.split(";")):
+            # remove < >
+            return url.strip()[1:-1]
+    return None
+
+# Upstream cache TTL per GET endpoint (first match wins, unmatched paths are not cached)
+CACHE_POLICY = [
+    (r"/organizations/[^/]+/(configTemplates|networks)", 300),
+    (r"/organizations/[^/]+/devices", 60),
+    (r"/networks/[^/]+", 300),
+    (r"/devices/[^/]+", 60),
+]
+
 @dataclass
 class MerakiOrganization:
     id: str
@@ -124,7 +147,7 @@ class MerakiDevice:
         return json.dumps(asdict(self))  
 
 class Meraki:
-    def __init__(self, api_key:str, org_id:str, host:str="api.meraki.com", verify:bool=False, timeout:float=TIMEOUT):
+    def __init__(self, api_key:str, org_id:str, host:str="api.meraki.com", verify:bool=False, timeout:float=TIMEOUT, cache:Redis=None):
         self.url = f"https://{host}/api/v1"
         self.org_id = org_id
         self.verify = verify
@@ -133,45 +156,73 @@ class Meraki:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+        self.breakers = BreakerSet(org_id)
+        self.cache = UpstreamCache(cache, CACHE_POLICY, namespace=org_id) if cache is not None else None
 
 
     
     async def _get(self, url: str, params: dict[str, str] = {}):
-        results = []
-        # For paged results
-        next_url = url
-        merged_params = params | {"perPage": "500"}
+        async def fetch():
+            results = []
+            # For paged results
+            next_url = url
+            merged_params = params | {"perPage": "500"}
+
+            try:
+                async with httpx.AsyncClient(headers=self.headers, verify=self.verify, timeout=self.timeout) as client:
+                    while next_url:
+                        start = time.monotonic()
+                        r = await client.get(next_url, params=merged_params, )
+                        elapsed = time.monotonic() - start
+                        metrics.registry.observe("yami_upstream_request_seconds", elapsed, client="meraki", fabric=self.org_id, endpoint=endpoint_class, method="GET")
+                        timing.record("upstream-meraki", elapsed)
+                        #print(f'Meraki {r.status_code} GET {r.url} text={r.text}')
+                        if r.status_code >= 500:
+                            metrics.registry.inc("yami_upstream_errors_total", client="meraki", fabric=self.org_id, endpoint=endpoint_class, method="GET")
+                            raise UpstreamError(f"HTTP {r.status_code} on GET {next_url}")
+                        if r.status_code != 200:
+                            return None
+
+                        # Merge results
+                        page_data = r.json()
+                        if isinstance(page_data, list):
+                            results.extend(page_data)
+                        else:
+                            # For non-paginated single-object endpoints
+                            if self.cache:
+                                self.cache.set("GET", path, params, page_data)
+                            return page_data
+
+                        # Handle pagination via 'Link' header
+                        next_url = next_link(r.headers.get("Link"))
+                        if next_url:
+                            # next_url already includes the query
+                            # caution: not {}, httpx replaces the query string of the URL with any params dict
+                            merged_params = None
+
+                if self.cache:
+                    self.cache.set("GET", path, params, results)
+                return results
+            except httpx.HTTPError as exc:
+                metrics.registry.inc("yami_upstream_errors_total", client="meraki", fabric=self.org_id, endpoint=endpoint_class, method="GET")
+                raise UpstreamError(f"ConnectionError on GET {url}: {exc}") from exc
+            except UpstreamError:
+                raise
+            except Exception:
+                return None
+
+        path = url.replace(self.url, "")
+        if self.cache:
+            cached = self.cache.get("GET", path, params)
+            if cached is not None:
+                return cached
 
+        # circuit breaker per endpoint class, e.g. ".../organizations/<id>/devices" -> "organizations"
+        endpoint_class = path.strip("/").split("/")[0]
+        key = (url, json.dumps(params, sort_keys=True, default=str))
         try:
-            async with httpx.AsyncClient(headers=self.headers, verify=self.verify, timeout=self.timeout) as client:
-                while next_url:
-                    r = await client.get(next_url, params=merged_params, )
-                    #print(f'Meraki {r.status_code} GET {r.url} text={r.text}')
-                    if r.status_code != 200:
-                        return None
-
-                    # Merge results
-                    page_data = r.json()
-                    if isinstance(page_data, list):
-                        results.extend(page_data)
-                    else:
-                        # For non-paginated single-object endpoints
-                        return page_data
-
-                    # Handle pagination via 'Link' header
-                    link = r.headers.get("Link")
-                    if link and 'rel="next"' in link:
-                        # Extract URL from header
-                        parts = link.split(";")[0].strip()
-                        # remove < >
-                        next_url = parts[1:-1]
-                        # Clear params, since next_url already includes query
-                        merged_params = {}
-                    else:
-                        next_url = None
-
-            return results
-        except Exception:
+            return await self.breakers.get(endpoint_class).call(key, fetch)
+        except CircuitOpenError:
             return None
 
     # multi gets
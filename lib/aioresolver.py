@@ -0,0 +1,148 @@
+import time
+import asyncio
+import aiodns
+import threading
+import ipaddress
+from collections import OrderedDict
+from typing import Any, Optional
+
+NEGATIVE_TTL = 60
+MAX_TTL = 3600
+BATCH_CONCURRENCY = 50
+MAX_ENTRIES = 4096
+
+class Resolver:
+    """
+    Long-lived DNS resolver with suffix search and TTL cache.
+
+    aiodns is bound to the event loop it was created in, while Flask runs every
+    async view in its own short-lived loop. The resolver therefore lives in a
+    dedicated background loop and callers await results through futures.
+
+    All suffix candidates are queried concurrently; the answer for the first
+    suffix (in DNS_SUFFIXES order) that resolves wins. Positive answers are
+    cached for their record TTL (capped at `max_ttl`), failures for `negative_ttl`.
+    The cache keeps the `max_entries` most recently used answers (failures included).
+    """
+    def __init__(self, nameservers:list[str], suffixes:list[str], negative_ttl:int=NEGATIVE_TTL, max_ttl:int=MAX_TTL, max_entries:int=MAX_ENTRIES):
+        self.nameservers = nameservers
+        self.suffixes = suffixes or [""]
+        self.negative_ttl = negative_ttl
+        self.max_ttl = max_ttl
+        self.max_entries = max_entries
+        # caution: only used from the resolver loop, so it needs no lock
+        self.cache: OrderedDict[str, tuple[float, Optional[dict[str, str]]]] = OrderedDict()
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.resolver = self._run(self._create()).result()
+
+    # public API (callable from any event loop)
+    async def resolve(self, name:str)->Optional[dict[str, str]]:
+        """
+        Resolve a short or fully qualified name.
+
+        Returns:
+            {"ip": ..., "fqdn": ...}, {"ip": ...} for IP literals, or None.
+        """
+        return await asyncio.wrap_future(self._run(self._resolve(name)))
+
+    async def reverse(self, ip:str)->Optional[dict[str, str]]:
+        """
+        Reverse-resolve an IP address.
+
+        Returns:
+            {"ip": ..., "name": ...}, or None.
+        """
+        return await asyncio.wrap_future(self._run(self._reverse(ip)))
+
+    async def resolve_many(self, names:list[str]=None, ips:list[str]=None)->dict[str, dict[str, Any]]:
+        """
+        Resolve names and reverse-resolve IPs in one call.
+
+        Returns:
+            A dictionary keyed by input value, with the answer or an error.
+        """
+        return await asyncio.wrap_future(self._run(self._resolve_many(names or [], ips or [])))
+
+    # resolver loop internals
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def _create(self):
+        return aiodns.DNSResolver(nameservers=self.nameservers)
+
+    def _cached(self, key:str):
+        entry = self.cache.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.cache.move_to_end(key)
+            return True, entry[1]
+        self.cache.pop(key, None)
+        return False, None
+
+    def _store(self, key:str, value:Optional[dict[str, str]], ttl:int):
+        ttl = min(ttl, self.max_ttl) if value else self.negative_ttl
+        self.cache[key] = (time.monotonic() + ttl, value)
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_entries:
+            self.cache.popitem(last=False)
+        return value
+
+    async def _query_a(self, fqdn:str):
+        records = await self.resolver.query(fqdn, "A")
+        if not records:
+            raise LookupError(f"No A record for {fqdn}")
+        return records[0]
+
+    async def _resolve(self, name:str)->Optional[dict[str, str]]:
+        # Check if it's already a valid IP address
+        try:
+            return {"ip": str(ipaddress.ip_address(name))}
+        except ValueError:
+            pass
+
+        name = name.strip().lower().rstrip(".")
+        hit, value = self._cached(f"A:{name}")
+        if hit:
+            return value
+
+        candidates = [ name if suffix == "" else f"{name}.{suffix}" for suffix in self.suffixes ]
+        tasks = [ asyncio.ensure_future(self._query_a(fqdn)) for fqdn in candidates ]
+        try:
+            # respect suffix priority: wait for each candidate in order, all of them run concurrently
+            for fqdn, task in zip(candidates, tasks):
+                try:
+                    record = await task
+                except Exception:
+                    continue
+                return self._store(f"A:{name}", {"ip": record.host, "fqdn": fqdn}, record.ttl)
+        finally:
+            for task in tasks:
+                task.cancel()
+        return self._store(f"A:{name}", None, 0)
+
+    async def _reverse(self, ip:str)->Optional[dict[str, str]]:
+        try:
+            ip = str(ipaddress.ip_address(ip))
+        except ValueError:
+            return None
+        hit, value = self._cached(f"PTR:{ip}")
+        if hit:
+            return value
+        try:
+            record = await self.resolver.query(ipaddress.ip_address(ip).reverse_pointer, "PTR")
+            return self._store(f"PTR:{ip}", {"ip": ip, "name": record.name}, record.ttl)
+        except Exception:
+            return self._store(f"PTR:{ip}", None, 0)
+
+    async def _resolve_many(self, names:list[str], ips:list[str])->dict[str, dict[str, Any]]:
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        async def run(key, coro):
+            async with semaphore:
+                return key, await coro
+
+        results = await asyncio.gather(
+            *(run(name, self._resolve(name)) for name in dict.fromkeys(names)),
+            *(run(ip, self._reverse(ip)) for ip in dict.fromkeys(ips))
+        )
+        return { key:(value or {"error": f"Could not resolve {key}"}) for key,value in results }
@@ -1,14 +1,35 @@
 import json
+import time
 import httpx
 import asyncio
 from dataclasses import dataclass, asdict, fields
 from ipaddress import IPv4Address, IPv4Network
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 from datetime import datetime, timedelta, timezone
+from lib.limiter import AdaptiveLimiter
+from lib.breaker import BreakerSet, UpstreamError, CircuitOpenError
+from lib.upstreamcache import UpstreamCache
+from lib import metrics, timing
+from redis import Redis
 
 SEMAPHORE = 10
 TIMEOUT = 15.0
 SESSION_LIFETIME = 1800
+TEMPLATE_CHUNK_SIZE = 200
+# Device inventory and status endpoints (see get_devices)
+INVENTORY_PATHS = ["/system/device/controllers", "/system/device/vedges", "/device"]
+
+# Upstream cache TTL per GET endpoint (first match wins, unmatched paths are not cached)
+CACHE_POLICY = [
+    (r"/system/device/(controllers|vedges)", 300),
+    (r"/device", 300),
+    (r"/device/interface/synced", 300),
+    (r"/device/(omp/tlocs/advertised|vrrp)", 60),
+    (r"/device/ip/ipRoutes", 60),
+    (r"/client/monitor/device/options", 86400),
+    (r"/template/device/object/.+", 3600),
+    (r"/template/device/config/attached/.+", 300),
+]
 
 # Utility function to convert epoch uptime
 def ms_to_uptime_days(ms):
@@ -94,8 +115,21 @@ class SdwanDevice:
     def tojson(self):
         return json.dumps(self.todict())
 
+# Base of per-device state rows (interfaces, VRRP, TLOCs)
+class DeviceData:
+    def todict(self):
+        result = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            # Serialize IPv4Address / IPv4Network to string
+            if isinstance(value, (IPv4Address, IPv4Network)):
+                result[field.name] = str(value)
+            else:
+                result[field.name] = value
+        return result
+
 @dataclass
-class InterfaceData:
+class InterfaceData(DeviceData):
     if_name: str
     if_desc: str
     if_type: str
@@ -107,7 +141,7 @@ class InterfaceData:
 
 
 @dataclass
-class VrrpData:
+class VrrpData(DeviceData):
     if_name: str
     group: int
     priority: int
@@ -118,7 +152,7 @@ class VrrpData:
 
 
 @dataclass
-class TlocData:
+class TlocData(DeviceData):
     site_id: int
     system_ip: IPv4Address
     private_ip: IPv4Address
@@ -138,8 +172,9 @@ class Vmanage:
         password: str,
         verify: bool = False,
         port: int = 443,
-        semaphore: asyncio.Semaphore = None,
-        timeout:float = TIMEOUT
+        limiter: AdaptiveLimiter = None,
+        timeout:float = TIMEOUT,
+        cache: Redis = None
     ):
 
         self.host = host
@@ -150,10 +185,15 @@ class Vmanage:
         self.token_time = None
         self.timeout = timeout
         self.session: Optional[httpx.AsyncClient] = None
-        if semaphore is None:
-            self.semaphore = asyncio.Semaphore(SEMAPHORE)
+        # upstream response cache shared by every caller of this client
+        self.cache = UpstreamCache(cache, CACHE_POLICY, namespace=host) if cache is not None else None
+        # circuit breakers per endpoint class, with last-known-good data
+        self.breakers = BreakerSet(host)
+        # adaptive concurrency limit, tuned separately for each fabric
+        if limiter is None:
+            self.limiter = AdaptiveLimiter(initial=SEMAPHORE)
         else:
-            self.semaphore = semaphore
+            self.limiter = limiter
 
     async def connect(self) -> bool:
         # check if a valid token is set
@@ -169,56 +209,89 @@ class Vmanage:
         headers = {"Content-Type": "application/x-www-form-urlencoded"}
         data = {"j_username": self.username, "j_password": self.password}
 
-        # Attempt the POST to j_security_check
+        async def login():
+            # Attempt the POST to j_security_check
+            try:
+                async with httpx.AsyncClient(headers=headers, verify=self.verify, timeout=self.timeout) as client:
+                    # login form
+                    response = await client.post(f"{self.base_url}/j_security_check", data=data)
+                    #print(f'LOGIN {response.status_code} text={response.text} headers={response.headers}')
+                    if (response.status_code != 200 or response.text.startswith('<html>')):
+                        #print(f'Vmanage login failed: user {self.username} on {self.host}')
+                        raise
+                    self.headers = {
+                        "Content-Type": "application/json",
+                        "Cookie": response.headers.get("Set-Cookie")
+                    }
+                    # CSRF token
+                    response = await client.get(f"{self.base_url}/dataservice/client/token")
+                    #print(f'CSRF {response.status_code} text={response.text} headers={response.headers}')
+                    if response.status_code != 200:
+                        raise
+                    # Update self
+                    self.token_time = datetime.now(timezone.utc)
+                    self.headers["X-XSRF-TOKEN"] = response.text
+                    metrics.registry.inc("yami_upstream_auth_total", client="vmanage", fabric=self.host, result="success")
+                    return True
+            except Exception:
+                print(f'Vmanage: user {self.username} failed to authenticate to {self.host}')
+                metrics.registry.inc("yami_upstream_auth_total", client="vmanage", fabric=self.host, result="failure")
+                raise UpstreamError(f"Authentication failed on {self.host}")
+
+        # fast-fail while the controller is known to be down
         try:
-            async with httpx.AsyncClient(headers=headers, verify=self.verify, timeout=self.timeout) as client:
-                # login form
-                response = await client.post(f"{self.base_url}/j_security_check", data=data)
-                #print(f'LOGIN {response.status_code} text={response.text} headers={response.headers}')
-                if (response.status_code != 200 or response.text.startswith('<html>')):
-                    #print(f'Vmanage login failed: user {self.username} on {self.host}')
-                    raise
-                self.headers = {
-                    "Content-Type": "application/json",
-                    "Cookie": response.headers.get("Set-Cookie")
-                }
-                # CSRF token
-                response = await client.get(f"{self.base_url}/dataservice/client/token")
-                #print(f'CSRF {response.status_code} text={response.text} headers={response.headers}')
-                if response.status_code != 200:
-                    raise
-                # Update self
-                self.token_time = datetime.now(timezone.utc)
-                self.headers["X-XSRF-TOKEN"] = response.text
-                return True
-        except Exception:
-            print(f'Vmanage: user {self.username} failed to authenticate to {self.host}')
+            return await self.breakers.get("auth").call(None, login)
+        except CircuitOpenError:
             return False
-        return True
 
     async def _get(self, path: str, params: dict[str, Any] = None) -> Optional[str]:
-        check = await self.connect()
-        #print(f'check_auth={check}')
-        if not await self.connect():
-            return None
-
         params = params or {}
-        try:
-            async with httpx.AsyncClient(headers=self.headers,verify=self.verify,timeout=self.timeout) as client:
-                url = f"{self.base_url}/dataservice{path}"
-                response = await client.get(url, params=params)
-                retried = False
-                while not retried:
-                    if response.text.startswith("<html>"):
-                        await self.connect()
-                        retried = True
+
+        async def fetch():
+            if not await self.connect():
+                raise UpstreamError(f"Authentication failed on {self.host}")
+            try:
+                async with httpx.AsyncClient(verify=self.verify,timeout=self.timeout) as client:
+                    url = f"{self.base_url}/dataservice{path}"
+                    for attempt in range(2):
+                        start = time.monotonic()
+                        response = await client.get(url, params=params, headers=self.headers)
+                        elapsed = time.monotonic() - start
+                        self.limiter.observe(elapsed, response.status_code < 500 and not self._is_login_page(response))
+                        metrics.registry.observe("yami_upstream_request_seconds", elapsed, client="vmanage", fabric=self.host, endpoint=self._endpoint_class(path), method="GET")
+                        timing.record("upstream-vmanage", elapsed)
+                        if not self._is_login_page(response):
+                            break
+                        # session expired: authenticate again and retry once (never cache the login page)
+                        self.token_time = None
+                        if attempt or not await self.connect():
+                            raise UpstreamError(f"Session expired on GET {path}")
                     print(f'Vmanage: {response.status_code} GET {url} params={params}')
                     #print(f'Vmanage: {response.status_code} GET {url} params={params} text={response.text}')
+                    if response.status_code >= 500:
+                        metrics.registry.inc("yami_upstream_errors_total", client="vmanage", fabric=self.host, endpoint=self._endpoint_class(path), method="GET")
+                        raise UpstreamError(f"HTTP {response.status_code} on GET {path}")
                     if response.status_code == 200:
+                        if self.cache:
+                            self.cache.set("GET", path, params, response.text)
                         return response.text
                     return None
-        except httpx.HTTPError as exc:
-            raise ConnectionError(f"ConnectionError on GET {path}: {exc}") from exc
+            except httpx.HTTPError as exc:
+                if isinstance(exc, httpx.TimeoutException):
+                    self.limiter.observe(self.timeout, False)
+                metrics.registry.inc("yami_upstream_errors_total", client="vmanage", fabric=self.host, endpoint=self._endpoint_class(path), method="GET")
+                raise UpstreamError(f"ConnectionError on GET {path}: {exc}") from exc
+
+        if self.cache:
+            cached = self.cache.get("GET", path, params)
+            if cached is not None:
+                return cached
+
+        try:
+            key = (path, json.dumps(params, sort_keys=True, default=str))
+            return await self.breakers.get(self._endpoint_class(path)).call(key, fetch)
+        except CircuitOpenError:
+            return None
 
     async def _post(
         self,
@@ -227,28 +300,59 @@ class Vmanage:
         data: dict[str, Any] = None
     ) -> Optional[str]:
 
-        if not await self.connect():
-            return None
-
         params = params or {}
         data = data or {}
 
-        try:
-            async with httpx.AsyncClient(headers=self.headers,verify=self.verify,timeout=self.timeout) as client:
-                url = f"{self.base_url}/dataservice{path}"
-                response = await client.post(url, params=params, data=json.dumps(data))
-                retried = False
-                while not retried:
-                    if response.text.startswith("<html>"):
-                        await self.connect()
-                        retried = True
+        async def fetch():
+            if not await self.connect():
+                raise UpstreamError(f"Authentication failed on {self.host}")
+            try:
+                async with httpx.AsyncClient(verify=self.verify,timeout=self.timeout) as client:
+                    url = f"{self.base_url}/dataservice{path}"
+                    for attempt in range(2):
+                        start = time.monotonic()
+                        response = await client.post(url, params=params, data=json.dumps(data), headers=self.headers)
+                        elapsed = time.monotonic() - start
+                        self.limiter.observe(elapsed, response.status_code < 500 and not self._is_login_page(response))
+                        metrics.registry.observe("yami_upstream_request_seconds", elapsed, client="vmanage", fabric=self.host, endpoint=self._endpoint_class(path), method="POST")
+                        timing.record("upstream-vmanage", elapsed)
+                        if not self._is_login_page(response):
+                            break
+                        # session expired (the request was not processed): authenticate again and retry once
+                        self.token_time = None
+                        if attempt or not await self.connect():
+                            raise UpstreamError(f"Session expired on POST {path}")
                     print(f'Vmanage: {response.status_code} POST {url} params={params}')
                     #print(f'Vmanage: {response.status_code} POST {url} params={params} text={response.text}')
+                    if response.status_code >= 500:
+                        metrics.registry.inc("yami_upstream_errors_total", client="vmanage", fabric=self.host, endpoint=self._endpoint_class(path), method="POST")
+                        raise UpstreamError(f"HTTP {response.status_code} on POST {path}")
                     if response.status_code == 200:
                         return response.text
                     return None
-        except httpx.HTTPError as exc:
-            raise ConnectionError(f"ConnectionError on POST {path}: {exc}") from exc
+            except httpx.HTTPError as exc:
+                if isinstance(exc, httpx.TimeoutException):
+                    self.limiter.observe(self.timeout, False)
+                metrics.registry.inc("yami_upstream_errors_total", client="vmanage", fabric=self.host, endpoint=self._endpoint_class(path), method="POST")
+                raise UpstreamError(f"ConnectionError on POST {path}: {exc}") from exc
+
+        # caution: POST may change state, never answer it with last-known-good data nor replay it
+        # (no key), and failing GETs of the same endpoint class must not open its circuit
+        try:
+            return await self.breakers.get(f"{self._endpoint_class(path)}:write").call(None, fetch)
+        except CircuitOpenError:
+            return None
+
+    # vManage answers requests of an expired session with its login page (HTTP 200, HTML)
+    @staticmethod
+    def _is_login_page(response: httpx.Response) -> bool:
+        content_type = response.headers.get("content-type", "application/json")
+        return response.text.lstrip()[:5].lower() == "<html" or "json" not in content_type
+
+    # Endpoint class used for circuit breaking, e.g. "/device/ip/ipRoutes" -> "device/ip"
+    @staticmethod
+    def _endpoint_class(path: str) -> str:
+        return "/".join(path.strip("/").split("/")[:2])
 
     async def get(self, endpoint:str, params:dict[str, Any] = None) -> Optional[list[dict[str, Any]]]:
         """
@@ -307,13 +411,25 @@ class Vmanage:
         except (json.JSONDecodeError, AttributeError):
             return None
 
+    def invalidate_inventory(self, device_ips:list[str]=None):
+        """Drop cached device inventory, and state of the given devices (e.g. after a template push)."""
+        if self.cache:
+            self.cache.invalidate(INVENTORY_PATHS, device_ips)
+
+    @staticmethod
+    def _safe_int(value: Any) -> Optional[int]:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
     async def run_task(self,task):
-        async with self.semaphore:
+        async with self.limiter:
             return await task
             
     async def run_tasks(self, tasks: list[asyncio.Task]) -> list[Any]:
         """
-        Execute multiple coroutines concurrently, respecting a semaphore limit.
+        Execute multiple coroutines concurrently, respecting the adaptive concurrency limit.
 
         Args:
             tasks: A list of coroutine objects (e.g., [self.get('/endpoint'), ...]).
@@ -332,8 +448,8 @@ class Vmanage:
         """
 
         # check session before parallel tasks
-        if not await self.connect():
-            return None
+        # (no early return: on failure each call falls back to last-known-good data)
+        await self.connect()
         
         # define tasks
         tasks = [
@@ -479,6 +595,55 @@ class Vmanage:
                 continue
         return vrrp_entries
 
+    async def collect_fleet(self, on_progress: Callable[[dict[str, Any]], None] = None) -> Optional[dict[str, Any]]:
+        """
+        Collect interfaces, TLOCs and VRRP state from every reachable edge.
+
+        Per-device calls run concurrently under the fabric concurrency limit. A failing
+        device is recorded in `errors` and does not abort the collection.
+
+        Args:
+            on_progress: Optional callback receiving a progress dictionary
+                         (`done`, `total`, `failed`) after each device.
+
+        Returns:
+            A dictionary with `interfaces`, `tlocs` and `vrrp` rows (each tagged
+            with the device uuid, hostname and system ip), `errors` and counters,
+            or None if the device inventory is unavailable.
+        """
+        devices = await self.get_devices()
+        if devices is None:
+            return None
+        edges = [ d for d in devices.values() if d.persona == "vedge" and d.is_reachable and d.system_ip ]
+
+        snapshot = {"interfaces": [], "tlocs": [], "vrrp": [], "errors": []}
+        progress = {"done": 0, "total": len(edges), "failed": 0}
+
+        async def collect(device: SdwanDevice):
+            tag = {"uuid": device.uuid, "hostname": device.hostname, "device_ip": str(device.system_ip)}
+            # each call takes a slot of the fabric concurrency limit
+            results = await asyncio.gather(
+                self.run_task(self.get_device_interfaces(device)),
+                self.run_task(self.get_device_tlocs(device)),
+                self.run_task(self.get_device_vrrp(device)),
+                return_exceptions=True
+            )
+            failed = False
+            for kind, result in zip(["interfaces", "tlocs", "vrrp"], results):
+                if isinstance(result, Exception) or result is None:
+                    failed = True
+                    snapshot["errors"].append(tag | {"kind": kind, "error": str(result) if result else "No data"})
+                    continue
+                snapshot[kind].extend( tag | {k:v for k,v in e.todict().items() if k != "raw_data"} for e in result )
+            progress["done"] += 1
+            progress["failed"] += int(failed)
+            if on_progress:
+                on_progress(dict(progress))
+
+        # caution: not run_tasks, slots are taken by the calls of each device (the limiter is not reentrant)
+        await asyncio.gather(*(collect(d) for d in edges))
+        return snapshot | {"devices": progress["total"], "failed": progress["failed"]}
+
     async def get_device_template_values(self, device_uuid:str, template_uuid:str) -> Optional[dict[str, Any]]:
         """
         Retrieve input values for a device's attached template.
@@ -507,6 +672,90 @@ class Vmanage:
         except Exception:
             return None
 
+    async def get_template_attached_devices(self, template_uuid:str) -> Optional[list[str]]:
+        """
+        Retrieve the UUIDs of all devices attached to a device template.
+
+        Args:
+            template_uuid: The device template UUID.
+
+        Returns:
+            A list of device UUIDs, or None if the query fails.
+        """
+        if not template_uuid:
+            return None
+        data = await self.get(f"/template/device/config/attached/{template_uuid}")
+        if not data:
+            return None
+        return [ item["uuid"] for item in data.get("data", []) if "uuid" in item ]
+
+    async def get_template_values(self, template_uuid:str, device_uuids:list[str]=None, chunk_size:int=TEMPLATE_CHUNK_SIZE) -> Optional[dict[str, Any]]:
+        """
+        Retrieve input values for many devices attached to the same template.
+
+        Device UUIDs are split into chunks of `chunk_size`, each chunk is sent as
+        a single `/template/device/config/input` request and all chunks run
+        concurrently under the fabric concurrency limit.
+
+        Args:
+            template_uuid: The device template UUID.
+            device_uuids:  Device UUIDs to query (defaults to every attached device).
+            chunk_size:    Maximum number of devices per request.
+
+        Returns:
+            A dictionary shaped like the vManage response, with merged
+            `header.columns` and one `data` row per device, plus the `missing`
+            device UUIDs of failed chunks, or None if unavailable.
+        """
+        if not template_uuid:
+            return None
+
+        # check session before parallel tasks
+        if not await self.connect():
+            return None
+
+        if not device_uuids:
+            device_uuids = await self.get_template_attached_devices(template_uuid)
+            if not device_uuids:
+                return None
+
+        # define tasks
+        device_uuids = list(dict.fromkeys(device_uuids))
+        chunks = [ device_uuids[i:i+chunk_size] for i in range(0, len(device_uuids), chunk_size) ]
+        tasks = [
+            self.post("/template/device/config/input", data={
+                "templateId": template_uuid,
+                "deviceIds": chunk,
+                "isEdited": False,
+                "isMasterEdited": False
+            })
+            for chunk in chunks
+        ]
+
+        # run tasks
+        results = await self.run_tasks(tasks)
+        if not any(results):
+            return None
+
+        # merge column definitions (by property) and device rows
+        columns = {}
+        rows = []
+        missing = []
+        for chunk, result in zip(chunks, results):
+            if not result:
+                print(f"[ERROR] Vmanage {self.host}: no template values for {len(chunk)} devices of template {template_uuid}")
+                missing.extend(chunk)
+                continue
+            for column in result.get("header", {}).get("columns", []):
+                columns.setdefault(column.get("property"), column)
+            rows.extend(result.get("data", []))
+
+        return {
+            "header": {"columns": list(columns.values())},
+            "data": rows,
+            "missing": missing
+        }
+
     async def set_device_template_values(self, device_uuid:str, template_uuid:str, data:dict[str,str]) -> Optional[dict[str, Any]]:
         if not device_uuid or not template_uuid:
             return None
@@ -522,14 +771,66 @@ class Vmanage:
             ]
         }
 
+        # device state is cached by system ip (deviceId), as found in template values
+        device_ip = data.get("csv-deviceIP")
         data = await self.post("/template/device/config/attachfeature", data=payload)
         if not data:
             return None
+        self.invalidate_inventory([device_ip] if device_ip else None)
         try:
             return data
         except Exception:
             return None
 
+    async def attach_device_templates(self, template_uuid:str, devices:list[dict[str,str]]) -> Optional[str]:
+        """
+        Push template values for many devices in a single attach operation.
+
+        Args:
+            template_uuid: The device template UUID.
+            devices:       One dictionary of template values per device
+                           (as returned by `get_template_values`).
+
+        Returns:
+            The vManage action id, or None if the push was refused.
+        """
+        if not template_uuid or not devices:
+            return None
+
+        payload = {
+            "deviceTemplateList": [
+                {
+                    "templateId":template_uuid,
+                    "device": devices,
+                    "isEdited": False,
+                    "isMasterEdited": False
+                }
+            ]
+        }
+
+        data = await self.post("/template/device/config/attachfeature", data=payload)
+        if not data:
+            return None
+        self.invalidate_inventory([ d["csv-deviceIP"] for d in devices if d.get("csv-deviceIP") ])
+        return data.get("id")
+
+    async def get_action_status(self, action_id:str) -> Optional[dict[str, Any]]:
+        """
+        Retrieve the status of an asynchronous vManage action.
+
+        Args:
+            action_id: The action id returned by a push operation.
+
+        Returns:
+            A dictionary with the action `summary` and per-device `data`, or None if unavailable.
+        """
+        if not action_id:
+            return None
+        data = await self.get(f"/device/action/status/{action_id}")
+        if not data:
+            return None
+        return data
+
     async def get_device_template_definition(self, template_uuid:str) -> Optional[dict[str, Any]]:
         if not template_uuid:
             return None
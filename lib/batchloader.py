@@ -0,0 +1,134 @@
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+from lib import metrics
+
+WINDOW = 0.01
+MAX_BATCH = 100
+TTL = 300.0
+MAX_ENTRIES = 4096
+WAIT_TIMEOUT = 60.0
+
+class BatchLoader:
+    """
+    Coalesce lookups by key into batched upstream calls, and cache the results.
+
+    Keys requested within `window` seconds, by any request, are fetched by one
+    call of `fetch_many(keys)` (split in chunks of `max_batch`), which returns a
+    {key: value} dictionary; missing keys load as None. Keys already being
+    fetched are not requested twice. Values are cached for `ttl` seconds.
+
+    Flask runs every async view in its own event loop, so the first caller of a
+    batch runs the fetch in its loop and the other callers wait on futures of
+    their own loops, resolved thread-safely (as in lib.limiter).
+
+    Usage:
+        loader = BatchLoader(fetch_many, name="dnac:devices")
+        device = await loader.load(id)
+    """
+    def __init__(
+        self,
+        fetch_many:Callable[[list[Hashable]], Awaitable[dict[Hashable, Any]]],
+        name:str,
+        window:float = WINDOW,
+        max_batch:int = MAX_BATCH,
+        ttl:float = TTL,
+        max_entries:int = MAX_ENTRIES
+    ):
+        self.fetch_many = fetch_many
+        self.name = name
+        self.window = window
+        self.max_batch = max_batch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.batches = 0
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._inflight = {}
+        self._scheduled = False
+
+    async def load(self, key:Hashable)->Any:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._cache.move_to_end(key)
+                metrics.registry.inc("yami_batch_loader_requests_total", loader=self.name, result="hit")
+                return entry[1]
+            metrics.registry.inc("yami_batch_loader_requests_total", loader=self.name, result="miss")
+            future = loop.create_future()
+            waiters = self._inflight.get(key)
+            if waiters is None:
+                waiters = self._pending.setdefault(key, [])
+            waiters.append((loop, future))
+            leader = not self._scheduled
+            self._scheduled = True
+
+        if leader:
+            await asyncio.sleep(self.window)
+            await self._dispatch()
+        return await asyncio.wait_for(future, WAIT_TIMEOUT)
+
+    # Cache a value obtained elsewhere (e.g. from a full inventory fetch)
+    def prime(self, key:Hashable, value:Any):
+        with self._lock:
+            self._store(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self)->dict[str, Any]:
+        return {
+            "cached": len(self._cache),
+            "pending": len(self._pending),
+            "inflight": len(self._inflight),
+            "batches": self.batches
+        }
+
+    async def _dispatch(self):
+        with self._lock:
+            batch = self._pending
+            self._pending = {}
+            self._inflight.update(batch)
+            self._scheduled = False
+        keys = list(batch)
+        chunks = [ keys[i:i + self.max_batch] for i in range(0, len(keys), self.max_batch) ]
+        self.batches += len(chunks)
+        results = await asyncio.gather(*(self.fetch_many(chunk) for chunk in chunks), return_exceptions=True)
+
+        for chunk, result in zip(chunks, results):
+            with self._lock:
+                for key in chunk:
+                    waiters = self._inflight.pop(key, [])
+                    if isinstance(result, Exception):
+                        outcome = (False, result)
+                    else:
+                        outcome = (True, result.get(key))
+                        if outcome[1] is not None:
+                            self._store(key, outcome[1])
+                    for loop, future in waiters:
+                        try:
+                            loop.call_soon_threadsafe(self._resolve, future, outcome)
+                        except RuntimeError:
+                            pass  # the waiting request is gone (event loop closed)
+
+    # caution: must be called with self._lock held
+    def _store(self, key:Hashable, value:Any):
+        self._cache[key] = (time.monotonic() + self.ttl, value)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _resolve(future:asyncio.Future, outcome:tuple[bool, Any]):
+        if future.done():
+            return
+        ok, value = outcome
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
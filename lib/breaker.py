@@ -0,0 +1,177 @@
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Hashable
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+MAX_ENTRIES = 512
+
+CLOSED = "closed"
+OPEN = "open"
+
+# Per-request flag raised when last-known-good data was served
+# caution: holds a mutable dict so that tasks spawned by asyncio.gather (which copy the context) share it
+_stale: ContextVar[dict] = ContextVar("stale", default=None)
+
+# Start tracking stale responses for the current request
+def track_stale():
+    _stale.set({"stale": False})
+
+# Check whether last-known-good data was served since track_stale()
+def is_stale()->bool:
+    flags = _stale.get()
+    return bool(flags and flags["stale"])
+
+def _mark_stale():
+    flags = _stale.get()
+    if flags is not None:
+        flags["stale"] = True
+
+class UpstreamError(Exception):
+    """Raised by fetch functions on timeouts, connection errors or 5xx responses."""
+
+class CircuitOpenError(ConnectionError):
+    """Raised when the circuit is open and no last-known-good data is available."""
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one endpoint class of one fabric.
+
+    After `threshold` consecutive failures the circuit opens: calls return the
+    last-known-good value for their key immediately (flagging `stale`) or raise
+    `CircuitOpenError`. Every `reset_timeout` seconds a single background probe
+    replays a failing keyed call and closes the circuit when it succeeds.
+
+    Calls without a key (writes, logins) are never replayed: they fail fast while
+    the circuit is open, and once `reset_timeout` has passed a single one of them
+    is let through, in its caller, as the trial call.
+    """
+    def __init__(self, name:str, threshold:int=FAILURE_THRESHOLD, reset_timeout:float=RESET_TIMEOUT, max_entries:int=MAX_ENTRIES):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_entries = max_entries
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.last_good = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def call(self, key:Hashable, fetch:Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `fetch()` through the breaker.
+
+        Args:
+            key:   Canonical request key used to store the last-known-good value
+                   (None for calls that must never be answered with stale data
+                   nor replayed, e.g. non-idempotent requests).
+            fetch: Zero-argument coroutine function raising `UpstreamError` on failure.
+
+        Returns:
+            The fresh value, or the last-known-good value when the upstream is failing.
+        """
+        if self.state == OPEN:
+            if key is not None:
+                self._probe(key, fetch)
+                return self._fallback(key)
+            if not self._start_trial():
+                raise CircuitOpenError(f"{self.name} is unavailable")
+            try:
+                value = await fetch()
+            except UpstreamError:
+                self._failure()
+                return self._fallback(key)
+            finally:
+                self.probing = False
+            self._success(key, value)
+            print(f'CircuitBreaker: {self.name} closed')
+            return value
+        try:
+            value = await fetch()
+        except UpstreamError:
+            self._failure()
+            return self._fallback(key)
+        self._success(key, value)
+        return value
+
+    def stats(self)->dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "opened_at": self.opened_at,
+            "entries": len(self.last_good)
+        }
+
+    def _success(self, key:Hashable, value:Any):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            if key is not None and value is not None:
+                self.last_good[key] = value
+                self.last_good.move_to_end(key)
+                while len(self.last_good) > self.max_entries:
+                    self.last_good.popitem(last=False)
+
+    def _failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.threshold:
+                if self.state != OPEN:
+                    print(f'CircuitBreaker: {self.name} opened after {self.failures} failures')
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def _fallback(self, key:Hashable) -> Any:
+        with self._lock:
+            if key is not None and key in self.last_good:
+                _mark_stale()
+                return self.last_good[key]
+        raise CircuitOpenError(f"{self.name} is unavailable")
+
+    # One trial call (probe) at a time, at most every reset_timeout
+    def _start_trial(self)->bool:
+        with self._lock:
+            if self.probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.probing = True
+            return True
+
+    # caution: the probe runs in its own thread and event loop since the caller's loop ends with the request
+    def _probe(self, key:Hashable, fetch:Callable[[], Awaitable[Any]]):
+        if not self._start_trial():
+            return
+
+        def run():
+            try:
+                value = asyncio.run(fetch())
+                self._success(key, value)
+                print(f'CircuitBreaker: {self.name} closed')
+            except Exception:
+                with self._lock:
+                    self.opened_at = time.monotonic()
+            finally:
+                self.probing = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+class BreakerSet:
+    """Lazily created circuit breakers, one per endpoint class of a fabric."""
+    def __init__(self, name:str, **kwargs):
+        self.name = name
+        self.kwargs = kwargs
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint_class:str) -> CircuitBreaker:
+        with self._lock:
+            if endpoint_class not in self.breakers:
+                self.breakers[endpoint_class] = CircuitBreaker(f"{self.name}:{endpoint_class}", **self.kwargs)
+            return self.breakers[endpoint_class]
+
+    def stats(self)->dict[str, Any]:
+        return { name:breaker.stats() for name,breaker in self.breakers.items() }
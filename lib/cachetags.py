@@ -0,0 +1,38 @@
+from typing import Any
+from redis import Redis
+
+TAG_PREFIX = "tag:"
+
+# SDWAN cache tags
+SDWAN_INVENTORY = "sdwan:{fabric}:inventory"
+SDWAN_DEVICE = "sdwan:{fabric}:device:{device_id}"
+SDWAN_TEMPLATE = "sdwan:{fabric}:template:{template_id}"
+
+# Render tag templates from route / task values
+# caution: "/" is normalized to "_" since device ids appear both ways (URL vs API)
+def format_tags(templates:list[str], **values:Any)->list[str]:
+    values = { k:str(v).replace("/","_") for k,v in values.items() }
+    return [ t.format(**values) for t in templates ]
+
+# Register a cache key under each tag (reverse index)
+# caution: entries with different TTLs share tags, the tag set expiry is only ever extended
+# (NX sets it on new sets, GT raises it) so that it outlives its longest-lived key
+def add_tags(redis:Redis, key:str, tags:list[str], ttl:int):
+    if not tags:
+        return
+    pipe = redis.pipeline()
+    for tag in tags:
+        pipe.sadd(f"{TAG_PREFIX}{tag}", key)
+        pipe.expire(f"{TAG_PREFIX}{tag}", ttl, nx=True)
+        pipe.expire(f"{TAG_PREFIX}{tag}", ttl, gt=True)
+    pipe.execute()
+
+# Delete every cache key registered under the given tags
+def invalidate(redis:Redis, tags:list[str])->int:
+    tag_keys = [ f"{TAG_PREFIX}{tag}" for tag in tags ]
+    keys = set()
+    for tag_key in tag_keys:
+        keys |= redis.smembers(tag_key)
+    if keys or tag_keys:
+        redis.delete(*keys, *tag_keys)
+    return len(keys)
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from collections import deque
+from typing import Any
+
+INITIAL_LIMIT = 10
+MIN_LIMIT = 1
+MAX_LIMIT = 64
+BACKOFF = 0.5
+TOLERANCE = 2.0
+SMOOTHING = 0.1
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter.
+
+    The limit grows by roughly one slot per round-trip while latency stays
+    within `tolerance` times the observed baseline, and is multiplied by
+    `backoff` on failures (timeouts, 5xx, login redirects) or latency spikes.
+
+    Flask runs every async view in its own event loop, so waiters are plain
+    futures woken thread-safely rather than loop-bound asyncio primitives.
+
+    Usage:
+        async with limiter:
+            ...
+        limiter.observe(latency, ok)
+    """
+    def __init__(
+        self,
+        initial:int = INITIAL_LIMIT,
+        min_limit:int = MIN_LIMIT,
+        max_limit:int = MAX_LIMIT,
+        backoff:float = BACKOFF,
+        tolerance:float = TOLERANCE
+    ):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.baseline = None
+        self.inflight = 0
+        self.successes = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._waiters = deque()
+
+    async def acquire(self):
+        with self._lock:
+            if self.inflight < int(self.limit) and not self._waiters:
+                self.inflight += 1
+                return
+            loop = asyncio.get_running_loop()
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # the slot was granted while being cancelled: give it back
+            if not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            self.inflight -= 1
+            self._wake()
+
+    def observe(self, latency:float, ok:bool):
+        """
+        Feed the outcome of one upstream call back into the limit.
+
+        Args:
+            latency: Call duration in seconds.
+            ok:      False on timeout, 5xx or login redirect.
+        """
+        with self._lock:
+            if ok:
+                self.successes += 1
+                self.baseline = latency if self.baseline is None else min(latency, self.baseline + SMOOTHING * (latency - self.baseline))
+                if latency <= self.baseline * self.tolerance:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+                else:
+                    self.limit = max(self.min_limit, self.limit * (1 - (1 - self.backoff) / 2))
+            else:
+                self.failures += 1
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+            self._wake()
+
+    def stats(self)->dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "inflight": self.inflight,
+            "waiting": len(self._waiters),
+            "baseline": self.baseline,
+            "successes": self.successes,
+            "failures": self.failures
+        }
+
+    # caution: must be called with self._lock held
+    def _wake(self):
+        while self._waiters and self.inflight < int(self.limit):
+            loop, future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.inflight += 1
+            loop.call_soon_threadsafe(self._grant, future)
+
+    def _grant(self, future:asyncio.Future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
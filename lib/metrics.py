@@ -0,0 +1,131 @@
+import threading
+from typing import Any, Callable, Iterable
+from redis import Redis
+
+# Histogram buckets in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+REDIS_PREFIX = "metrics:"
+
+def _escape(value:Any)->str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+# Prometheus label string, e.g. fabric="A",endpoint="device"
+def format_labels(labels:dict[str, Any])->str:
+    return ",".join(f'{k}="{_escape(v)}"' for k,v in sorted(labels.items()))
+
+def _series(name:str, labels:str, suffix:str="", extra:str="")->str:
+    inner = ",".join(e for e in [labels, extra] if e)
+    return f"{name}{suffix}{{{inner}}}" if inner else f"{name}{suffix}"
+
+class Registry:
+    """
+    Minimal Prometheus registry (counters, histograms and gauge callbacks).
+
+    In-process by default (the web tier runs a single gunicorn worker). When
+    backed by Redis, counters and histograms are aggregated in Redis DB0 so
+    Celery worker processes can report to the web tier's /metrics endpoint.
+    """
+    def __init__(self, redis:Redis=None):
+        self.redis = redis
+        self.lock = threading.Lock()
+        self.help: dict[str, tuple[str, str]] = {}
+        self.values: dict[str, dict[str, float]] = {}
+        self.gauges: dict[str, Callable[[], Iterable[tuple[dict[str, Any], float]]]] = {}
+
+    def describe(self, name:str, type:str, help:str):
+        self.help[name] = (type, help)
+
+    def inc(self, name:str, value:float=1, **labels):
+        self._add(name, {format_labels(labels): value})
+
+    def observe(self, name:str, value:float, **labels):
+        labels = format_labels(labels)
+        fields = { f"{labels}|le={b}":1 for b in BUCKETS if value <= b }
+        fields[f"{labels}|le=+Inf"] = 1
+        fields[f"{labels}|sum"] = value
+        fields[f"{labels}|count"] = 1
+        self._add(name, fields)
+
+    # gauges are computed at scrape time: fn() returns [(labels, value), ...]
+    def gauge(self, name:str, fn:Callable[[], Iterable[tuple[dict[str, Any], float]]]):
+        self.gauges[name] = fn
+
+    def _add(self, name:str, fields:dict[str, float]):
+        if self.redis is not None:
+            try:
+                pipe = self.redis.pipeline()
+                for field,value in fields.items():
+                    pipe.hincrbyfloat(f"{REDIS_PREFIX}{name}", field, value)
+                pipe.execute()
+            except Exception:
+                pass  # metrics must never break the caller
+            return
+        with self.lock:
+            series = self.values.setdefault(name, {})
+            for field,value in fields.items():
+                series[field] = series.get(field, 0) + value
+
+    def collect(self)->dict[str, dict[str, float]]:
+        if self.redis is not None:
+            values = {}
+            for key in self.redis.scan_iter(match=f"{REDIS_PREFIX}*"):
+                key = key.decode() if isinstance(key, bytes) else key
+                raw = self.redis.hgetall(key)
+                values[key[len(REDIS_PREFIX):]] = { (k.decode() if isinstance(k, bytes) else k):float(v) for k,v in raw.items() }
+            return values
+        with self.lock:
+            return { name:dict(series) for name,series in self.values.items() }
+
+registry = Registry()
+
+# Describe application metrics (shared by web tier and worker)
+for _name, _type, _help in [
+    ("yami_upstream_request_seconds", "histogram", "Upstream API call latency"),
+    ("yami_upstream_errors_total", "counter", "Upstream API calls failed (timeouts, connection errors, 5xx)"),
+    ("yami_upstream_auth_total", "counter", "Upstream authentications (token refreshes)"),
+    ("yami_upstream_cache_requests_total", "counter", "Upstream cache lookups"),
+    ("yami_cache_requests_total", "counter", "Route cache lookups"),
+    ("yami_batch_loader_requests_total", "counter", "Batched lookups (hit: cached, miss: fetched in a batch)"),
+    ("yami_limiter_limit", "gauge", "Adaptive concurrency limit"),
+    ("yami_limiter_inflight", "gauge", "Upstream calls in flight"),
+    ("yami_limiter_waiting", "gauge", "Upstream calls queued behind the concurrency limit"),
+    ("yami_task_queue_wait_seconds", "histogram", "Celery task wait between publish and start"),
+    ("yami_task_run_seconds", "histogram", "Celery task run time"),
+    ("yami_ssh_seconds", "histogram", "SSH connect and command time"),
+]:
+    registry.describe(_name, _type, _help)
+
+# Route metrics of this process to Redis (used by Celery workers)
+def configure(redis:Redis):
+    registry.redis = redis
+
+# Render registries in Prometheus text format (series of later registries are merged in)
+def render(*registries:Registry)->str:
+    values: dict[str, dict[str, float]] = {}
+    for r in registries:
+        for name,series in r.collect().items():
+            merged = values.setdefault(name, {})
+            for field,value in series.items():
+                merged[field] = merged.get(field, 0) + value
+
+    lines = []
+    for name in sorted(set(values) | set(registry.gauges)):
+        type, help = registry.help.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {type}")
+        if name in registry.gauges:
+            for labels,value in registry.gauges[name]():
+                lines.append(f"{_series(name, format_labels(labels))} {value}")
+            continue
+        if type == "histogram":
+            series = values[name]
+            for labels in sorted({ field.rsplit("|", 1)[0] for field in series }):
+                for bucket in [*BUCKETS, "+Inf"]:
+                    le = 'le="' + str(bucket) + '"'
+                    lines.append(f"{_series(name, labels, '_bucket', le)} {series.get(f'{labels}|le={bucket}', 0)}")
+                lines.append(f"{_series(name, labels, '_sum')} {series.get(f'{labels}|sum', 0)}")
+                lines.append(f"{_series(name, labels, '_count')} {series.get(f'{labels}|count', 0)}")
+            continue
+        for field,value in sorted(values[name].items()):
+            lines.append(f"{_series(name, field)} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,149 @@
+import time
+import uuid
+import threading
+from typing import Any
+from redis import Redis
+
+KEY_PREFIX = "semaphore:"
+LEASE = 60.0
+TIMEOUT = 120.0
+POLL_INTERVAL = 0.2
+WAITER_TTL = 5.0
+
+# Atomic acquire attempt, also run by waiters to keep their place in the queue
+# KEYS: holders (token -> lease expiry), queue (token -> ticket), waiting (token -> expiry), counter
+# ARGV: token, limit, lease, waiter ttl, idle key ttl
+# caution: the Redis server clock (TIME) is used so that workers with skewed clocks agree on expiry
+ACQUIRE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+for _, token in ipairs(redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', now)) do
+    redis.call('ZREM', KEYS[2], token)
+    redis.call('ZREM', KEYS[3], token)
+end
+if not redis.call('ZSCORE', KEYS[2], ARGV[1]) then
+    redis.call('ZADD', KEYS[2], redis.call('INCR', KEYS[4]), ARGV[1])
+end
+redis.call('ZADD', KEYS[3], now + tonumber(ARGV[4]), ARGV[1])
+for i = 1, 4 do
+    redis.call('EXPIRE', KEYS[i], ARGV[5])
+end
+local free = tonumber(ARGV[2]) - redis.call('ZCARD', KEYS[1])
+if redis.call('ZRANK', KEYS[2], ARGV[1]) < free then
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    redis.call('ZREM', KEYS[3], ARGV[1])
+    redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# Extend the lease of a holder, fails if the lease already expired (slot given to someone else)
+# The idle key ttl is refreshed too, or the keys would expire under a holder renewing for longer
+# KEYS: holders, queue, waiting, counter ; ARGV: token, lease, idle key ttl
+RENEW = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local expiry = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not expiry or tonumber(expiry) < now then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[2]), ARGV[1])
+for i = 1, 4 do
+    redis.call('EXPIRE', KEYS[i], ARGV[3])
+end
+return 1
+"""
+
+class SemaphoreTimeout(TimeoutError):
+    """Raised when no slot could be acquired within the timeout."""
+
+class RedisSemaphore:
+    """
+    Counting semaphore shared by every process using the same Redis.
+
+    Waiters are served in arrival order (a ticket per waiter, slots go to the
+    lowest tickets). Holders own a lease, renewed in the background while the
+    slot is held: a crashed worker stops renewing and its slot is reclaimed
+    after `lease` seconds. Waiters that stop polling drop out of the queue the
+    same way.
+
+    One instance per acquisition (it carries the holder token).
+
+    Usage:
+        with RedisSemaphore(redis, f"ssh:{host}:{port}", limit=4):
+            ...
+    """
+    def __init__(self, redis:Redis, name:str, limit:int, lease:float=LEASE, timeout:float=TIMEOUT, poll_interval:float=POLL_INTERVAL):
+        self.redis = redis
+        self.name = name
+        self.limit = limit
+        self.lease = lease
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.token = uuid.uuid4().hex
+        self.waited = 0.0
+        # keys of an unused semaphore are dropped after idle_ttl seconds
+        self.idle_ttl = int(max(lease, timeout) * 2)
+        # hash tag: every key of one semaphore lives on the same cluster slot
+        prefix = f"{KEY_PREFIX}{{{name}}}"
+        self.keys = [f"{prefix}:holders", f"{prefix}:queue", f"{prefix}:waiting", f"{prefix}:counter"]
+        self._acquire = redis.register_script(ACQUIRE)
+        self._renew = redis.register_script(RENEW)
+        self._released = threading.Event()
+        self._renewer = None
+
+    def acquire(self):
+        """
+        Wait for a slot, in arrival order.
+
+        Raises:
+            SemaphoreTimeout: No slot within `timeout` seconds (the place in the queue is given up).
+        """
+        start = time.monotonic()
+        args = [self.token, self.limit, self.lease, max(WAITER_TTL, self.poll_interval * 10), self.idle_ttl]
+        while not self._acquire(keys=self.keys, args=args):
+            if time.monotonic() - start > self.timeout:
+                self._remove()
+                raise SemaphoreTimeout(f"No slot available for {self.name} after {self.timeout:.0f}s")
+            time.sleep(self.poll_interval)
+        self.waited = time.monotonic() - start
+        self._released.clear()
+        self._renewer = threading.Thread(target=self._keep_alive, daemon=True)
+        self._renewer.start()
+
+    # Extend the lease (done in the background while the slot is held), False if it was lost
+    def renew(self)->bool:
+        return bool(self._renew(keys=self.keys, args=[self.token, self.lease, self.idle_ttl]))
+
+    def release(self):
+        self._released.set()
+        self._remove()
+
+    def stats(self)->dict[str, Any]:
+        holders, queue = self.keys[0], self.keys[1]
+        return {
+            "limit": self.limit,
+            "inflight": self.redis.zcard(holders),
+            "waiting": self.redis.zcard(queue)
+        }
+
+    def _remove(self):
+        pipe = self.redis.pipeline()
+        for key in self.keys[:3]:
+            pipe.zrem(key, self.token)
+        pipe.execute()
+
+    def _keep_alive(self):
+        while not self._released.wait(self.lease / 3):
+            if not self.renew():
+                print(f"[ERROR] Semaphore {self.name}: lease lost")
+                return
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
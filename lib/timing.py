@@ -0,0 +1,83 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable
+
+# Request-scoped timer
+# caution: the ContextVar holds a mutable dict, so spans recorded in copied contexts
+# (asyncio tasks, Flask async views) are still visible to the request
+_timer: ContextVar[dict] = ContextVar("timer", default=None)
+
+# Start timing the current request
+def start():
+    _timer.set({"start": time.monotonic(), "spans": {}})
+
+# Add a duration (seconds) to a named span, e.g. "cache" or "upstream-vmanage"
+# caution: durations are summed, so concurrent upstream calls can add up to more than the total
+def record(name:str, duration:float):
+    timer = _timer.get()
+    if timer is None:
+        return
+    total, count = timer["spans"].get(name, (0.0, 0))
+    timer["spans"][name] = (total + duration, count + 1)
+
+# usage: with timing.timed("render"): ...
+@contextmanager
+def timed(name:str):
+    begin = time.monotonic()
+    try:
+        yield
+    finally:
+        record(name, time.monotonic() - begin)
+
+# Elapsed time since start() in seconds
+def elapsed()->float:
+    timer = _timer.get()
+    return time.monotonic() - timer["start"] if timer else 0.0
+
+# Spans of the current request: {name: {"ms": ..., "count": ...}}
+def spans()->dict[str, dict[str, Any]]:
+    timer = _timer.get()
+    if timer is None:
+        return {}
+    return { name:{"ms": round(total * 1000, 1), "count": count} for name,(total,count) in timer["spans"].items() }
+
+# Server-Timing header value, e.g. cache;dur=1.2, upstream-vmanage;dur=180.4;desc="2 calls", total;dur=195.0
+def header()->str:
+    entries = []
+    for name,span in spans().items():
+        entry = f"{name};dur={span['ms']}"
+        if span["count"] > 1:
+            entry += f';desc="{span["count"]} calls"'
+        entries.append(entry)
+    entries.append(f"total;dur={round(elapsed() * 1000, 1)}")
+    return ", ".join(entries)
+
+class ServerTimingMiddleware:
+    """
+    WSGI middleware timing every request end to end.
+
+    The timer starts before Flask opens the session and the Server-Timing header
+    is added when the response starts, so session load/save, after_request hooks
+    and rendering are all accounted for. Requests slower than `slow_threshold`
+    seconds are passed to `on_slow(method, path, status, elapsed, spans)`.
+    """
+    def __init__(self, wsgi_app:Callable, slow_threshold:float=None, on_slow:Callable=None):
+        self.wsgi_app = wsgi_app
+        self.slow_threshold = slow_threshold
+        self.on_slow = on_slow
+
+    def __call__(self, environ:dict, start_response:Callable)->Iterable[bytes]:
+        start()
+
+        def timed_start_response(status, headers, exc_info=None):
+            headers = [ (k,v) for k,v in headers if k.lower() != "server-timing" ]
+            headers.append(("Server-Timing", header()))
+            if self.on_slow and self.slow_threshold is not None and elapsed() >= self.slow_threshold:
+                try:
+                    self.on_slow(environ.get("REQUEST_METHOD"), environ.get("PATH_INFO"), status, elapsed(), spans())
+                except Exception:
+                    pass  # logging must never break the response
+            return start_response(status, headers, exc_info)
+
+        return self.wsgi_app(environ, timed_start_response)
@@ -0,0 +1,72 @@
+import re
+import json
+import hashlib
+from typing import Any, Optional
+from redis import Redis
+from lib import metrics
+from lib.cachetags import add_tags, invalidate
+
+KEY_PREFIX = "upstream:"
+
+# Index tags of cached responses (see lib/cachetags.py): by path, and by device (deviceId param)
+UPSTREAM_PATH = "upstream:{namespace}:path:{path}"
+UPSTREAM_DEVICE = "upstream:{namespace}:device:{device_id}"
+
+class UpstreamCache:
+    """
+    Cache of upstream API responses, shared by every caller of a client.
+
+    Keys are built from the canonical request (namespace, method, path and
+    normalized params) so API and UI routes touching the same upstream data
+    share one copy. TTLs come from a per-endpoint policy: an ordered list of
+    (regex, seconds) matched against the path, first match wins, unmatched
+    paths are not cached.
+
+    Cached keys are indexed by path and device, so invalidation only touches
+    the keys of this namespace (no scan of the whole database).
+    """
+    def __init__(self, redis:Redis, policy:list[tuple[str, int]], namespace:str):
+        self.redis = redis
+        self.policy = [ (re.compile(pattern), ttl) for pattern,ttl in policy ]
+        self.namespace = namespace
+
+    def ttl(self, path:str)->int:
+        for pattern,ttl in self.policy:
+            if pattern.fullmatch(path):
+                return ttl
+        return 0
+
+    def key(self, method:str, path:str, params:dict[str, Any]=None)->str:
+        normalized = json.dumps({ k:str(v) for k,v in (params or {}).items() }, sort_keys=True)
+        digest = hashlib.sha256(normalized.encode()).hexdigest()[:16]
+        return f"{KEY_PREFIX}{self.namespace}:{method}:{path}:{digest}"
+
+    def get(self, method:str, path:str, params:dict[str, Any]=None)->Optional[Any]:
+        if not self.ttl(path):
+            return None
+        raw = self.redis.get(self.key(method, path, params))
+        if raw is None:
+            metrics.registry.inc("yami_upstream_cache_requests_total", namespace=self.namespace, result="miss")
+            return None
+        metrics.registry.inc("yami_upstream_cache_requests_total", namespace=self.namespace, result="hit")
+        return json.loads(raw)
+
+    def set(self, method:str, path:str, params:dict[str, Any], value:Any):
+        ttl = self.ttl(path)
+        if ttl and value is not None:
+            key = self.key(method, path, params)
+            self.redis.set(key, json.dumps(value), ex=ttl)
+            add_tags(self.redis, key, self.tags(path, params), ttl)
+
+    def tags(self, path:str, params:dict[str, Any]=None)->list[str]:
+        tags = [ UPSTREAM_PATH.format(namespace=self.namespace, path=path) ]
+        device_id = (params or {}).get("deviceId")
+        if device_id:
+            tags.append(UPSTREAM_DEVICE.format(namespace=self.namespace, device_id=device_id))
+        return tags
+
+    # Drop cached responses of the given paths (any params), and of the given devices (any path)
+    def invalidate(self, paths:list[str]=None, device_ids:list[str]=None)->int:
+        tags = [ UPSTREAM_PATH.format(namespace=self.namespace, path=path) for path in paths or [] ]
+        tags += [ UPSTREAM_DEVICE.format(namespace=self.namespace, device_id=device_id) for device_id in device_ids or [] ]
+        return invalidate(self.redis, tags) if tags else 0
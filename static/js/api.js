@@ -16,6 +16,9 @@ function get(url, params = {}) {
             if (!response.ok) {
                 throw new Error(`HTTP ${response.status}`);
             }
+            if (response.headers.get("X-Yami-Stale")) {
+                show_alert('warning','Warning','Upstream controller is unavailable, showing last known data.');
+            }
             return response.json();
         })
         .catch(error => {
@@ -82,6 +85,28 @@ function resolve_hostname(name) {
     });
   }
 
+// Resolve many DNS names and/or reverse-resolve IP addresses in one request
+// Usage:
+// resolve_batch(["sw1","sw2"], ["10.0.0.1"]).then(results => {
+//     // results["sw1"] = {ip, fqdn} or {error}, results["10.0.0.1"] = {ip, name} or {error}
+//   });
+function resolve_batch(names = [], ips = []) {
+    return fetch("/resolve/batch", {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ names: names, ips: ips })
+    })
+    .then(response => {
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+      return response.json();
+    })
+    .catch(error => {
+      return {};
+    });
+  }
+
 // Start a background task
 function createTask(url, type, data) {
     return fetch(url, {
@@ -103,14 +128,19 @@ function createTask(url, type, data) {
 }
 
 // Poll a background task
-function pollTask(getTaskUrl, taskId, pollInterval, statusSelector) {
+// onProgress (optional) is called with task.progress while the task reports PROGRESS
+function pollTask(getTaskUrl, taskId, pollInterval, statusSelector, onProgress) {
     return new Promise((resolve, reject) => {
         const pollUrl = getTaskUrl.replace("DUMMY", taskId);
         const poll = setInterval(() => {
             fetch(pollUrl)
                 .then(res => res.json())
                 .then(task => {
-                    if (task.status === "SUCCESS") {
+                    if (task.status === "PROGRESS") {
+                        if (onProgress) {
+                            onProgress(task.progress);
+                        }
+                    } else if (task.status === "SUCCESS") {
                         clearInterval(poll);
                         if (task.success) {
                             resolve(task.result);
@@ -130,6 +160,28 @@ function pollTask(getTaskUrl, taskId, pollInterval, statusSelector) {
     });
 }
 
+// Follow the output of a streamed task (ssh_cmd with stream: true)
+// onOutput is called with each block of lines as the device sends them, the promise resolves with
+// the task result once the output is complete
+function streamTask(streamTaskUrl, taskId, onOutput) {
+    return new Promise((resolve, reject) => {
+        // the browser reconnects on its own when the server closes the stream, resuming after the last event
+        const source = new EventSource(streamTaskUrl.replace("DUMMY", taskId));
+        source.addEventListener("output", (event) => {
+            onOutput(event.data + "\n");
+        });
+        source.addEventListener("end", (event) => {
+            source.close();
+            resolve(JSON.parse(event.data));
+        });
+        source.onerror = () => {
+            // CLOSED: the stream can't be resumed (e.g. session expired)
+            if (source.readyState === EventSource.CLOSED) {
+                reject("Error streaming task output");
+            }
+        };
+    });
+}
 
 
 // runTasks - sequential
@@ -1,6 +1,196 @@
-
+import os
+import gzip
+import json
+import time
+import asyncio
 from netmiko import ConnectHandler
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+from redis import Redis
 from celery import Celery, shared_task 
+from celery.signals import before_task_publish, task_prerun, task_postrun
+from lib.aiosdwan import Vmanage
+from lib.cachetags import SDWAN_INVENTORY, SDWAN_DEVICE, SDWAN_TEMPLATE, format_tags, invalidate
+from lib.semaphore import RedisSemaphore
+from lib import metrics
+
+# Fleet snapshots are stored next to the Flask cache (Redis DB0)
+SNAPSHOT_KEY = "snapshot:sdwan:{fabric}"
+SNAPSHOT_TTL = 86400
+
+# SDWAN action tracking
+ACTION_POLL_INTERVAL = 2.0
+ACTION_POLL_BACKOFF = 1.5
+ACTION_POLL_MAX_INTERVAL = 30.0
+ACTION_TIMEOUT = 3600
+
+# Task routing (used by the web tier when publishing, and by workers)
+# - interactive: short tasks an operator waits for, served by a worker of its own (reserved capacity)
+# - bulk: fleet-wide jobs (template pushes, collections), may queue behind each other
+# - ssh: SSH tasks mostly wait on remote prompts, they are served by a gevent worker
+#   which multiplexes hundreds of sessions in one process
+# usage:
+#   celery -A worker worker -Q interactive --concurrency=4
+#   celery -A worker worker -Q bulk --concurrency=4
+#   celery -A worker worker -Q ssh --pool=gevent --concurrency=200
+INTERACTIVE_QUEUE = "interactive"
+BULK_QUEUE = "bulk"
+SSH_QUEUE = "ssh"
+TASK_ROUTES = {
+    "tasks.hello": {"queue": INTERACTIVE_QUEUE},
+    "tasks.run_ssh_command": {"queue": SSH_QUEUE},
+    "tasks.stream_ssh_command": {"queue": SSH_QUEUE},
+    "tasks.attach_device_templates": {"queue": BULK_QUEUE},
+    "tasks.collect_sdwan_fleet": {"queue": BULK_QUEUE},
+}
+
+# Message priorities within a queue (Redis transport: one list per step, lowest step served first)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 3
+PRIORITY_LOW = 6
+PRIORITY_LOWEST = 9
+
+# Task status and results (Redis DB2, next to the Celery broker)
+# Celery keeps state and result in one record, so every poll would load the whole output: tasks
+# store a tiny status record (read by polling) and their gzip-compressed result (read once ready)
+# instead, and the Celery result backend is not used
+TASK_STATUS_KEY = "task:status:{task_id}"
+TASK_RESULT_KEY = "task:result:{task_id}"
+RESULT_TTL = 300
+
+# Task owner (username), recorded by the web tier when publishing, so that only the owner reads the output
+TASK_OWNER_KEY = "task:owner:{task_id}"
+TASK_OWNER_TTL = 86400
+
+# Streamed SSH output (Redis stream per task, entries {"data": lines} then {"eof": result})
+# caution: the stream is trimmed to about STREAM_MAXLEN entries, readers lagging further behind lose output
+STREAM_KEY = "task:stream:{task_id}"
+STREAM_MAXLEN = 100000
+STREAM_POLL_INTERVAL = 0.05
+STREAM_IDLE_TIMEOUT = 120.0
+
+# Celery settings shared by the web tier and workers
+# caution: without a prefetch multiplier of 1, a worker reserves messages ahead and priorities
+# only apply to what is left in Redis
+CELERY_CONFIG = {
+    "task_routes": TASK_ROUTES,
+    "task_default_queue": INTERACTIVE_QUEUE,
+    "task_default_priority": PRIORITY_NORMAL,
+    "broker_transport_options": {
+        "priority_steps": [PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW, PRIORITY_LOWEST],
+        "queue_order_strategy": "priority",
+    },
+    "worker_prefetch_multiplier": 1,
+    "task_ignore_result": True,
+}
+
+# Concurrent SSH sessions per device, across all workers (see lib/semaphore.py)
+# SSH_HOST_LIMIT is the default, SSH_HOST_LIMITS overrides it per device type, e.g. '{"cisco_nxos":8}'
+SSH_HOST_LIMIT = 4
+SSH_SLOT_LEASE = 60.0
+SSH_SLOT_TIMEOUT = 120.0
+
+def ssh_host_limit(device_type:str)->int:
+    limits = json.loads(os.environ.get("SSH_HOST_LIMITS", "{}"))
+    return int(limits.get(device_type, os.environ.get("SSH_HOST_LIMIT", SSH_HOST_LIMIT)))
+
+def ssh_slot(host:str, port:int, device_type:str)->RedisSemaphore:
+    return RedisSemaphore(get_cache_redis(), f"ssh:{host}:{port}", ssh_host_limit(device_type), lease=SSH_SLOT_LEASE, timeout=SSH_SLOT_TIMEOUT)
+
+# Redis clients shared by every task of the process (each client holds a connection pool)
+# caution: built on first use, workers import this module before loading the environment
+_cache_redis = None
+_task_redis = None
+
+# Utility function to get the Redis DB0 client (Flask cache / snapshots)
+def get_cache_redis()->Redis:
+    global _cache_redis
+    if _cache_redis is None:
+        _cache_redis = Redis.from_url(f"{os.environ.get('REDIS_URL')}/0")
+    return _cache_redis
+
+# Utility function to get the Redis DB2 client (Celery broker / task status and results)
+def get_task_redis()->Redis:
+    global _task_redis
+    if _task_redis is None:
+        _task_redis = Redis.from_url(f"{os.environ.get('REDIS_URL')}/2")
+    return _task_redis
+
+# Task status record: {"status", "success", "progress"}
+def write_task_status(task_id:str, status:str, progress:Any=None, pipe:Redis=None):
+    record = {
+        "status": status,
+        "success": status == "SUCCESS",
+        "progress": progress
+    }
+    (pipe or get_task_redis()).set(TASK_STATUS_KEY.format(task_id=task_id), json.dumps(record), ex=RESULT_TTL)
+
+def read_task_status(redis:Redis, task_id:str)->dict[str, Any]:
+    raw = redis.get(TASK_STATUS_KEY.format(task_id=task_id))
+    # unknown tasks are pending, as in Celery
+    return json.loads(raw) if raw is not None else {"status": "PENDING", "success": False, "progress": None}
+
+def write_task_owner(redis:Redis, task_id:str, owner:str):
+    redis.set(TASK_OWNER_KEY.format(task_id=task_id), owner, ex=TASK_OWNER_TTL)
+
+def read_task_owner(redis:Redis, task_id:str)->Optional[str]:
+    raw = redis.get(TASK_OWNER_KEY.format(task_id=task_id))
+    return raw.decode() if raw is not None else None
+
+def read_task_result(redis:Redis, task_id:str)->Any:
+    raw = redis.get(TASK_RESULT_KEY.format(task_id=task_id))
+    return json.loads(gzip.decompress(raw)) if raw is not None else None
+
+# Report progress of a long running task (status PROGRESS, progress readable by polling)
+def report_progress(task, progress:Any):
+    write_task_status(task.request.id, "PROGRESS", progress)
+
+# Utility function to get a Vmanage client from fabric name
+# caution: clients are created per task since each task runs its own event loop
+def get_vmanage(fabric:str)->Vmanage:
+    for f in json.loads(os.environ.get("SDWAN_FABRICS", "[]")):
+        if f["name"] == fabric:
+            return Vmanage(f["host"],f["username"],f["password"], port=f.get("port", 443), cache=get_cache_redis())
+    return None
+
+# Task timing metrics
+# - queue wait: publish timestamp (message header) to task start
+# - run time: task start to task end (monotonic, per worker process)
+_task_started: dict[str, float] = {}
+
+@before_task_publish.connect
+def stamp_published_at(headers=None, **kwargs):
+    if headers is not None:
+        headers["published_at"] = time.time()
+
+@task_prerun.connect
+def observe_task_start(task_id=None, task=None, **kwargs):
+    _task_started[task_id] = time.monotonic()
+    # custom headers are exposed as request attributes (protocol 2) or in request.headers
+    published_at = getattr(task.request, "published_at", None) or (getattr(task.request, "headers", None) or {}).get("published_at")
+    if published_at:
+        metrics.registry.observe("yami_task_queue_wait_seconds", max(0, time.time() - float(published_at)), task=task.name)
+
+@task_postrun.connect
+def observe_task_end(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        metrics.registry.observe("yami_task_run_seconds", time.monotonic() - started, task=task.name, state=state)
+
+@task_prerun.connect
+def store_task_start(task_id=None, **kwargs):
+    write_task_status(task_id, "STARTED")
+
+# Result first, then status: a poller seeing SUCCESS always finds the result
+@task_postrun.connect
+def store_task_result(task_id=None, retval=None, state=None, **kwargs):
+    if state != "SUCCESS":
+        retval = {"error": str(retval), "success": False}
+    payload = gzip.compress(json.dumps(retval, separators=(",", ":")).encode(), compresslevel=6)
+    pipe = get_task_redis().pipeline()
+    pipe.set(TASK_RESULT_KEY.format(task_id=task_id), payload, ex=RESULT_TTL)
+    write_task_status(task_id, state, pipe=pipe)
+    pipe.execute()
 
 # hello world task
 @shared_task
@@ -22,13 +212,26 @@ def run_ssh_command(host:str, username:str, password:str, command:str, device_ty
             "port": port,
         }
 
-        connection = ConnectHandler(**device)
-        output = connection.send_command(command, use_textfsm=use_textfsm)
-        connection.disconnect()
+        with ssh_slot(host, port, device_type) as slot:
+            start = time.monotonic()
+            metrics.registry.observe("yami_ssh_seconds", slot.waited, phase="wait", device_type=device_type)
+            connection = ConnectHandler(**device)
+            try:
+                connected = time.monotonic()
+                metrics.registry.observe("yami_ssh_seconds", connected - start, phase="connect", device_type=device_type)
+                output = connection.send_command(command, use_textfsm=use_textfsm)
+                metrics.registry.observe("yami_ssh_seconds", time.monotonic() - connected, phase="command", device_type=device_type)
+            finally:
+                connection.disconnect()
 
+        # parsed output only when TextFSM matched, raw output otherwise
+        if isinstance(output, list):
+            return {
+                "parsed": output,
+                "success": True
+            }
         return {
-            "parsed": output if isinstance(output, list) else None,
-            "raw": output if isinstance(output, str) else None,
+            "raw": output,
             "success": True
         }
 
@@ -36,4 +239,199 @@ def run_ssh_command(host:str, username:str, password:str, command:str, device_ty
         return {
             "error": str(e),
             "success": False
-        }
\ No newline at end of file
+        }
+
+# Send a command and pass its output to publish() as it arrives, in blocks of complete lines
+# Returns the number of characters published.
+# caution: the last line is held back until its newline arrives, it may be the prompt ending the output
+def stream_command(connection, command:str, publish:Callable[[str], None], idle_timeout:float=STREAM_IDLE_TIMEOUT)->int:
+    prompt = connection.find_prompt()
+    connection.write_channel(connection.normalize_cmd(command))
+    pending, echoed, size = "", False, 0
+    last_read = time.monotonic()
+    while True:
+        data = connection.read_channel().replace("\r", "")
+        if not data:
+            if time.monotonic() - last_read > idle_timeout:
+                raise TimeoutError(f"No output for {idle_timeout:.0f}s")
+            time.sleep(STREAM_POLL_INTERVAL)
+            continue
+        last_read = time.monotonic()
+        pending += data
+        # drop the command echo
+        if not echoed:
+            if "\n" not in pending:
+                continue
+            pending = pending.split("\n", 1)[1]
+            echoed = True
+        cut = pending.rfind("\n") + 1
+        if cut:
+            publish(pending[:cut])
+            size += cut
+            pending = pending[cut:]
+        if pending.strip() == prompt:
+            return size
+
+# stream_ssh_command
+# Long outputs (show tech-support, show logging...) are published to a Redis stream while the command
+# runs: the browser renders them progressively and the worker never holds the whole output
+@shared_task(bind=True)
+def stream_ssh_command(self, host:str, username:str, password:str, command:str, device_type:str="cisco_ios", port:int=22):
+    redis = get_task_redis()
+    key = STREAM_KEY.format(task_id=self.request.id)
+
+    def publish(chunk:str):
+        pipe = redis.pipeline()
+        pipe.xadd(key, {"data": chunk}, maxlen=STREAM_MAXLEN, approximate=True)
+        pipe.expire(key, RESULT_TTL)
+        pipe.execute()
+
+    try:
+        device = {
+            "device_type": device_type,
+            "ip": host,
+            "username": username,
+            "password": password,
+            "port": port,
+        }
+
+        with ssh_slot(host, port, device_type) as slot:
+            start = time.monotonic()
+            metrics.registry.observe("yami_ssh_seconds", slot.waited, phase="wait", device_type=device_type)
+            connection = ConnectHandler(**device)
+            try:
+                connected = time.monotonic()
+                metrics.registry.observe("yami_ssh_seconds", connected - start, phase="connect", device_type=device_type)
+                size = stream_command(connection, command, publish)
+                metrics.registry.observe("yami_ssh_seconds", time.monotonic() - connected, phase="command", device_type=device_type)
+            finally:
+                connection.disconnect()
+
+        result = {
+            "streamed": size,
+            "success": True
+        }
+
+    except Exception as e:
+        result = {
+            "error": str(e),
+            "success": False
+        }
+
+    # end of stream marker, carrying the task result
+    redis.xadd(key, {"eof": json.dumps(result)})
+    redis.expire(key, RESULT_TTL)
+    return result
+
+# attach_device_templates
+# Push template values for many devices in one vManage action, then track it until completion
+@shared_task(bind=True)
+def attach_device_templates(self, fabric:str, template_id:str, devices:list[dict[str,str]]):
+    vmanage = get_vmanage(fabric)
+    if vmanage is None:
+        return {
+            "error": f"Invalid fabric {fabric}",
+            "success": False
+        }
+
+    async def run():
+        action_id = await vmanage.attach_device_templates(template_id, devices)
+        if action_id is None:
+            return {
+                "error": "Template attach refused by vManage",
+                "success": False
+            }
+
+        # cached inventory / template values depending on this push
+        tags = format_tags([SDWAN_INVENTORY, SDWAN_TEMPLATE], fabric=fabric, template_id=template_id)
+        tags += [ tag for e in devices for tag in format_tags([SDWAN_DEVICE], fabric=fabric, device_id=e.get("csv-deviceId")) ]
+
+        # poll action status with backoff
+        interval = ACTION_POLL_INTERVAL
+        deadline = time.monotonic() + ACTION_TIMEOUT
+        while time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+            interval = min(interval * ACTION_POLL_BACKOFF, ACTION_POLL_MAX_INTERVAL)
+            status = await vmanage.get_action_status(action_id)
+            if not status:
+                continue
+
+            # per-device progress
+            progress = {
+                "action_id": action_id,
+                "status": status.get("summary", {}).get("status"),
+                "count": status.get("summary", {}).get("count", {}),
+                "devices": [
+                    {
+                        "uuid": e.get("uuid"),
+                        "hostname": e.get("host-name"),
+                        "status": e.get("status"),
+                        "status_id": e.get("statusId"),
+                        "activity": (e.get("activity") or [None])[-1]
+                    }
+                    for e in status.get("data", [])
+                ]
+            }
+            report_progress(self, progress)
+
+            if progress["status"] == "done":
+                invalidate(get_cache_redis(), tags)
+                failed = [ e for e in progress["devices"] if e["status_id"] not in ("success", None) ]
+                return progress | {
+                    "success": not failed,
+                    "error": f"{len(failed)} device(s) failed" if failed else None
+                }
+
+        # the push may have been applied without being confirmed in time
+        invalidate(get_cache_redis(), tags)
+        return {
+            "action_id": action_id,
+            "error": f"Timeout waiting for action {action_id}",
+            "success": False
+        }
+
+    try:
+        return asyncio.run(run())
+    except Exception as e:
+        return {
+            "error": str(e),
+            "success": False
+        }
+
+# collect_sdwan_fleet
+# Collect interfaces / TLOCs / VRRP from every reachable edge and store a queryable snapshot
+@shared_task(bind=True)
+def collect_sdwan_fleet(self, fabric:str):
+    vmanage = get_vmanage(fabric)
+    if vmanage is None:
+        return {
+            "error": f"Invalid fabric {fabric}",
+            "success": False
+        }
+
+    try:
+        snapshot = asyncio.run(vmanage.collect_fleet(
+            on_progress = lambda progress: report_progress(self, progress)
+        ))
+    except Exception as e:
+        return {
+            "error": str(e),
+            "success": False
+        }
+    if snapshot is None:
+        return {
+            "error": "No data",
+            "success": False
+        }
+
+    snapshot["fabric"] = fabric
+    snapshot["collected_at"] = datetime.now(timezone.utc).isoformat()
+    get_cache_redis().set(SNAPSHOT_KEY.format(fabric=fabric), json.dumps(snapshot), ex=SNAPSHOT_TTL)
+
+    return {
+        "collected_at": snapshot["collected_at"],
+        "devices": snapshot["devices"],
+        "failed": snapshot["failed"],
+        "errors": snapshot["errors"],
+        "success": True
+    }
@@ -0,0 +1,17 @@
+import os
+
+# app.py reads its configuration at import time
+for name, value in {
+    "FLASK_ENV": "production",
+    "SECRET_KEY": "test",
+    "REDIS_URL": "redis://localhost",
+    "LDAP_HOST": "localhost",
+    "LDAP_BASE_DN": "DC=test,DC=local",
+    "LDAP_ROLES": "{}",
+    "DNS_SERVERS": "[]",
+    "DNS_SUFFIXES": "[]",
+    "DNAC_FABRICS": "{}",
+    "MERAKI_FABRICS": "{}",
+    "SDWAN_FABRICS": "{}",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,30 @@
+import asyncio
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("redis")
+
+from lib.aiodnac import Dnac
+
+def api_device(id:str)->dict:
+    return {"id": id, "name": f"sw-{id}.test.local", "managementIpAddress": "192.0.2.1"}
+
+def test_load_device_with_partial_upstream_response(monkeypatch):
+    dnac = Dnac("dnac.test", "admin", "admin")
+    requests = []
+
+    async def get(object, params=None):
+        requests.append(params)
+        # upstream only knows some of the requested ids
+        return {"response": [ api_device(id) for id in params["id"].split(",") if id != "b" ]}
+    monkeypatch.setattr(dnac, "_get", get)
+
+    async def run():
+        return await asyncio.gather(*(dnac.load_device(id) for id in ["a", "b", "c"]))
+    a, b, c = asyncio.run(run())
+
+    assert len(requests) == 1
+    assert requests[0]["limit"] == 3
+    assert sorted(requests[0]["id"].split(",")) == ["a", "b", "c"]
+    assert (a.id, c.id) == ("a", "c")
+    assert b is None
@@ -0,0 +1,30 @@
+import socket
+import asyncio
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("redis")
+pytest.importorskip("uvicorn")
+pytest.importorskip("cryptography")
+
+from bench.mockapi import MockServer, MERAKI_ORG
+from lib.aiomeraki import Meraki, next_link
+
+def free_port()->int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_next_link_forms():
+    assert next_link("<https://a/devices?startingAfter=Q2>; rel=next") == "https://a/devices?startingAfter=Q2"
+    assert next_link('<https://a/first>; rel=first, <https://a/next>; rel="next"') == "https://a/next"
+    assert next_link("<https://a/prev>; rel=prev") is None
+    assert next_link(None) is None
+
+def test_get_devices_follows_pages_to_the_end():
+    fleet = 1234  # 3 pages of 500
+    with MockServer(fleet, port=free_port()) as server:
+        client = Meraki("test-key", MERAKI_ORG, host=server.address)
+        devices = asyncio.run(asyncio.wait_for(client.get_devices(), 60))
+    assert len(devices) == fleet
+    assert len({ d.serial for d in devices }) == fleet
@@ -0,0 +1,48 @@
+import json
+import asyncio
+import functools
+import pytest
+
+httpx = pytest.importorskip("httpx")
+fakeredis = pytest.importorskip("fakeredis")
+
+from lib import aiosdwan
+from lib.aiosdwan import Vmanage
+
+LOGIN_PAGE = "<html><head><title>Cisco vManage</title></head><body>login</body></html>"
+OPTIONS = {"data": [{"option": "value"}]}
+
+@pytest.fixture
+def vmanage(monkeypatch):
+    state = {"logins": 0, "expired": 1}
+
+    def handler(request):
+        if request.url.path == "/j_security_check":
+            state["logins"] += 1
+            return httpx.Response(200, text="", headers={"set-cookie": "JSESSIONID=test"})
+        if request.url.path == "/dataservice/client/token":
+            return httpx.Response(200, text="token")
+        # expired session: vManage answers with its login page
+        if state["expired"]:
+            state["expired"] -= 1
+            return httpx.Response(200, text=LOGIN_PAGE, headers={"content-type": "text/html"})
+        return httpx.Response(200, json=OPTIONS)
+
+    client = functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(aiosdwan.httpx, "AsyncClient", client)
+    vmanage = Vmanage("vmanage.test", "admin", "admin", cache=fakeredis.FakeRedis())
+    return vmanage, state
+
+def test_login_page_is_never_cached(vmanage):
+    vmanage, state = vmanage
+    data = asyncio.run(vmanage.get("/client/monitor/device/options"))
+    # authenticated again and retried
+    assert data == OPTIONS
+    assert state["logins"] == 2
+    assert json.loads(vmanage.cache.get("GET", "/client/monitor/device/options", {})) == OPTIONS
+
+def test_persistent_login_page_fails(vmanage):
+    vmanage, state = vmanage
+    state["expired"] = 10
+    assert asyncio.run(vmanage.get("/client/monitor/device/options")) is None
+    assert vmanage.cache.get("GET", "/client/monitor/device/options", {}) is None
@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("flask")
+fakeredis = pytest.importorskip("fakeredis")
+
+import app as yami
+import api_tasks
+from tasks import write_task_owner
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(api_tasks, "task_redis", redis)
+    return redis
+
+def stream(task_id:str, username:str):
+    with yami.app.test_request_context(f"/api/tasks/{task_id}/stream"):
+        yami.session["username"] = username
+        response = yami.app.make_response(api_tasks.stream_task(task_id))
+        body = None if response.is_streamed else response.get_data(as_text=True)
+        response.close()
+        return response, body
+
+def test_stream_is_reserved_to_the_task_owner(redis):
+    write_task_owner(redis, "task-1", "alice")
+    assert stream("task-1", "bob")[0].status_code == 403
+    assert stream("task-2", "alice")[0].status_code == 404
+    assert stream("task-1", "alice")[0].status_code == 200
+
+def test_busy_streams_are_retried_not_refused(redis):
+    write_task_owner(redis, "task-1", "alice")
+    for _ in range(api_tasks.STREAM_MAX):
+        api_tasks.stream_slots.acquire()
+    try:
+        response, body = stream("task-1", "alice")
+    finally:
+        for _ in range(api_tasks.STREAM_MAX):
+            api_tasks.stream_slots.release()
+    # EventSource reconnects after the retry delay, an error status would end the stream
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert body == f"retry: {api_tasks.STREAM_BUSY_RETRY}\n\n"
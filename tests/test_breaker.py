@@ -0,0 +1,38 @@
+import asyncio
+import pytest
+
+from lib.breaker import CircuitBreaker, CircuitOpenError, UpstreamError, OPEN, CLOSED
+
+def open_breaker(reset_timeout:float)->CircuitBreaker:
+    breaker = CircuitBreaker("test", threshold=1, reset_timeout=reset_timeout)
+
+    async def failing():
+        raise UpstreamError("down")
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(breaker.call(None, failing))
+    assert breaker.state == OPEN
+    return breaker
+
+def test_calls_without_key_are_never_replayed():
+    breaker = open_breaker(reset_timeout=60)
+    calls = []
+
+    async def write():
+        calls.append(1)
+        return "ok"
+    # fails fast while open: the write is neither sent nor probed in the background
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(breaker.call(None, write))
+    assert not breaker.probing
+    assert calls == []
+
+def test_call_without_key_is_the_trial_after_reset_timeout():
+    breaker = open_breaker(reset_timeout=0)
+    calls = []
+
+    async def write():
+        calls.append(1)
+        return "ok"
+    assert asyncio.run(breaker.call(None, write)) == "ok"
+    assert calls == [1]
+    assert breaker.state == CLOSED
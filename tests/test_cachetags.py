@@ -0,0 +1,29 @@
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from lib.cachetags import SDWAN_DEVICE, TAG_PREFIX, format_tags, add_tags, invalidate
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeRedis()
+
+def test_tag_expiry_is_only_extended(redis):
+    tag = format_tags([SDWAN_DEVICE], fabric="F", device_id="D1")[0]
+    redis.set("template_values", "1", ex=86400)
+    add_tags(redis, "template_values", [tag], 86400)
+    redis.set("route_table", "1", ex=600)
+    add_tags(redis, "route_table", [tag], 600)
+    assert redis.ttl(f"{TAG_PREFIX}{tag}") > 600
+
+def test_invalidate_drops_entries_with_different_ttls(redis):
+    tag = format_tags([SDWAN_DEVICE], fabric="F", device_id="D1")[0]
+    redis.set("template_values", "1", ex=86400)
+    add_tags(redis, "template_values", [tag], 86400)
+    redis.set("route_table", "1", ex=600)
+    add_tags(redis, "route_table", [tag], 600)
+
+    assert invalidate(redis, [tag]) == 2
+    assert not redis.exists("template_values")
+    assert not redis.exists("route_table")
+    assert not redis.exists(f"{TAG_PREFIX}{tag}")
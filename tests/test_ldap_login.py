@@ -0,0 +1,45 @@
+import time
+import types
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("ldap3")
+
+import app as yami
+
+class SlowConnection:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def bind(self):
+        time.sleep(0.5)
+        return True
+
+    def unbind(self):
+        pass
+
+@pytest.fixture
+def slow_directory(monkeypatch):
+    entry = types.SimpleNamespace(
+        entry_dn = "CN=alice,DC=test,DC=local",
+        displayName = types.SimpleNamespace(value="Alice"),
+        givenName = types.SimpleNamespace(value="Alice"),
+        mail = types.SimpleNamespace(value="alice@test.local")
+    )
+    monkeypatch.setattr(yami.ldap_pool, "search", lambda **kwargs: [entry])
+    monkeypatch.setattr(yami, "Connection", SlowConnection)
+    monkeypatch.setattr(yami, "LDAP_BIND_TIMEOUT", 0.1)
+
+def test_timed_out_binds_do_not_pile_up(slow_directory):
+    for _ in range(yami.LDAP_POOL_SIZE + 2):
+        start = time.monotonic()
+        assert not yami.ldap_login("alice", "secret").authenticated
+        # the request thread waits at most LDAP_BIND_TIMEOUT, busy workers refuse at once
+        assert time.monotonic() - start < 0.3
+
+    # abandoned binds end and give their slot back
+    time.sleep(0.6)
+    for _ in range(yami.LDAP_POOL_SIZE):
+        assert yami.ldap_bind_slots.acquire(blocking=False)
+    for _ in range(yami.LDAP_POOL_SIZE):
+        yami.ldap_bind_slots.release()
@@ -0,0 +1,29 @@
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from lib.semaphore import RedisSemaphore
+
+@pytest.fixture
+def redis():
+    return fakeredis.FakeRedis()
+
+def test_renew_outlives_idle_ttl(redis):
+    semaphore = RedisSemaphore(redis, "test", limit=1, lease=1.0, timeout=1.0)
+    semaphore.acquire()
+    try:
+        holders = semaphore.keys[0]
+        # held longer than the idle key ttl: without renewing the ttl, the holders set would expire
+        for _ in range(3):
+            redis.expire(holders, 1)
+            assert semaphore.renew()
+            assert redis.ttl(holders) == semaphore.idle_ttl
+        assert semaphore.stats()["inflight"] == 1
+
+        other = RedisSemaphore(redis, "test", limit=1, lease=1.0, timeout=0.3, poll_interval=0.05)
+        with pytest.raises(TimeoutError):
+            other.acquire()
+    finally:
+        semaphore.release()
+    assert semaphore.stats()["inflight"] == 0
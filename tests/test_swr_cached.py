@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("flask")
+fakeredis = pytest.importorskip("fakeredis")
+
+import app as yami
+from lib.breaker import track_stale, is_stale, _mark_stale
+
+@pytest.fixture
+def redis(monkeypatch):
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(yami, "cache_redis", redis)
+    return redis
+
+def test_open_breaker_response_is_not_cached_as_fresh(redis):
+    calls = []
+
+    @yami.swr_cached(soft_timeout=300)
+    def view():
+        calls.append(1)
+        # upstream circuit open: last-known-good data
+        if len(calls) == 1:
+            _mark_stale()
+        return {"calls": len(calls)}
+
+    with yami.app.test_request_context("/test/stale"):
+        track_stale()
+        assert view() == {"calls": 1}
+        assert is_stale()
+    assert not redis.keys("swr:*")
+
+    # upstream recovered: computed again, then cached
+    with yami.app.test_request_context("/test/stale"):
+        track_stale()
+        assert view() == {"calls": 2}
+        assert not is_stale()
+    assert redis.keys("swr:*")
+
+    with yami.app.test_request_context("/test/stale"):
+        track_stale()
+        assert view() == {"calls": 2}
@@ -0,0 +1,22 @@
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from lib.upstreamcache import UpstreamCache
+
+POLICY = [(r"/device", 300), (r"/device/vrrp", 60)]
+
+@pytest.fixture
+def cache():
+    return UpstreamCache(fakeredis.FakeRedis(), POLICY, namespace="vmanage.test")
+
+def test_invalidate_paths_and_devices(cache):
+    cache.set("GET", "/device", {}, [{"uuid": "a"}])
+    cache.set("GET", "/device/vrrp", {"deviceId": "10.0.0.1"}, {"data": [1]})
+    cache.set("GET", "/device/vrrp", {"deviceId": "10.0.0.2"}, {"data": [2]})
+
+    assert cache.invalidate(["/device"], ["10.0.0.1"]) == 2
+    assert cache.get("GET", "/device") is None
+    assert cache.get("GET", "/device/vrrp", {"deviceId": "10.0.0.1"}) is None
+    # other devices keep their cached state
+    assert cache.get("GET", "/device/vrrp", {"deviceId": "10.0.0.2"}) == {"data": [2]}
@@ -49,8 +49,9 @@ async def show_device(fabric,id):
     try:
         if not fabric in dnac.keys():
             return jsonify({"error": f"Invalid fabric {fabric}"}), 400
-        r = await dnac[fabric].get_devices({"id":[id]})
-        data = r[0]
+        data = await dnac[fabric].load_device(id)
+        if data is None:
+            return jsonify({"error": f"Device {id} not found"}), 404
         hostname = data.hostname
         device_type = check_device_type(data.platform)
     except Exception as err:
@@ -64,8 +65,9 @@ async def show_interface(fabric,id,if_name):
     if_name = if_name.replace("_","/")
     user = read_user_from_session(session)
     try:
-        r = await dnac[fabric].get_devices({"id":[id]})
-        data = r[0]
+        data = await dnac[fabric].load_device(id)
+        if data is None:
+            return jsonify({"error": f"Device {id} not found"}), 404
         hostname = data.hostname
         device_type = check_device_type(data.platform)
     except Exception as err:
@@ -79,8 +81,9 @@ async def show_vlan(fabric,id,vlan):
     user = read_user_from_session(session)
     name = request.args.get("name",None)
     try:
-        r = await dnac[fabric].get_devices({"id":[id]})
-        data = r[0]
+        data = await dnac[fabric].load_device(id)
+        if data is None:
+            return jsonify({"error": f"Device {id} not found"}), 404
         hostname = data.hostname
         device_type = check_device_type(data.platform)
     except Exception as err:
@@ -1,13 +1,17 @@
 import os
 from dotenv import load_dotenv
 from celery import Celery
+from redis import Redis
+from lib import metrics
 import tasks
 load_dotenv()
 
 # Config
 REDIS_URL = os.environ.get("REDIS_URL")
-RESULT_EXPIRES = 300
 
 # Init app
-worker = Celery('celery', broker=f"{REDIS_URL}/2", result_backend=f"{REDIS_URL}/2", task_ignore_result=False)
-worker.conf.result_expires = RESULT_EXPIRES
\ No newline at end of file
+worker = Celery('celery', broker=f"{REDIS_URL}/2", result_backend=f"{REDIS_URL}/2")
+worker.conf.update(tasks.CELERY_CONFIG)
+
+# Report task metrics through Redis DB0 (scraped by the web tier on /metrics)
+metrics.configure(Redis.from_url(f"{REDIS_URL}/0"))